@@ -1,8 +1,9 @@
-from .net import MultilayerNetwork,MultiplexNetwork
+from .net import MultilayerNetwork,MultiplexNetwork,SubnetView
 from .models import er,conf,single_layer_er,single_layer_conf,er_partially_interconnected,full,full_multilayer,er_multilayer
 from .transforms import aggregate,subnet,supra_adjacency_matrix
 from .netio import read_ucinet
-from .diagnostics import degs,density,multiplex_degs,multiplex_density
+from .diagnostics import degs,density,multiplex_degs,multiplex_density,multiplex_density_matrix,degree_arrays,multiplex_degree_arrays
+from .bfs import connected_components,is_connected,layer_components,node_components
 from .cc import   lcc,cc_zhang,gcc_zhang,cc_onnela,cc_barrat,cc_barrett,cc_sequence,lcc_aw,avg_lcc_aw,gcc_aw,sncc_aw,elementary_cycles,lcc_brodka
 
 from .visuals import webplot
@@ -23,3 +24,8 @@ except ImportError: #in case networkx is not installed
 
 from . import sampling
 
+try:
+    from .csrnet import CSRMultilayerNetwork,CSRNetworkBuilder
+except ImportError: #in case numpy is not installed
+    pass
+
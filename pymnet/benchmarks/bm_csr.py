@@ -0,0 +1,64 @@
+"""Memory and throughput of the dict and CSR storage of multilayer networks.
+
+Usage: python -m pymnet.benchmarks.bm_csr [edges] [layers]
+
+The default of 10^7 edges needs several gigabytes of memory for the dict-based
+network. Use a smaller number of edges to get a quick comparison.
+"""
+import sys,time,random,tracemalloc
+
+from pymnet import MultilayerNetwork
+from pymnet.csrnet import CSRNetworkBuilder
+
+
+def random_edges(nedges,nnodes,nlayers,seed=1):
+    rnd=random.Random(seed)
+    for e in range(nedges):
+        yield rnd.randrange(nnodes),rnd.randrange(nnodes),rnd.randrange(nlayers)
+
+
+def measure(name,create,nedges,nnodes,nlayers):
+    tracemalloc.start()
+    t=time.time()
+    net=create(random_edges(nedges,nnodes,nlayers))
+    build_time=time.time()-t
+    memory=tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t=time.time()
+    degsum=0
+    for node in range(nnodes):
+        for layer in range(nlayers):
+            for neigh in net[node,layer]:
+                degsum+=1
+    iter_time=time.time()-t
+
+    rnd=random.Random(2)
+    t=time.time()
+    for i in range(10**5):
+        net[rnd.randrange(nnodes),rnd.randrange(nnodes),rnd.randrange(nlayers)]
+    lookup_time=time.time()-t
+
+    print("%s: build %.1f s, %.1f bytes/edge (peak %.1f), neighbor iteration %.2f s, 10^5 lookups %.2f s"
+          %(name,build_time,memory[0]/float(nedges),memory[1]/float(nedges),iter_time,lookup_time))
+
+
+def create_dict(edges):
+    net=MultilayerNetwork(aspects=1)
+    for i,j,l in edges:
+        net[i,j,l]=1
+    return net
+
+def create_csr(edges):
+    builder=CSRNetworkBuilder(aspects=1)
+    for i,j,l in edges:
+        builder[i,j,l]=1
+    return builder.freeze()
+
+
+if __name__=="__main__":
+    nedges=int(sys.argv[1]) if len(sys.argv)>1 else 10**7
+    nlayers=int(sys.argv[2]) if len(sys.argv)>2 else 10
+    nnodes=max(2,nedges//(5*nlayers))
+    measure("dict",create_dict,nedges,nnodes,nlayers)
+    measure("csr",create_csr,nedges,nnodes,nlayers)
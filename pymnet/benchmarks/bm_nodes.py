@@ -0,0 +1,60 @@
+"""Memory allocated by node objects and by the direct accessors of networks.
+
+Usage: python -m pymnet.benchmarks.bm_nodes [nodes] [layers]
+
+Reports the number of bytes and memory blocks allocated when MultilayerNode
+objects are kept alive, and the time used for computing degrees and iterating
+over neighbors through MultilayerNode objects and through the degree_of and
+neighbors_of methods of the network.
+"""
+import sys,time,tracemalloc
+
+from pymnet import models
+
+
+def measure(name,function,count):
+    tracemalloc.start()
+    before=tracemalloc.take_snapshot()
+    result=function()
+    after=tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats=after.compare_to(before,"filename")
+    size=sum(stat.size_diff for stat in stats)
+    blocks=sum(stat.count_diff for stat in stats)
+    print("%s: %.1f bytes and %.2f blocks per node-layer"%(name,size/float(count),blocks/float(count)))
+    return result
+
+
+def run(nnodes,nlayers):
+    net=models.er(nnodes,nlayers*[5./nnodes])
+    nodelayers=list(net.iter_node_layers())
+    count=len(nodelayers)
+
+    measure("kept MultilayerNode objects",lambda :[net[nl] for nl in nodelayers],count)
+
+    def timeit(function,repeats=10):
+        t=time.time()
+        for i in range(repeats):
+            function()
+        return (time.time()-t)/repeats
+
+    def degrees_with_nodes():
+        return sum(net[nl].deg() for nl in nodelayers)
+    def degrees_with_accessor():
+        return sum(net.degree_of(nl) for nl in nodelayers)
+    def neighbors_with_nodes():
+        return sum(1 for nl in nodelayers for neigh in net[nl])
+    def neighbors_with_accessor():
+        return sum(1 for nl in nodelayers for neigh in net.neighbors_of(nl))
+
+    for name,function in [("degrees, net[nl].deg()",degrees_with_nodes),
+                          ("degrees, net.degree_of(nl)",degrees_with_accessor),
+                          ("neighbors, iter(net[nl])",neighbors_with_nodes),
+                          ("neighbors, net.neighbors_of(nl)",neighbors_with_accessor)]:
+        print("%s: %.1f ms"%(name,1000*timeit(function)))
+
+
+if __name__=="__main__":
+    nnodes=int(sys.argv[1]) if len(sys.argv)>1 else 10000
+    nlayers=int(sys.argv[2]) if len(sys.argv)>2 else 3
+    run(nnodes,nlayers)
@@ -0,0 +1,210 @@
+"""Breadth-first search, reachability and connected components of multilayer networks.
+
+The searches run on the integer ids of the node-layers in time proportional to
+the number of node-layers and edges. Networks with dictionaries of links and 
+frozen networks are searched through their own ids, and other networks (e.g., 
+multiplex networks and views) through the neighbors of their node-layers. 
+Edge weights are ignored. NumPy is not needed.
+"""
+
+import itertools
+from collections import deque
+
+def _id_adjacency(net,weak=False):
+    """Returns the node-layers, their ids, and a function giving the ids of the
+    neighbors of an id.
+
+    For directed networks the out-neighbors are given, or both the in- and
+    out-neighbors if weak is True. All node-layers of the network get an id,
+    also the ones without links.
+    """
+    if hasattr(net,"_idToNl"): #dict-based networks already have ids for node-layers with links
+        nodelayers,nlindex=list(net._idToNl),dict(net._nlToId)
+        adjacency=net._net
+        if net.directed and weak:
+            radjacency=net._rnet
+            neighbors=lambda i:itertools.chain(adjacency.get(i,()),radjacency.get(i,()))
+        else:
+            neighbors=lambda i:adjacency.get(i,())
+    elif hasattr(net,"indptr"): #frozen networks
+        nodelayers,nlindex=list(net._nodelayers),dict(net._nlindex)
+        indptr,indices=net.indptr.tolist(),net.indices.tolist()
+        n=len(indptr)-1
+        if net.directed and weak:
+            rindptr,rindices=net._rindptr.tolist(),net._rindices.tolist()
+            neighbors=lambda i:itertools.chain(indices[indptr[i]:indptr[i+1]],rindices[rindptr[i]:rindptr[i+1]]) if i<n else ()
+        else:
+            neighbors=lambda i:indices[indptr[i]:indptr[i+1]] if i<n else ()
+    else: #the ids are given here, and the neighbors are asked from the network
+        nodelayers=list(net.iter_node_layers())
+        nlindex=dict((nl,i) for i,nl in enumerate(nodelayers))
+        if net.directed and weak:
+            neighbors=lambda i:(nlindex[nl] for nl in itertools.chain(net._iter_neighbors_out(nodelayers[i],None),net._iter_neighbors_in(nodelayers[i],None)))
+        else:
+            neighbors=lambda i:(nlindex[nl] for nl in net._iter_neighbors_out(nodelayers[i],None))
+        return nodelayers,nlindex,neighbors
+
+    for nl in net.iter_node_layers():
+        if nl not in nlindex: #a node-layer without links
+            nlindex[nl]=len(nodelayers)
+            nodelayers.append(nl)
+    return nodelayers,nlindex,neighbors
+
+def _bfs_ids(neighbors,sources,dist,cutoff=None):
+    """Breadth-first search from the source ids. The dist list has -1 for ids
+    not found yet, and it is filled with the distances of the found ids.
+    Returns the found ids in the order they were found.
+    """
+    order=[]
+    for s in sources:
+        if dist[s]<0:
+            dist[s]=0
+            order.append(s)
+    queue=deque(order)
+    while queue:
+        i=queue.popleft()
+        d=dist[i]+1
+        if cutoff is not None and d>cutoff:
+            continue
+        for j in neighbors(i):
+            if dist[j]<0:
+                dist[j]=d
+                order.append(j)
+                queue.append(j)
+    return order
+
+def _components_ids(n,neighbors):
+    """Returns the lists of ids in each component, in the order of their smallest ids.
+    """
+    dist=[-1]*n
+    return [_bfs_ids(neighbors,[i],dist) for i in range(n) if dist[i]<0]
+
+def _output(net,nl):
+    return nl[0] if net.aspects==0 else nl
+
+def bfs(net,sources,cutoff=None):
+    """Returns the number of steps to the node-layers reachable from the sources.
+
+    Parameters
+    ----------
+    net : MultilayerNetwork
+    sources : iterable
+       The source node-layers (nodes if there are no aspects).
+    cutoff : int, None
+       If given, only the node-layers at most this many steps away are searched.
+
+    Returns
+    -------
+    distances : dict
+       The distances of the reachable node-layers, keys are node-layers (nodes if
+       there are no aspects). In directed networks the links are followed in
+       their direction.
+
+    See also
+    --------
+    pymnet.diagnostics.dijkstra : Distances in weighted networks.
+    """
+    nodelayers,nlindex,neighbors=_id_adjacency(net)
+    sourceIds=[]
+    for s in sources:
+        nl=(s,) if net.aspects==0 else tuple(s)
+        if nl not in nlindex: #not in the network
+            nlindex[nl]=len(nodelayers)
+            nodelayers.append(nl)
+        sourceIds.append(nlindex[nl])
+    dist=[-1]*len(nodelayers)
+    order=_bfs_ids(neighbors,sourceIds,dist,cutoff)
+    return dict((_output(net,nodelayers[i]),dist[i]) for i in order)
+
+def connected_components(net):
+    """Returns the connected components of the supra-graph of the network.
+
+    The components of directed networks are weakly connected. In multiplex
+    networks the coupling edges connect the layers.
+
+    Parameters
+    ----------
+    net : MultilayerNetwork
+
+    Returns
+    -------
+    components : list of sets
+       The node-layers (nodes if there are no aspects) in each component, the
+       largest component first.
+    """
+    nodelayers,nlindex,neighbors=_id_adjacency(net,weak=True)
+    components=[set(_output(net,nodelayers[i]) for i in ids) for ids in _components_ids(len(nodelayers),neighbors)]
+    components.sort(key=len,reverse=True)
+    return components
+
+def is_connected(net):
+    """Returns True if the supra-graph of the network is (weakly) connected.
+
+    A network without node-layers is not connected.
+    """
+    nodelayers,nlindex,neighbors=_id_adjacency(net,weak=True)
+    if len(nodelayers)==0:
+        return False
+    dist=[-1]*len(nodelayers)
+    return len(_bfs_ids(neighbors,[0],dist))==len(nodelayers)
+
+def layer_components(net):
+    """Returns the connected components of each layer of the network.
+
+    Only the intra-layer links are used. The components of directed networks
+    are weakly connected.
+
+    Parameters
+    ----------
+    net : MultilayerNetwork
+       A network with at least one aspect.
+
+    Returns
+    -------
+    components : dict
+       Keys are the layers (tuples of elementary layers if there are more than one
+       aspect) and values are lists of sets of nodes in the components of the
+       layer, the largest component first.
+    """
+    assert net.aspects>0, "The network has no layers."
+    nodelayers,nlindex,neighbors=_id_adjacency(net,weak=True)
+    layerOf=[nl[1] if net.aspects==1 else nl[1:] for nl in nodelayers]
+    intraNeighbors=lambda i:(j for j in neighbors(i) if layerOf[j]==layerOf[i])
+
+    components={}
+    for layer in net.iter_layers():
+        components[layer]=[]
+    for ids in _components_ids(len(nodelayers),intraNeighbors):
+        components.setdefault(layerOf[ids[0]],[]).append(set(nodelayers[i][0] for i in ids))
+    for layer in components:
+        components[layer].sort(key=len,reverse=True)
+    return components
+
+def node_components(net):
+    """Returns the connected components of the projection of the network onto nodes.
+
+    Two nodes are in the same component if there is a path between any of their
+    node-layers in the supra-graph. The components of directed networks are weakly connected.
+
+    Parameters
+    ----------
+    net : MultilayerNetwork
+
+    Returns
+    -------
+    components : list of sets
+       The nodes in each component, the largest component first.
+    """
+    nodelayers,nlindex,neighbors=_id_adjacency(net,weak=True)
+    nodeIds={}
+    for i,nl in enumerate(nodelayers):
+        nodeIds.setdefault(nl[0],[]).append(i)
+    def projectedNeighbors(i): #node-layers of the same node are neighbors
+        ids=nodeIds[nodelayers[i][0]]
+        if ids[0]==i:
+            return itertools.chain(neighbors(i),ids)
+        return itertools.chain(neighbors(i),ids[:1])
+
+    components=[set(nodelayers[i][0] for i in ids) for ids in _components_ids(len(nodelayers),projectedNeighbors)]
+    components.sort(key=len,reverse=True)
+    return components
@@ -6,9 +6,9 @@ from .net import MultiplexNetwork
 from . import transforms
 
 def cc_num_den(net,node):
-    degree=net[node].deg()
+    degree=net.degree_of(node)
     t=0
-    for i,j in itertools.combinations(net[node],2):
+    for i,j in itertools.combinations(net.neighbors_of(node),2):
         if net[i][j]!=net.noEdge:
             t+=1
     return t,(degree*(degree-1))/2
@@ -41,7 +41,7 @@ def lcc(net,node,undefReturn=0.0):
     The function assumes that the network doesn't have any self-links,
     and that it's undirected.
     """
-    degree=net[node].deg()
+    degree=net.degree_of(node)
     if degree>=2:
         num,den=cc_num_den(net,node)
         return num/float(den)
@@ -67,10 +67,10 @@ def cc_zhang(net,node,undefReturn=0.0):
 
     """
     maxw=max(map(lambda x:x[2],net.edges))
-    degree=net[node].deg()
+    degree=net.degree_of(node)
     if degree>=2:
         nom,den=0,0
-        for i,j in itertools.combinations(net[node],2):
+        for i,j in itertools.combinations(net.neighbors_of(node),2):
             nij=net[node][i]*net[node][j]
             ij=net[i][j]
             den+=nij            
@@ -96,9 +96,9 @@ def gcc_zhang(net):
     maxw=max(map(lambda x:x[2],net.edges))
     nom,den=0,0
     for node in net:
-        degree=net[node].deg()
+        degree=net.degree_of(node)
         if degree>=2:
-            for i,j in itertools.combinations(net[node],2):
+            for i,j in itertools.combinations(net.neighbors_of(node),2):
                 nij=net[node][i]*net[node][j]
                 ij=net[i][j]
                 den+=nij            
@@ -122,10 +122,10 @@ def cc_onnela(net,node,undefReturn=0.0):
     J.-P. Onnela, J. Saramaki, J. Kertesz, and K. Kaski, Phys. Rev. E 71, 065103 (2005)
     """
     maxw=max(map(lambda x:x[2],net.edges))
-    degree=net[node].deg()
+    degree=net.degree_of(node)
     if degree>=2:
         nom=0
-        for i,j in itertools.combinations(net[node],2):
+        for i,j in itertools.combinations(net.neighbors_of(node),2):
             ij=net[i][j]
             if ij!=net.noEdge:
                 nom+=(net[node][i]*net[node][j]*ij)**(1./3.)
@@ -144,13 +144,13 @@ def cc_barrat(net,node,undefReturn=0.0):
     ----------
     A. Barrat, M. Barthelemy, R. Pastor-Satorras, and A. Vespignani, Proc. Natl. Acad. Sci. (USA) 101, 3747 (2004)
     """
-    degree=net[node].deg()
+    degree=net.degree_of(node)
     if degree>=2:
         nom=0
-        for i,j in itertools.combinations(net[node],2):
+        for i,j in itertools.combinations(net.neighbors_of(node),2):
             if net[i][j]!=net.noEdge:
                 nom+=net[node][i]+net[node][j]
-        return nom/float((degree-1)*net[node].str())
+        return nom/float((degree-1)*net.strength_of(node))
     else:
         return undefReturn
 
@@ -679,24 +679,23 @@ def cc_cycle_vector_adj(net,node,layer):
 
     return aaa,aacac,acaac,acaca,acacac, afa,afcac,acfac,acfca,acfcac
 
-def gcc_aw_vector_adj(net):
-    def get_nom_den(p,ph):
-        nom=[]
-        for i in range(len(p)):
-            nom.append(p[i,i])
+def gcc_aw_vector_adj(net,sparse=False):
+    """Returns the nominators and denominators of the alternating walker clustering 
+    coefficients computed with supra-adjacency matrices.
 
-        den=[]
-        for i in range(len(p)):
-            den.append(ph[i,i])
+    If sparse is True, scipy.sparse matrices are used instead of dense matrices.
+    """
+    import numpy
+    def get_nom_den(p,ph):
+        nom=list(numpy.asarray(p.diagonal()).ravel())
+        den=list(numpy.asarray(ph.diagonal()).ravel())
         return nom,den
 
-    import numpy
-    adj,nodes1=net.get_supra_adjacency_matrix()    
-    a,nodes2=net.get_supra_adjacency_matrix(includeCouplings=False)
-    c=adj-a
+    a,nodes1=net.get_supra_adjacency_matrix(includeCouplings=False,sparse=sparse)
+    c,nodes2=net.get_supra_adjacency_matrix(includeIntraLayer=False,sparse=sparse)
 
     fn=get_full_multiplex_network(net.slices[0],net.slices[1])
-    f,node3=fn.get_supra_adjacency_matrix(includeCouplings=False)
+    f,node3=fn.get_supra_adjacency_matrix(includeCouplings=False,sparse=sparse)
 
     aaa=a*a*a
     afa=a*f*a
@@ -730,8 +729,8 @@ def cc_aw_vector(net):
     return c1_nom,c1_den,c2_nom,c2_den,c3_nom,c3_den
 
 
-def gcc_aw_seplayers_adj(net,w1=1./3.,w2=1./3.,w3=1./3.,returnCVector=False):
-    c1_nom,c1_den,c2_nom,c2_den,c3_nom,c3_den=gcc_aw_vector_adj(net)
+def gcc_aw_seplayers_adj(net,w1=1./3.,w2=1./3.,w3=1./3.,returnCVector=False,sparse=False):
+    c1_nom,c1_den,c2_nom,c2_den,c3_nom,c3_den=gcc_aw_vector_adj(net,sparse=sparse)
     if sum(c1_den)!=0:
         c1=sum(c1_nom)/float(sum(c1_den))
     else:
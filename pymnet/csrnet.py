@@ -0,0 +1,590 @@
+"""Read-only multilayer networks stored in compressed sparse row (CSR) arrays.
+
+The dict-of-dicts storage of MultilayerNetwork is convenient for building and
+modifying networks, but it costs hundreds of bytes per edge. The classes in
+this module implement a build-then-freeze workflow: edges are first collected
+into compact append-only buffers (or into an ordinary network), and are then
+frozen into a CSRMultilayerNetwork. The frozen network keeps node-layers
+interned to integer ids and stores the adjacency in NumPy arrays, while still
+supporting the usual read-only interface of MultilayerNetwork.
+
+This module requires NumPy.
+"""
+
+import array,itertools
+import numpy
+
+from .net import MultilayerNetwork,MultiplexNetwork
+
+
+class CSRNetworkBuilder(object):
+    """Append-only buffer for building large CSRMultilayerNetwork objects.
+
+    Edges are given using the same notation as for MultilayerNetwork objects,
+    but they are only appended to compact integer and float buffers. Calling
+    freeze produces the read-only network. If the same edge is set several times,
+    the last value is used, and setting an edge to noEdge removes it.
+
+    Parameters
+    ----------
+    aspects : int
+       Number of aspects
+    noEdge : object
+       Any object signifying that there is no edge.
+    directed : bool
+       True if the network is directed, otherwise it's
+       undirected.
+    fullyInterconnected : bool
+       Determines if the network is fully interconnected, i.e. all nodes
+       are shared between all layers. Ignored if aspects==0.
+
+    Examples
+    --------
+    >>> builder=CSRNetworkBuilder(aspects=1)
+    >>> builder[1,2,'a','a']=1
+    >>> builder[1,1,'a','b']=1
+    >>> net=builder.freeze()
+
+    See also
+    --------
+    CSRMultilayerNetwork
+    """
+    def __init__(self,aspects=0,noEdge=0,directed=False,fullyInterconnected=True):
+        assert aspects>=0
+        self.aspects=aspects
+        self.noEdge=noEdge
+        self.directed=directed
+        self.fullyInterconnected=fullyInterconnected if aspects>0 else True
+
+        self.slices=[set() for a in range(aspects+1)]
+        self._nodelayers=[]
+        self._nlindex={}
+        self._sources=array.array('l')
+        self._targets=array.array('l')
+        self._weights=array.array('d')
+
+    def _intern(self,nl):
+        i=self._nlindex.get(nl)
+        if i is None:
+            i=len(self._nodelayers)
+            self._nlindex[nl]=i
+            self._nodelayers.append(nl)
+            for a,elayer in enumerate(nl):
+                self.slices[a].add(elayer)
+        return i
+
+    def add_node(self,node,layer=None):
+        """Adds an empty node, or a node-layer if the layer is given.
+        """
+        self.slices[0].add(node)
+        if layer is not None:
+            if isinstance(layer,list):
+                layer=tuple(layer)
+            if self.aspects==1:
+                self._intern((node,layer))
+            else:
+                self._intern((node,)+tuple(layer))
+
+    def add_layer(self,layer,aspect=1):
+        """Adds an empty (elementary) layer.
+        """
+        self.slices[aspect].add(layer)
+
+    def __setitem__(self,item,val):
+        d=self.aspects+1
+        if not item.__class__==tuple:
+            item=(item,)
+        if len(item)==d+1:
+            link=item[:2]+tuple(itertools.chain(*zip(item[2:],item[2:])))
+        elif len(item)==2*d:
+            link=item
+        else:
+            raise KeyError("Invalid number of indices.")
+        node1,node2=(link[0],)+link[2::2],(link[1],)+link[3::2]
+        self._sources.append(self._intern(node1))
+        self._targets.append(self._intern(node2))
+        self._weights.append(float('nan') if val==self.noEdge else val)
+
+    def __len__(self):
+        return len(self._sources)
+
+    def freeze(self):
+        """Returns the CSRMultilayerNetwork containing the edges set so far.
+        """
+        return CSRMultilayerNetwork._from_buffers(self)
+
+
+class CSRMultilayerNetwork(MultilayerNetwork):
+    """Read-only multilayer network with adjacency stored in CSR arrays.
+
+    The node-layers are interned to integer ids 0,...,n-1, and the out-neighbors
+    of node-layer with id i are stored in indices[indptr[i]:indptr[i+1]] in
+    increasing order, with the corresponding edge weights in the weights array.
+    Directed networks also store the transposed arrays for in-neighbors.
+
+    The network can be read with the same notation as MultilayerNetwork objects,
+    and it can be used in functions which do not modify their input. Modifying
+    the network raises a TypeError.
+
+    Because the network cannot change, derived data such as the degree and
+    strength vectors, the sorted list of node-layers, the aggregated networks
+    given by transforms.aggregate, and the hash value are computed once when 
+    first needed and then cached. The network is usually created with the
+    freeze method of MultilayerNetwork.
+
+    Parameters
+    ----------
+    net : MultilayerNetwork, MultiplexNetwork
+       The network which is frozen. Coupling edges of multiplex networks are
+       stored explicitly. As in directed multiplex networks, their undirected
+       coupling edges are counted once in the total strengths.
+
+    Notes
+    -----
+    The edge weights are stored as floating point numbers.
+
+    See also
+    --------
+    CSRNetworkBuilder : Building CSR networks without an intermediate network object
+    MultilayerNetwork.freeze
+    """
+    _couplingStrength=None #the strength counted twice in the total strengths, by id
+
+    def __init__(self,net):
+        self.aspects=net.aspects
+        self.directed=net.directed
+        self.noEdge=net.noEdge
+        self.fullyInterconnected=net.fullyInterconnected
+        self.slices=[set(s) for s in net.slices]
+
+        #Dict-based networks already have dense ids for node-layers with edges
+        if hasattr(net,"_idToNl"):
+            nodelayers=list(net._idToNl)
+            nlindex=dict(net._nlToId)
+        else:
+            nodelayers=[]
+            nlindex={}
+        def intern(nl):
+            i=nlindex.get(nl)
+            if i is None:
+                i=len(nodelayers)
+                nlindex[nl]=i
+                nodelayers.append(nl)
+            return i
+
+        if self.aspects==0:
+            the_iterator=((node,) for node in net.slices[0])
+        else:
+            the_iterator=net.iter_node_layers()
+        for nl in the_iterator:
+            intern(nl)
+
+        sources,targets,weights=array.array('l'),array.array('l'),array.array('d')
+        if hasattr(net,"_idToNl"):
+            for i in range(len(net._idToNl)):
+                neighbors=net._net[i]
+                sources.extend(itertools.repeat(i,len(neighbors)))
+                targets.extend(neighbors.keys())
+                weights.extend(neighbors.values())
+        else:
+            for nl in list(nodelayers):
+                i=nlindex[nl]
+                for neigh in net._iter_neighbors_out(nl,None):
+                    sources.append(i)
+                    targets.append(intern(neigh))
+                    weights.append(net._get_link(net._nodes_to_link(nl,neigh)))
+
+        self._set_arrays(nodelayers,nlindex,
+                         numpy.frombuffer(sources,dtype=sources.typecode),
+                         numpy.frombuffer(targets,dtype=targets.typecode),
+                         numpy.frombuffer(weights,dtype=numpy.float64))
+
+        #Undirected coupling edges are stored in both directions in directed networks
+        if self.directed and isinstance(net,MultiplexNetwork):
+            self._couplingStrength=numpy.array([sum(net._get_dim_strength(nl,a,"in")+net._get_dim_strength(nl,a,"out")-net._get_dim_strength(nl,a,"tot") for a in range(1,self.aspects+1)) for nl in nodelayers],dtype=numpy.float64)
+
+    @classmethod
+    def _from_buffers(cls,builder):
+        self=cls.__new__(cls)
+        self.aspects=builder.aspects
+        self.directed=builder.directed
+        self.noEdge=builder.noEdge
+        self.fullyInterconnected=builder.fullyInterconnected
+        self.slices=[set(s) for s in builder.slices]
+
+        sources=numpy.frombuffer(builder._sources,dtype=builder._sources.typecode)
+        targets=numpy.frombuffer(builder._targets,dtype=builder._targets.typecode)
+        weights=numpy.frombuffer(builder._weights,dtype=numpy.float64)
+        position=numpy.arange(len(sources))
+        if not self.directed:
+            sources,targets=numpy.concatenate((sources,targets)),numpy.concatenate((targets,sources))
+            weights=numpy.concatenate((weights,weights))
+            position=numpy.concatenate((position,position))
+
+        #Keep only the last value set for each edge, and drop removed edges.
+        n=len(builder._nodelayers)
+        keys=sources.astype(numpy.int64)*n+targets
+        order=numpy.lexsort((position,keys))
+        keys=keys[order]
+        last=numpy.ones(len(keys),dtype=bool)
+        last[:-1]=keys[1:]!=keys[:-1]
+        order=order[last]
+        order=order[~numpy.isnan(weights[order])]
+
+        self._set_arrays(list(builder._nodelayers),dict(builder._nlindex),
+                         sources[order],targets[order],weights[order])
+        return self
+
+    def _set_arrays(self,nodelayers,nlindex,sources,targets,weights):
+        """Builds the CSR arrays from edge arrays.
+
+        The edge arrays must contain both directions of undirected edges.
+        """
+        self._nodelayers=nodelayers
+        self._nlindex=nlindex
+        self._derivedCache={} #key=name of the derived quantity, val=its value
+        n=len(nodelayers)
+
+        if not self.fullyInterconnected:
+            self._layerToNodes={}
+            self._nodeToLayers={}
+            for nl in nodelayers:
+                layer=nl[1] if self.aspects==1 else nl[1:]
+                self._layerToNodes.setdefault(layer,set()).add(nl[0])
+                self._nodeToLayers.setdefault(nl[0],set()).add(layer)
+
+        self.indptr,self.indices,self.weights=self._compress(n,sources,targets,weights)
+        if self.directed:
+            self._edgeCount=len(self.indices)
+        else:
+            self._edgeCount=(len(self.indices)+int(numpy.count_nonzero(sources==targets)))//2
+        if self.directed:
+            self._rindptr,self._rindices,self._rweights=self._compress(n,targets,sources,weights)
+
+    @staticmethod
+    def _compress(n,rows,cols,weights):
+        order=numpy.lexsort((cols,rows))
+        indptr=numpy.zeros(n+1,dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(rows,minlength=n),out=indptr[1:])
+        indices=numpy.ascontiguousarray(cols[order],dtype=numpy.int32 if n<2**31 else numpy.int64)
+        return indptr,indices,numpy.ascontiguousarray(weights[order],dtype=numpy.float64)
+
+    def _read_only(self,*args,**kwargs):
+        raise TypeError("CSRMultilayerNetwork objects are read-only.")
+
+    add_node=_read_only
+    add_layer=_read_only
+    __setitem__=_read_only
+    _set_link=_read_only
+    add_edges_from=_read_only
+    _add_links=_read_only
+
+    def freeze(self):
+        """Returns the network itself, because it is already read-only.
+        """
+        return self
+
+    def _cached(self,key,compute):
+        """Returns the cached value of a derived quantity, computing it first if needed.
+        """
+        try:
+            return self._derivedCache[key]
+        except KeyError:
+            value=self._derivedCache[key]=compute()
+            return value
+
+    def __hash__(self):
+        return self._cached("hash",lambda :hash((self.aspects,self.directed,frozenset(self.edges))))
+
+    def iter_node_layers(self):
+        """Overrides parents method.
+        """
+        return iter(self._cached("nodelayers",lambda :list(MultilayerNetwork.iter_node_layers(self))))
+
+    def _get_supra_adjacency_nodes(self):
+        """Overrides parents method.
+        """
+        return list(self._cached("supranodes",lambda :MultilayerNetwork._get_supra_adjacency_nodes(self)))
+
+    def get_node_layers(self):
+        """Returns the list of node-layers (nodes if there are no aspects) in the
+        network, sorted in the same order as the rows of the supra-adjacency matrix.
+
+        The degree and strength vectors are given in this order.
+        """
+        def compute():
+            if self.aspects==0:
+                return sorted(self)
+            return sorted(self.iter_node_layers(),key=lambda nl:tuple(reversed(nl)))
+        return list(self._cached("sortednodelayers",compute))
+
+    def _get_vector_ids(self):
+        """Returns the ids of the node-layers returned by get_node_layers, with -1
+        for node-layers that have no id.
+        """
+        def compute():
+            if self.aspects==0:
+                nls=((node,) for node in self.get_node_layers())
+            else:
+                nls=self.get_node_layers()
+            return numpy.array([self._nlindex.get(nl,-1) for nl in nls],dtype=numpy.int64)
+        return self._cached("vectorids",compute)
+
+    def _to_vector(self,values):
+        ids=self._get_vector_ids()
+        vector=numpy.zeros(len(ids),dtype=values.dtype)
+        vector[ids>=0]=values[ids[ids>=0]]
+        vector.setflags(write=False)
+        return vector
+
+    def get_degree_vector(self,direction="total"):
+        """Returns the degrees of the node-layers as a read-only NumPy array.
+
+        The degrees are in the order given by get_node_layers.
+
+        Parameters
+        ----------
+        direction : str
+           'total', 'in' or 'out'. Only matters for directed networks.
+        """
+        assert direction in ["total","in","out"]
+        if not self.directed:
+            direction="out"
+        def compute():
+            n=len(self._nodelayers)
+            if direction=="out":
+                values=numpy.diff(self.indptr)
+            elif direction=="in":
+                values=numpy.diff(self._rindptr)
+            else:
+                rows=numpy.repeat(numpy.arange(n,dtype=numpy.int64),numpy.diff(self.indptr))
+                rrows=numpy.repeat(numpy.arange(n,dtype=numpy.int64),numpy.diff(self._rindptr))
+                pairs=numpy.unique(numpy.concatenate((rows*n+self.indices,rrows*n+self._rindices)))
+                values=numpy.bincount(pairs//n,minlength=n)
+            return self._to_vector(values)
+        return self._cached(("degree",direction),compute)
+
+    def get_strength_vector(self,direction="total"):
+        """Returns the strengths of the node-layers as a read-only NumPy array.
+
+        The strengths are in the order given by get_node_layers.
+
+        Parameters
+        ----------
+        direction : str
+           'total', 'in' or 'out'. Only matters for directed networks. The total
+           strength is the sum of in- and out-strengths, except that the coupling
+           edges of frozen multiplex networks are counted once.
+        """
+        assert direction in ["total","in","out"]
+        if not self.directed:
+            direction="out"
+        def compute():
+            n=len(self._nodelayers)
+            values=numpy.zeros(n,dtype=numpy.float64)
+            if direction in ["out","total"]:
+                rows=numpy.repeat(numpy.arange(n),numpy.diff(self.indptr))
+                values+=numpy.bincount(rows,weights=self.weights,minlength=n)
+            if direction in ["in","total"]:
+                rrows=numpy.repeat(numpy.arange(n),numpy.diff(self._rindptr))
+                values+=numpy.bincount(rrows,weights=self._rweights,minlength=n)
+            if direction=="total" and self._couplingStrength is not None:
+                values-=self._couplingStrength
+            return self._to_vector(values)
+        return self._cached(("strength",direction),compute)
+
+    def _get_node_layer_count(self):
+        """Overrides parents method.
+        """
+        if self.fullyInterconnected:
+            return MultilayerNetwork._get_node_layer_count(self)
+        return self._cached("nodelayercount",lambda :sum(len(layers) for layers in self._nodeToLayers.values()))
+
+    def _degree_arrays(self,nodelayers,strengths=True):
+        """Overrides parents method.
+        """
+        order=self.get_node_layers()
+        if self.aspects==0:
+            order=[(node,) for node in order]
+        position=dict((nl,k) for k,nl in enumerate(order))
+        positions=numpy.array([position[nl] for nl in nodelayers],dtype=numpy.int64)
+        arrays={}
+        for suffix,direction in [("","total"),("_in","in"),("_out","out")]:
+            arrays["deg"+suffix]=self.get_degree_vector(direction)[positions]
+            if strengths:
+                arrays["str"+suffix]=self.get_strength_vector(direction)[positions]
+        return arrays
+
+    def _find(self,indptr,indices,i,j):
+        """Returns the position of neighbor j of i in the indices array, or -1.
+        """
+        start,end=indptr[i],indptr[i+1]
+        k=start+numpy.searchsorted(indices[start:end],j)
+        if k<end and indices[k]==j:
+            return k
+        return -1
+
+    def _get_link(self,link):
+        """Overrides parents method.
+        """
+        node1,node2=self._link_to_nodes(link)
+        i,j=self._nlindex.get(node1),self._nlindex.get(node2)
+        if i is None or j is None:
+            return self.noEdge
+        k=self._find(self.indptr,self.indices,i,j)
+        if k<0:
+            return self.noEdge
+        return self.weights[k].item()
+
+    def _iter_links(self):
+        """Overrides parents method.
+        """
+        nodelayers=self._nodelayers
+        indptr,indices,weights=self.indptr,self.indices,self.weights
+        if not self.directed:
+            rank=self._get_product_ranks(nodelayers)
+        for i in range(len(nodelayers)):
+            node1=nodelayers[i]
+            start,end=indptr[i],indptr[i+1]
+            for j,w in zip(indices[start:end].tolist(),weights[start:end].tolist()):
+                if self.directed or rank[i]<=rank[j]:
+                    yield node1,nodelayers[j],w
+
+    def _iter_ids(self,indptr,indices,node,dims):
+        i=self._nlindex.get(node)
+        if i is not None:
+            nodelayers=self._nodelayers
+            if dims==None:
+                for j in indices[indptr[i]:indptr[i+1]].tolist():
+                    yield nodelayers[j]
+            else:
+                for j in indices[indptr[i]:indptr[i+1]].tolist():
+                    neigh=nodelayers[j]
+                    if all(map(lambda a:dims[a]==None or neigh[a]==dims[a], range(len(dims)))):
+                        yield neigh
+
+    def _iter_neighbors_out(self,node,dims=None):
+        """Overrides parents method.
+        """
+        return self._iter_ids(self.indptr,self.indices,node,dims)
+
+    def _iter_neighbors_in_dir(self,node,dims=None):
+        """Overrides parents method.
+        """
+        return self._iter_ids(self._rindptr,self._rindices,node,dims)
+
+    def _get_degree_out(self,node,dims=None):
+        """Overrides parents method.
+        """
+        if dims==None:
+            i=self._nlindex.get(node)
+            if i is None:
+                return 0
+            return int(self.indptr[i+1]-self.indptr[i])
+        return len(list(self._iter_neighbors_out(node,dims)))
+
+    def _get_degree_in_dir(self,node,dims=None):
+        """Overrides parents method.
+        """
+        if dims==None:
+            i=self._nlindex.get(node)
+            if i is None:
+                return 0
+            return int(self._rindptr[i+1]-self._rindptr[i])
+        return len(list(self._iter_neighbors_in(node,dims)))
+
+    def _get_degree_total_dir(self,node,dims=None):
+        """Overrides parents method.
+        """
+        if dims==None:
+            i=self._nlindex.get(node)
+            if i is None:
+                return 0
+            return len(numpy.union1d(self.indices[self.indptr[i]:self.indptr[i+1]],
+                                     self._rindices[self._rindptr[i]:self._rindptr[i+1]]))
+        return len(list(self._iter_neighbors_total(node,dims)))
+
+    def _get_strength_out(self,node,dims=None):
+        """Overrides parents method.
+        """
+        if dims==None:
+            i=self._nlindex.get(node)
+            if i is None:
+                return 0
+            return self.weights[self.indptr[i]:self.indptr[i+1]].sum().item()
+        return MultilayerNetwork._get_strength_out(self,node,dims)
+
+    def _get_strength_in_dir(self,node,dims=None):
+        """Overrides parents method.
+        """
+        if dims==None:
+            i=self._nlindex.get(node)
+            if i is None:
+                return 0
+            return self._rweights[self._rindptr[i]:self._rindptr[i+1]].sum().item()
+        return MultilayerNetwork._get_strength_in_dir(self,node,dims)
+
+    def _get_strength_total_dir(self,node,dims=None):
+        """Overrides parents method.
+        """
+        s=MultilayerNetwork._get_strength_total_dir(self,node,dims)
+        i=self._nlindex.get(node)
+        if dims==None and i is not None and self._couplingStrength is not None:
+            s-=self._couplingStrength[i].item()
+        return s
+
+    def get_supra_adjacency_matrix(self,includeCouplings=True,includeIntraLayer=True,sparse=False):
+        """Returns the supra-adjacency matrix and a list of node-layer pairs.
+
+        The matrix is filled directly from the CSR arrays, and the node-layers are
+        in the same order as for MultilayerNetwork objects.
+
+        Parameters
+        ----------
+        includeCoupings : bool
+           If True, the inter-layer edges are included, if False, only intra-layer
+           edges are included.
+        includeIntraLayer : bool
+           If True, the intra-layer edges are included, if False, only inter-layer
+           edges are included.
+        sparse : bool
+           If True, a scipy.sparse.csr_matrix is returned. This option requires SciPy.
+
+        Returns
+        -------
+        matrix, nodes : numpy.matrix or scipy.sparse.csr_matrix, list
+           The supra-adjacency matrix and the list of node-layer pairs. The order
+           of the elements in the list and the supra-adjacency matrix are the same.
+        """
+        nodes=self._get_supra_adjacency_nodes()
+        if self.aspects>0:
+            index=dict((nl,k) for k,nl in enumerate(nodes))
+            position=numpy.array([index[nl] for nl in self._nodelayers],dtype=numpy.int64)
+        else:
+            index=dict((node,k) for k,node in enumerate(nodes))
+            position=numpy.array([index[nl[0]] for nl in self._nodelayers],dtype=numpy.int64)
+
+        rows=numpy.repeat(numpy.arange(len(self._nodelayers)),numpy.diff(self.indptr))
+        cols=self.indices
+        weights=self.weights
+        if self.aspects==0:
+            keep=rows!=cols
+            if not includeIntraLayer:
+                keep[:]=False
+        else:
+            layers=dict((l,k) for k,l in enumerate(set(nl[1:] for nl in self._nodelayers)))
+            layer=numpy.array([layers[nl[1:]] for nl in self._nodelayers],dtype=numpy.int64)
+            intra=layer[rows]==layer[cols]
+            keep=numpy.zeros(len(rows),dtype=bool)
+            if includeIntraLayer:
+                keep|=intra
+            if includeCouplings:
+                keep|=~intra
+
+        if sparse:
+            import scipy.sparse
+            matrix=scipy.sparse.coo_matrix((weights[keep],(position[rows[keep]],position[cols[keep]])),shape=(len(nodes),len(nodes)),dtype=float)
+            return matrix.tocsr(),nodes
+        matrix=numpy.zeros((len(nodes),len(nodes)),dtype=float)
+        matrix[position[rows[keep]],position[cols[keep]]]=weights[keep]
+        return numpy.matrix(matrix),nodes
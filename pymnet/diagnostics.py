@@ -1,6 +1,53 @@
 from .net import MultilayerNetwork,MultiplexNetwork
 import heapq,itertools
 
+def degree_arrays(net,strengths=True):
+    """Returns the degrees and strengths of all the node-layers as NumPy arrays.
+
+    The arrays are computed in a single pass over the adjacency structure of 
+    the network. Requires NumPy.
+
+    Parameters
+    ----------
+    net : MultilayerNetwork
+       A multilayer network object.
+    strengths : bool
+       If False, only the degree arrays are computed, and the edge weights are
+       not read. Then the weights do not need to be numbers.
+
+    Returns
+    -------
+    nodelayers : list
+       The node-layer tuples (nodes if there are no aspects) in the order of the arrays.
+    arrays : dict
+       Arrays with keys 'deg', 'deg_in', 'deg_out', 'str', 'str_in' and 'str_out'. The
+       element k of an array is given by the corresponding method of net[nodelayers[k]], 
+       e.g., arrays['deg_in'][k]==net[nodelayers[k]].deg_in().
+    """
+    if net.aspects==0:
+        nodelayers=list(net)
+        arrays=net._degree_arrays([(node,) for node in nodelayers],strengths)
+    else:
+        nodelayers=list(net.iter_node_layers())
+        arrays=net._degree_arrays(nodelayers,strengths)
+    return nodelayers,arrays
+
+def multiplex_degree_arrays(net):
+    """Returns a dictionary of degree and strength arrays of each intra-layer network 
+    of a multiplex network. See degree_arrays.
+
+    Parameters
+    ----------
+    net : MultiplexNetwork
+       A multiplex network object.
+    """
+    assert isinstance(net,MultiplexNetwork) or hasattr(net,"A") #or a view of a multiplex network
+
+    d={}
+    for layer in net.iter_layers():
+        d[layer]=degree_arrays(net.A[layer])
+    return d
+
 def degs(net,degstype="distribution"):
     """Returns the degree distribution of a multilayer network.
 
@@ -19,20 +66,30 @@ def degs(net,degstype="distribution"):
        corresponding values are degrees of those nodes.
 
     """
-    if net.aspects==0:
-        the_iterator=net
+    if degstype not in ["distribution","nodes"]:
+        raise Exception("Invalid degstype parameter.")
+
+    try:
+        import numpy
+        nodelayers,arrays=degree_arrays(net,strengths=False)
+    except ImportError: #without NumPy the node-layers are gone through one by one
+        if net.aspects==0:
+            nodelayers=list(net)
+        else:
+            nodelayers=list(net.iter_node_layers())
+        degrees=[net[node].deg() for node in nodelayers]
     else:
-        the_iterator=net.iter_node_layers()
+        if degstype=="distribution":
+            values,counts=numpy.unique(arrays["deg"],return_counts=True)
+            return dict(zip(values.tolist(),counts.tolist()))
+        degrees=arrays["deg"].tolist()
+
     degs={}
     if degstype=="distribution":
-        for node in the_iterator:
-            d=net[node].deg()
+        for d in degrees:
             degs[d]=degs.get(d,0)+1
-    elif degstype=="nodes":
-        for node in the_iterator:
-            degs[node]=net[node].deg()
     else:
-        raise Exception("Invalid degstype parameter.")
+        degs=dict(zip(nodelayers,degrees))
     return degs
 
 def density(net):
@@ -40,32 +97,98 @@ def density(net):
 
     Density is defined as the number of edges in the network divided by the number
     of possible edges in a general multilayer network with the same set of nodes and
-    layers.
+    layers. Only the node-layers present in the network are counted if the network
+    is not fully interconnected. The numbers of edges and node-layers are not counted
+    from the network but maintained when it is changed.
     """
     if len(net)==0:
         return 0
 
-    if net.fullyInterconnected:        
-        nl=len(net.get_layers(0))
-        for a in range(net.aspects):
-            nl=nl*len(net.get_layers(a+1))
-        if net.directed:
-            pedges=nl*(nl-1)
-        else:
-            pedges=(nl*(nl-1))/2
-            
-    return len(net.edges)/float(pedges)
+    return _density(net._get_edge_count(),net._get_node_layer_count(),net.directed)
 
+def _density(edges,nodelayers,directed):
+    """Returns the density given the number of edges and node-layers (or nodes).
+    """
+    if directed:
+        pedges=nodelayers*(nodelayers-1)
+    else:
+        pedges=(nodelayers*(nodelayers-1))/2
+    if pedges==0:
+        return 0
+    return edges/float(pedges)
 
 def multiplex_density(net):
     """Returns a dictionary of densities of each intra-layer network of a multiplex network.
     """
-    assert isinstance(net,MultiplexNetwork)
+    assert isinstance(net,MultiplexNetwork) or hasattr(net,"A") #or a view of a multiplex network
     d={}
     for layer in net.iter_layers():
-        d[layer]=density(net.A[layer])
+        intranet=net.A[layer]
+        d[layer]=_density(intranet._get_edge_count(),len(intranet),net.directed) if len(intranet)>0 else 0
     return d
 
+def multiplex_density_matrix(net):
+    """Returns the densities of the intra-layer networks and of their overlaps 
+    as a matrix.
+
+    The diagonal element of a layer is the density of the intra-layer network
+    (see multiplex_density). The off-diagonal element of two layers is the number
+    of node pairs linked in both layers divided by the number of node pairs 
+    present in both layers. The links of all the layers are gone through once.
+    Requires NumPy.
+
+    Parameters
+    ----------
+    net : MultiplexNetwork
+       A multiplex network object.
+
+    Returns
+    -------
+    matrix : numpy.ndarray
+       The densities with a row and a column for each layer.
+    layers : list
+       The layers in the order of the rows and columns of the matrix.
+    """
+    import numpy
+    assert isinstance(net,MultiplexNetwork) or hasattr(net,"A") #or a view of a multiplex network
+    layers=list(net.iter_layers())
+    index=dict((layer,k) for k,layer in enumerate(layers))
+    L=len(layers)
+
+    #the layers of each linked node pair
+    pairLayers={}
+    for layer in layers:
+        k=index[layer]
+        for nl1,nl2,w in net.A[layer]._iter_links():
+            pair=(nl1[0],nl2[0])
+            if not net.directed and pair not in pairLayers and (nl2[0],nl1[0]) in pairLayers:
+                pair=(nl2[0],nl1[0]) #oriented as in an earlier layer
+            pairLayers.setdefault(pair,[]).append(k)
+    edges=numpy.zeros((L,L),dtype=numpy.int64)
+    for ks in pairLayers.values():
+        for k1 in ks:
+            edges[k1,ks]+=1
+
+    #the nodes shared by each pair of layers
+    if net.fullyInterconnected:
+        nodes=numpy.full((L,L),len(net),dtype=numpy.int64)
+    else:
+        nodes=numpy.zeros((L,L),dtype=numpy.int64)
+        nodeLayers={}
+        for layer in layers:
+            for node in net.A[layer]:
+                nodeLayers.setdefault(node,[]).append(index[layer])
+        for ks in nodeLayers.values():
+            for k1 in ks:
+                nodes[k1,ks]+=1
+
+    pedges=nodes*(nodes-1)
+    if not net.directed:
+        pedges=pedges/2
+    matrix=numpy.zeros((L,L),dtype=float)
+    numpy.divide(edges,pedges,out=matrix,where=pedges>0)
+    return matrix,layers
+
 def multiplex_degs(net,degstype="distribution"):
     """Returns a dictionary of degree distributions of each intra-layer network of a multiplex network.
     
@@ -81,7 +204,7 @@ def multiplex_degs(net,degstype="distribution"):
        corresponding values are degrees of those nodes.
 
     """
-    assert isinstance(net,MultiplexNetwork)
+    assert isinstance(net,MultiplexNetwork) or hasattr(net,"A") #or a view of a multiplex network
     
     d={}
     for layer in net.iter_layers():
@@ -92,39 +215,71 @@ def overlap_degs(net):
     """ Returns a dictionary of overlap degree distributions of each layer combination
     of a multiplex network.
 
-    The overlap degree distribution will contain every layer combination, including the
-    one where there is only a single layer, and the key of each of those is another
-    dictionary giving the overlap degrees of nodes.
+    The overlap degree distribution will contain every layer combination which has links,
+    including the ones where there is only a single layer, and the value of each of those
+    is another dictionary giving the overlap degrees of nodes. The other combinations are
+    not stored (and not iterated over), but looking them up gives the overlap degrees,
+    which are all zero. The layers of a combination are in the order of net.slices[1].
 
     The overlap degrees of nodes for a given layer combination give the number of links that
     are shared between exactly the layers in the combination. If the link is in an additional
     layer, or it is missing from one layer, then it is not included in the degree of the
-    corresponding layer combination.
+    corresponding layer combination. The weights of the links are not used.
+
+    The degrees are computed in one pass over the links, in time proportional to the number
+    of links times the number of layers.
     
     Parameters
     ----------
     net : MultiplexNetwork
        A multiplex network object.
     """
-    ol_degs = {}
-    nodes = net.slices[0]
-    layers = net.slices[1]
-    
-    net0 = subnet(net, nodes, layers)
-    
-    for n_l in range(len(layers), 0, -1):
-        for layer_comb in itertools.combinations(layers, n_l):
-            sub_net = subnet(net0, nodes, layer_comb)
-            agg_net = aggregate(sub_net, 1)
-            thr_net = threshold(agg_net, n_l)
-            ol_degs[layer_comb] = degs(thr_net, degstype='nodes')
-            
-            if n_l > 1:
-                for e in thr_net.edges:
-                    for layer in layer_comb:
-                        net0[e[0], e[1], layer] = 0
-                        
+    layers = list(net.slices[1])
+    masks = {} #key=link, val=bitmask of the layers of the link
+    for bit, layer in enumerate(layers):
+        for node1, node2, w in net.A[layer]._iter_links():
+            link = (node1[0], node2[0])
+            if not net.directed and link not in masks and (link[1], link[0]) in masks:
+                link = (link[1], link[0])
+            masks[link] = masks.get(link, 0) | (1 << bit)
+
+    if net.directed: #links in both directions between two nodes count once in the degrees
+        neighbor_pairs = set((frozenset(link), mask) for link, mask in masks.items())
+        masks = [(tuple(pair), mask) for pair, mask in neighbor_pairs]
+    else:
+        masks = masks.items()
+
+    counts = {} #key=bitmask, val=dict of nonzero overlap degrees of nodes
+    for (node1, node2), mask in masks:
+        mask_counts = counts.setdefault(mask, {})
+        mask_counts[node1] = mask_counts.get(node1, 0) + 1
+        mask_counts[node2] = mask_counts.get(node2, 0) + 1
+
+    nodes = list(net.slices[0])
+    ol_degs = _OverlapDegrees(layers, nodes)
+    combs = [(tuple(bit for bit in range(len(layers)) if (mask >> bit) & 1), mask) for mask in counts]
+    combs.sort(key=lambda comb: (-len(comb[0]), comb[0])) #larger combinations first, as before
+    for bits, mask in combs:
+        ol_degs[tuple(layers[bit] for bit in bits)] = dict((node, counts[mask].get(node, 0)) for node in nodes)
     return ol_degs
+
+class _OverlapDegrees(dict):
+    """Overlap degrees of the layer combinations which have links, see overlap_degs.
+
+    Looking up any other combination of the layers gives zero overlap degrees.
+    """
+    def __init__(self, layers, nodes):
+        dict.__init__(self)
+        self._bits = dict((layer, bit) for bit, layer in enumerate(layers))
+        self._nodes = nodes
+
+    def __missing__(self, layer_comb):
+        if not isinstance(layer_comb, tuple) or len(layer_comb) == 0 or any(layer not in self._bits for layer in layer_comb):
+            raise KeyError(layer_comb)
+        bits = [self._bits[layer] for layer in layer_comb]
+        if any(b1 >= b2 for b1, b2 in zip(bits, bits[1:])): #combinations are in the order of the layers
+            raise KeyError(layer_comb)
+        return dict((node, 0) for node in self._nodes)
     
 
 def dijkstra(net,sources):
@@ -159,57 +314,383 @@ def dijkstra(net,sources):
 
     return d,forest
 
+def dijkstra_arrays(net,sources,batch=False):
+    """Returns the shortest path distances and a shortest path forest as arrays.
+
+    The search runs on the integer ids of the node-layers. Networks with 
+    dictionaries of links are searched as they are, and other networks 
+    (e.g., multiplex networks) are searched in their frozen form. If there are
+    several shortest paths to a node-layer, only one of them is in the forest.
+    Requires NumPy.
+
+    Parameters
+    ----------
+    net : MultilayerNetwork
+    sources : iterable
+       The source node-layers (nodes if there are no aspects).
+    batch : bool
+       If False, the shortest paths from any of the sources are searched at once.
+       If True, a separate search is done for each source.
+
+    Returns
+    -------
+    distances : numpy.ndarray
+       The distance of each node-layer from the sources, inf if it cannot be reached.
+    predecessors : numpy.ndarray
+       The index of the previous node-layer in a shortest path to each node-layer,
+       and -1 for the sources and the node-layers which cannot be reached.
+    nodelayers : list
+       The node-layers (nodes if there are no aspects) in the order of their 
+       indices in the arrays.
+
+    If batch is True, the arrays have a row for each source.
+    """
+    import numpy
+    nodelayers,nlindex,neighbors=_weighted_id_adjacency(net)
+
+    sourceIds=[]
+    for s in sources:
+        nl=(s,) if net.aspects==0 else tuple(s)
+        if nl not in nlindex: #a node-layer without links
+            nlindex[nl]=len(nodelayers)
+            nodelayers.append(nl)
+        sourceIds.append(nlindex[nl])
+
+    if batch:
+        results=[_dijkstra_ids(len(nodelayers),neighbors,[i]) for i in sourceIds]
+    else:
+        results=[_dijkstra_ids(len(nodelayers),neighbors,sourceIds)]
+    distances=numpy.array([dist for dist,pred in results],dtype=numpy.float64).reshape((len(results),len(nodelayers)))
+    predecessors=numpy.array([pred for dist,pred in results],dtype=numpy.int64).reshape((len(results),len(nodelayers)))
+
+    if net.aspects==0:
+        nodelayers=[nl[0] for nl in nodelayers]
+    if batch:
+        return distances,predecessors,nodelayers
+    return distances[0],predecessors[0],nodelayers
+
+def _weighted_id_adjacency(net):
+    """Returns the node-layers with links, their ids, and a function giving the 
+    (id,weight) pairs of the out-neighbors of an id.
+    """
+    if hasattr(net,"_idToNl"): #dict-based networks already have ids for node-layers with links
+        nodelayers,nlindex=list(net._idToNl),dict(net._nlToId)
+        adjacency=net._net
+        neighbors=lambda i:adjacency[i].items() if i in adjacency else ()
+    else:
+        fnet=net.freeze()
+        nodelayers,nlindex=list(fnet._nodelayers),dict(fnet._nlindex)
+        indptr,indices,weights=fnet.indptr.tolist(),fnet.indices.tolist(),fnet.weights.tolist()
+        neighbors=lambda i:zip(indices[indptr[i]:indptr[i+1]],weights[indptr[i]:indptr[i+1]]) if i+1<len(indptr) else ()
+    return nodelayers,nlindex,neighbors
+
+def _dijkstra_ids(n,neighbors,sources):
+    """Dijkstra's algorithm for node-layer ids from 0 to n-1. The neighbors function 
+    gives the (id,weight) pairs of the out-neighbors of an id. Returns the lists
+    of distances and predecessors.
+    """
+    inf=float("inf")
+    dist=[inf]*n
+    pred=[-1]*n
+    done=bytearray(n)
+    for s in sources:
+        dist[s]=0
+    queue=[(0,s) for s in set(sources)]
+    heapq.heapify(queue)
+    heappop,heappush=heapq.heappop,heapq.heappush
+    while queue:
+        d,i=heappop(queue)
+        if done[i]:
+            continue
+        done[i]=1
+        for j,w in neighbors(i):
+            nd=d+w
+            if nd<dist[j]:
+                dist[j]=nd
+                pred[j]=i
+                heappush(queue,(nd,j))
+    return dist,pred
+
+def iter_distance_blocks(net,sources=None,aaspects=None,processes=1,blockSize=64):
+    """Computes the shortest path distances from many sources in blocks of rows
+    of a distance matrix.
+
+    The searches are done with dijkstra_arrays on a frozen snapshot of the
+    network. If several processes are used, the arrays of the snapshot are put
+    in shared memory which the worker processes read, and the blocks are given
+    in the order they are finished. Requires NumPy.
+
+    Parameters
+    ----------
+    net : MultilayerNetwork
+    sources : iterable, None
+       The source node-layers (nodes if there are no aspects), or None for all
+       the node-layers. Sources which are not in the network are added as 
+       node-layers without links, as in dijkstra_arrays.
+    aaspects : list of ints, None
+       If given, the distances do not depend on the elementary layers of these
+       aspects, as in dijkstra_mlayer_prune. The sources are then given with None
+       in these aspects, and the columns are node-layers in which these aspects 
+       are left out.
+    processes : int, None
+       The number of worker processes. If 1, the distances are computed in this
+       process. If None, the number of CPUs is used.
+    blockSize : int
+       The number of sources in each block.
+
+    Returns
+    -------
+    columns : list
+       The node-layers in the order of the columns of the blocks.
+    blocks : iterator
+       The (start,block) pairs, where block is a numpy.ndarray containing the 
+       distances from the sources start,...,start+len(block)-1 to the columns.
+       Unreachable node-layers are at distance inf.
+
+    See also
+    --------
+    all_pairs_distances
+    """
+    import numpy
+    fnet=net.freeze()
+    nodelayers=list(fnet._nodelayers)
+    n=len(nodelayers)
+
+    if aaspects is None:
+        columnIndex,columns=None,[nl[0] for nl in nodelayers] if net.aspects==0 else nodelayers
+        if sources is None:
+            groups=[[i] for i in range(n)]
+        else:
+            nlindex=dict(fnet._nlindex)
+            groups=[]
+            for s in sources:
+                nl=(s,) if net.aspects==0 else tuple(s)
+                if nl not in nlindex: #a node-layer without links
+                    nlindex[nl]=len(nodelayers)
+                    nodelayers.append(nl)
+                groups.append([nlindex[nl]])
+            columns=[nl[0] for nl in nodelayers] if net.aspects==0 else nodelayers
+    else:
+        keep=[a for a in range(net.aspects+1) if a not in aaspects]
+        project=lambda nl:tuple(nl[a] for a in keep)
+        columnIds={}
+        columnIndex=numpy.array([columnIds.setdefault(project(nl),len(columnIds)) for nl in nodelayers],dtype=numpy.int64)
+        columns=sorted(columnIds,key=columnIds.get)
+        if sources is None:
+            sources=[tuple(nl[a] if a in keep else None for a in range(net.aspects+1)) for nl in columns]
+        byProjection={}
+        for i,nl in enumerate(nodelayers):
+            byProjection.setdefault(project(nl),[]).append(i)
+        groups=[byProjection.get(project(s),[]) for s in sources]
+
+    tasks=[(start,groups[start:start+blockSize]) for start in range(0,len(groups),blockSize)]
+    indptr=fnet.indptr
+    if len(nodelayers)>n: #the added node-layers have no links
+        indptr=numpy.concatenate((indptr,numpy.repeat(indptr[-1:],len(nodelayers)-n)))
+    arrays=(indptr,fnet.indices,fnet.weights,columnIndex,len(columns))
+    if processes==1: #the generator keeps its own copy of the state
+        state=_distance_state(arrays)
+        return columns,(_distance_block(state,task) for task in tasks)
+    return columns,_iter_pool_distance_blocks(arrays,tasks,processes)
+
+def all_pairs_distances(net,sources=None,aaspects=None,processes=1,blockSize=64,out=None):
+    """Returns the matrix of shortest path distances from the sources to all node-layers.
+
+    See iter_distance_blocks for the parameters and the way the distances are
+    computed.
+
+    Parameters
+    ----------
+    out : str, None
+       If given, the matrix is written to a NumPy file with this name, and a 
+       numpy.memmap of the file is returned. Use this when the matrix does not fit
+       in the memory.
+
+    Returns
+    -------
+    matrix : numpy.ndarray, or numpy.memmap
+       The distances with a row for each source and a column for each node-layer.
+    columns : list
+       The node-layers in the order of the columns.
+    """
+    import numpy
+    if sources is not None:
+        sources=list(sources)
+    columns,blocks=iter_distance_blocks(net,sources=sources,aaspects=aaspects,processes=processes,blockSize=blockSize)
+    if sources is None:
+        rows=len(columns)
+    else:
+        rows=len(sources)
+    if out is None:
+        matrix=numpy.empty((rows,len(columns)),dtype=numpy.float64)
+    else:
+        matrix=numpy.lib.format.open_memmap(out,mode="w+",dtype=numpy.float64,shape=(rows,len(columns)))
+    for start,block in blocks:
+        matrix[start:start+len(block)]=block
+    if out is not None:
+        matrix.flush()
+    return matrix,columns
+
+def _iter_pool_distance_blocks(arrays,tasks,processes):
+    """Gives the blocks of distances computed in a pool of worker processes 
+    which read the network from shared memory.
+    """
+    import multiprocessing
+    import numpy
+    try:
+        from multiprocessing import shared_memory
+    except ImportError: #the arrays are copied to each worker
+        shared,shareable=[],arrays
+    else:
+        shared,shareable=[],list(arrays)
+        for k,a in enumerate(arrays[:3]):
+            memory=shared_memory.SharedMemory(create=True,size=max(a.nbytes,1))
+            shared.append(memory)
+            numpy.ndarray(a.shape,dtype=a.dtype,buffer=memory.buf)[:]=a
+            shareable[k]=(memory.name,a.shape,a.dtype.str)
+    pool=multiprocessing.Pool(processes,_init_distance_worker,(shareable,))
+    try:
+        for block in pool.imap_unordered(_distance_worker,tasks):
+            yield block
+    finally:
+        pool.terminate()
+        pool.join()
+        for memory in shared:
+            memory.close()
+            memory.unlink()
+
+_distanceWorker={} #state of a worker process, set by _init_distance_worker
+
+def _init_distance_worker(arrays):
+    import numpy
+    indptr,indices,weights,columnIndex,ncolumns=arrays
+    if isinstance(indptr,tuple): #shared memory blocks
+        from multiprocessing import shared_memory
+        memories=[shared_memory.SharedMemory(name=name) for name,shape,dtype in (indptr,indices,weights)]
+        indptr,indices,weights=[numpy.ndarray(shape,dtype=dtype,buffer=memory.buf) for memory,(name,shape,dtype) in zip(memories,(indptr,indices,weights))]
+        _distanceWorker["memories"]=memories
+    _distanceWorker["state"]=_distance_state((indptr,indices,weights,columnIndex,ncolumns))
+
+def _distance_worker(task):
+    return _distance_block(_distanceWorker["state"],task)
+
+def _distance_state(arrays):
+    """Returns the arrays with the row offsets as a list. The offsets are small, 
+    and the edge arrays are not copied.
+    """
+    indptr,indices,weights,columnIndex,ncolumns=arrays
+    return indptr.tolist(),indices,weights,columnIndex,ncolumns
+
+def _distance_block(state,task):
+    """Returns the block of distances from the groups of source ids.
+    """
+    import numpy
+    start,groups=task
+    offsets,indices,weights,columnIndex,ncolumns=state
+    n=len(offsets)-1
+    def neighbors(i):
+        a,b=offsets[i],offsets[i+1]
+        return zip(indices[a:b].tolist(),weights[a:b].tolist())
+    block=numpy.empty((len(groups),ncolumns),dtype=numpy.float64)
+    for row,group in enumerate(groups):
+        dist,pred=_dijkstra_ids(n,neighbors,group)
+        if columnIndex is None:
+            block[row]=dist
+        else:
+            block[row]=numpy.inf
+            numpy.minimum.at(block[row],columnIndex,dist)
+    return start,block
+
 def dijkstra_mlayer_prune(net,sources,aaspects):
-    nsources=[]
-    for s in sources:    
-        layers=[]
-        for a in range(net.aspects+1):
-            if a in aaspects:
-                assert s[a]==None
-                layers.append(list(net.slices[a]))                
-            else:
-                layers.append([s[a]])
-        for nl in itertools.product(*layers):
-            if net[nl].deg()>0:
-                nsources.append(nl)
-                
-    d,forest=dijkstra(net,nsources)
-
-    def select_aspects(nl,aaspects):
-        nnl=[]
-        for a in range(len(nl)):
-            if a not in aaspects:
-                nnl.append(nl[a])
-        return tuple(nnl)
+    """Returns the shortest path distances between nodes when the layers of some 
+    aspects do not matter.
 
-    nd={}
-    #for nl,dist in d.iteritems():
-    for nl in d:
-        dist=d[nl]
-        nnl=select_aspects(nl,aaspects)
-        if nnl not in nd or nd[nnl]>dist:
-            nd[nnl]=dist
+    A path to a node (or a node-layer in the remaining aspects) can end in any of
+    its node-layers, and the source is any of the node-layers of the source node
+    which have links. The distances are collapsed onto the remaining aspects
+    during the search, and the search stops when the distance to every node is
+    known. The search runs on the integer ids of the node-layers without 
+    recursion, see dijkstra_arrays. Requires NumPy.
 
+    Parameters
+    ----------
+    net : MultilayerNetwork
+    sources : iterable
+       The source node-layers, with None in the aggregated aspects.
+    aaspects : list of ints
+       The aggregated aspects.
 
-    def build_path(otree,ntree,node):
-        for neigh in otree[node].iter_in():
-            ntree[neigh][node]=otree[neigh][node]
-            if ntree[neigh].deg_in()==0:
-                build_path(otree,ntree,neigh)
+    Returns
+    -------
+    distances : dict
+       Keys are the node-layers in the remaining aspects and values are their 
+       distances from the sources.
+    forest : tuple of (list, numpy.ndarray, numpy.ndarray)
+       The shortest paths ending in the node-layers which are closest to the 
+       sources among the node-layers of the same node. The node-layers (nodes if 
+       there are no aspects) in the paths, the index of the previous node-layer
+       in the path to each of them (-1 for the sources), and their distances.
+    """
+    import numpy
+    nodelayers,nlindex,neighbors=_weighted_id_adjacency(net)
+    keep=[a for a in range(net.aspects+1) if a not in aaspects]
+    project=lambda nl:tuple(nl[a] for a in keep)
 
-    nforest=MultilayerNetwork(aspects=net.aspects,
-                             fullyInterconnected=False,
-                             directed=True,
-                             noEdge=-1)
+    sourceProjections=set()
+    for s in sources:
+        assert all(s[a]==None for a in aaspects)
+        sourceProjections.add(project(s))
+    projections=set()
+    sourceIds=[]
+    for i,nl in enumerate(nodelayers):
+        p=project(nl)
+        projections.add(p)
+        if p in sourceProjections:
+            sourceIds.append(i)
 
-    #for nl,dist in d.iteritems():
-    for nl in d:
-        dist=d[nl]
-        nnl=select_aspects(nl,aaspects)
-        if nd[nnl]==d[nl]:
-            build_path(forest,nforest,nl)
+    n=len(nodelayers)
+    inf=float("inf")
+    dist=[inf]*n
+    pred=[-1]*n
+    done=bytearray(n)
+    for i in sourceIds:
+        dist[i]=0
+    queue=[(0,i) for i in sourceIds]
+    heappop,heappush=heapq.heappop,heapq.heappush
+    nd={}
+    last=inf #distance at which the distances to all nodes are known
+    closest=[] #ids of the node-layers at the distance of their node
+    while queue:
+        d,i=heappop(queue)
+        if d>last:
+            break
+        if done[i]:
+            continue
+        done[i]=1
+        p=project(nodelayers[i])
+        if p not in nd:
+            nd[p]=d
+            if len(nd)==len(projections):
+                last=d
+        if nd[p]==d:
+            closest.append(i)
+        for j,w in neighbors(i):
+            ndist=d+w
+            if ndist<dist[j]:
+                dist[j]=ndist
+                pred[j]=i
+                heappush(queue,(ndist,j))
 
-                        
-    return nd,nforest
+    inforest=bytearray(n)
+    for i in closest: #walk back the paths until a node-layer already in the forest
+        while i>=0 and not inforest[i]:
+            inforest[i]=1
+            i=pred[i]
+    ids=[i for i in range(n) if inforest[i]]
+    index=dict((i,k) for k,i in enumerate(ids))
+    predecessors=numpy.array([index[pred[i]] if pred[i]>=0 else -1 for i in ids],dtype=numpy.int64)
+    distances=numpy.array([dist[i] for i in ids],dtype=numpy.float64)
+    forestNodelayers=[nodelayers[i][0] if net.aspects==0 else nodelayers[i] for i in ids]
+    return nd,(forestNodelayers,predecessors,distances)
 
 
@@ -66,7 +66,7 @@ def orbit_counts_all(net, n, nets, invs, auts, orbit_list, allowed_aspects='all'
             
         processed.add(node0)
         for node_comb in node_sets:
-            sub_net = pymnet.subnet(net, node_comb, layers)
+            sub_net = pymnet.subnet(net, node_comb, layers, view=True)
             ci_sub = str(pymnet.get_complete_invariant(sub_net, allowed_aspects=allowed_aspects))
             if ci_sub not in invs:
                 raise KeyError('The network contains a graphlet not found in the pre-constructed complete invariant dictionary (invs). This can be caused by invs creation not being compatible with the attributes of the network. For example, the network might not be fully interconnected.')
@@ -170,7 +170,7 @@ def orbit_counts(n, node0, net, nets, orbits, auts, invs, orbit_list, allowed_as
     layers = net.slices[1]
     node_sets = touching_orbit_nodes(node0, net, n)
     for nodes_s in node_sets:
-        sub_net = pymnet.subnet(net, nodes_s, layers)
+        sub_net = pymnet.subnet(net, nodes_s, layers, view=True)
         ci_sub = str(pymnet.get_complete_invariant(sub_net, allowed_aspects=allowed_aspects))
         i = invs[ci_sub][1]
         n_nodes = invs[ci_sub][0]
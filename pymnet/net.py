@@ -1,7 +1,7 @@
 """Data structures for handling various forms of multilayer networks.
 """
 
-import math,itertools,pickle
+import math,itertools,pickle,copy
 import pymnet.transforms as transforms
 
 #Pre 3.10                                                                                                                                                                                                  
@@ -20,6 +20,11 @@ except ImportError:
 
 COLON=slice(None,None,None)
 
+#If True, the counters maintained by the network objects (e.g., the number of edges)
+#are checked against a full recount every time they are read. This is slow, and
+#meant to be used in the tests.
+CHECK_COUNTERS=False
+
 
 class MultilayerNetwork(object):
     """General multilayer network with a tensor-like interface.
@@ -71,6 +76,11 @@ class MultilayerNetwork(object):
     all the inter-layer links is not possible without inspecting also the
     inter-layer links.
 
+    Internally the node-layer tuples are interned to dense integer ids, and
+    the nested dictionaries are keyed by these ids. The elementary layers of
+    each aspect (including the nodes) are also given dense integer ids. The
+    tuples are only used at the level of the public interface.
+
     References
     ----------
     [1] Multilayer Networks. Mikko Kivela, Alexandre Arenas, Marc Barthelemy, 
@@ -99,11 +109,19 @@ class MultilayerNetwork(object):
         self._init_directions()
 
         #Private variables for the state of the object
-        self._net={}
+        self._net={} #key=node-layer id, val=dict with key=node-layer id and val=weight
+        self._nlToId={} #key=node-layer tuple, val=node-layer id
+        self._idToNl=[] #node-layer tuples in the order of their ids
+        self._labelToId=[{} for a in range(aspects+1)] #key=elementary layer, val=id
+        self._idToLabel=[[] for a in range(aspects+1)] #elementary layers in the order of their ids
+        self._edgeCount=0
+        self._layerIndex=None #optional, see enable_layer_index
+        self._rlayerIndex=None
 
         if not fullyInterconnected:
             self._layerToNodes={} #key=layer,val=set of nodes
             self._nodeToLayers={} #key=node, val=set of layers
+            self._nodeLayerCount=0
 
         if self.directed:
             self._rnet={} #reversed network
@@ -169,6 +187,23 @@ class MultilayerNetwork(object):
 
         return tuple(l)
     
+    def _intern(self,nl):
+        """Returns the id of the node-layer tuple, giving it a new id if needed.
+        """
+        i=self._nlToId.get(nl)
+        if i is None:
+            i=len(self._idToNl)
+            self._nlToId[nl]=i
+            self._idToNl.append(nl)
+            for a,elayer in enumerate(nl):
+                if elayer not in self._labelToId[a]:
+                    self._labelToId[a][elayer]=len(self._idToLabel[a])
+                    self._idToLabel[a].append(elayer)
+            self._net[i]={}
+            if self.directed:
+                self._rnet[i]={}
+        return i
+
     def __len__(self):
         return len(self.slices[0])
 
@@ -222,7 +257,9 @@ class MultilayerNetwork(object):
         """
         if node not in self._nodeToLayers:
             self._nodeToLayers[node]=set()
-        self._nodeToLayers[node].add(layer)
+        if layer not in self._nodeToLayers[node]:
+            self._nodeToLayers[node].add(layer)
+            self._nodeLayerCount+=1
         if layer not in self._layerToNodes:
             self._layerToNodes[layer]=set()
         self._layerToNodes[layer].add(node)
@@ -258,39 +295,52 @@ class MultilayerNetwork(object):
         link(tuple) : (i,j,s_1,r_1, ... ,s_d,r_d)
         """
         node1,node2=self._link_to_nodes(link)
-        if node1 in self._net:
-            if node2 in self._net[node1]:
-                return self._net[node1][node2]
+        i=self._nlToId.get(node1)
+        if i is not None:
+            j=self._nlToId.get(node2)
+            if j is not None:
+                return self._net[i].get(j,self.noEdge)
         return self.noEdge
 
     def _set_link(self,link,value):
-        #keep track of nodes and layers in net?
         node1,node2=self._link_to_nodes(link)
         if value==self.noEdge:
-            if node1 in self._net:
-                if node2 in self._net[node1]:
-                    if self.directed:
-                        if node1==node2 and node2 in self._net[node1]:
-                            self._totalDegree[node1]=self._totalDegree.get(node1,0)-1
-                        else:
-                            if node1 not in self._rnet or node2 not in self._rnet[node1]:
-                                self._totalDegree[node1]=self._totalDegree[node1]-1
-                            if node2 not in self._rnet or node1 not in self._rnet[node2]:
-                                self._totalDegree[node2]=self._totalDegree[node2]-1
-                        del self._rnet[node2][node1]
-                    else:
-                        del self._net[node2][node1]
-                    del self._net[node1][node2]
+            i,j=self._nlToId.get(node1),self._nlToId.get(node2)
+            if i is not None and j is not None:
+                self._set_link_ids(i,j,value)
         else:
-            if not node1 in self._net:
-                self._net[node1]={}
-                if self.directed:
-                    self._rnet[node1]={}
-            if not node2 in self._net:
-                self._net[node2]={}
-                if self.directed:
-                    self._rnet[node2]={}            
+            self._set_link_ids(self._intern(node1),self._intern(node2),value)
+
+    def _set_link_ids(self,node1,node2,value):
+        """Sets the weight of a link between two interned node-layers.
 
+        Parameters
+        ----------
+        node1,node2 : int
+           The node-layer ids.
+        """
+        if value==self.noEdge:
+            if node2 in self._net[node1]:
+                self._edgeCount-=1
+                if self._layerIndex is not None:
+                    self._update_layer_index(node1,node2,self._layer_index_remove)
+                if self.directed:
+                    if node1==node2:
+                        self._totalDegree[node1]=self._totalDegree.get(node1,0)-1
+                    else:
+                        if node2 not in self._rnet[node1]:
+                            self._totalDegree[node1]=self._totalDegree[node1]-1
+                        if node1 not in self._net[node2]:
+                            self._totalDegree[node2]=self._totalDegree[node2]-1
+                    del self._rnet[node2][node1]
+                elif node1!=node2:
+                    del self._net[node2][node1]
+                del self._net[node1][node2]
+        else:
+            if node2 not in self._net[node1]:
+                self._edgeCount+=1
+                if self._layerIndex is not None:
+                    self._update_layer_index(node1,node2,self._layer_index_add)
             if self.directed:
                 if node1==node2 and node2 not in self._net[node1]:
                     self._totalDegree[node1]=self._totalDegree.get(node1,0)+1
@@ -305,6 +355,93 @@ class MultilayerNetwork(object):
             self._net[node1][node2]=value
 
 
+    def _get_node_layer_count(self):
+        """Returns the number of node-layers in the network (nodes if there are
+        no aspects) without going through them.
+        """
+        if self.fullyInterconnected:
+            count=1
+            for elayers in self.slices:
+                count*=len(elayers)
+            return count
+        return self._nodeLayerCount
+
+    def _get_edge_count(self):
+        """Returns the number of edges in the network.
+        """
+        return self._edgeCount
+
+    def _iter_links(self):
+        """Iterates over the edges as (node-layer, node-layer, weight) triples.
+
+        Only the node-layers with edges are visited. Each undirected edge is 
+        given once, starting from the node-layer which comes first when the 
+        node-layers are ordered as in itertools.product(*self.slices).
+        """
+        idToNl=self._idToNl
+        if self.directed:
+            for i,neighbors in self._net.items():
+                node1=idToNl[i]
+                for j,w in neighbors.items():
+                    yield node1,idToNl[j],w
+        else:
+            rank=self._get_product_ranks(idToNl)
+            for i,neighbors in self._net.items():
+                node1=idToNl[i]
+                for j,w in neighbors.items():
+                    if rank[i]<=rank[j]:
+                        yield node1,idToNl[j],w
+
+    def _get_product_ranks(self,nodelayers):
+        """Returns a list giving for each node-layer in the list a key which orders
+        the node-layers as in itertools.product(*self.slices).
+        """
+        order=[dict((l,k) for k,l in enumerate(s)) for s in self.slices]
+        return [tuple(order[a].get(e,-1) for a,e in enumerate(nl))+(i,) for i,nl in enumerate(nodelayers)]
+
+    def enable_layer_index(self):
+        """Starts maintaining an index of the neighbors of each node-layer by
+        the layers of the neighbors.
+
+        Without the index, sliced queries such as net[i,:,s,r] go through all
+        the neighbors of the node-layer (i,s). With the index, iterating over
+        the neighbors in layer r and asking their number takes time proportional
+        to the number of those neighbors. The index is kept up to date when links
+        are added or removed, and it roughly doubles the memory used for storing
+        the links.
+
+        Does nothing if the index is already enabled.
+        """
+        if self._layerIndex is None:
+            self._layerIndex={}
+            if self.directed:
+                self._rlayerIndex={}
+            for node1,neighbors in self._net.items():
+                for node2 in neighbors:
+                    self._layer_index_add(self._layerIndex,node1,node2)
+                    if self.directed:
+                        self._layer_index_add(self._rlayerIndex,node2,node1)
+
+    def _update_layer_index(self,node1,node2,update):
+        update(self._layerIndex,node1,node2)
+        if self.directed:
+            update(self._rlayerIndex,node2,node1)
+        elif node1!=node2:
+            update(self._layerIndex,node2,node1)
+
+    def _layer_index_add(self,index,node1,node2):
+        layer=self._idToNl[node2][1:]
+        index.setdefault(node1,{}).setdefault(layer,set()).add(node2)
+
+    def _layer_index_remove(self,index,node1,node2):
+        layer=self._idToNl[node2][1:]
+        layers=index[node1]
+        layers[layer].remove(node2)
+        if len(layers[layer])==0:
+            del layers[layer]
+            if len(layers)==0:
+                del index[node1]
+
     def _get_degree(self,node,dims=None):
         if self.directed:
             return self._get_degree_total(node,dims=dims)
@@ -329,36 +466,36 @@ class MultilayerNetwork(object):
 
         See _iter_neighbors for description of the parameters.
         """
-        #TODO: lookuptables for intradimensional degrees
-
-        if dims==None:
-            if node in self._net:
-                return len(self._net[node])
-            else:
-                return 0
+        i=self._nlToId.get(node)
+        if i is not None:
+            return len(self._neighbor_ids(self._net,self._layerIndex,i,dims))
         else:
-            return len(list(self._iter_neighbors_out(node,dims)))
+            return 0
 
     def _get_degree_total_dir(self,node,dims=None):
         """Returns the total degree of a _directed_ multilayer network.
         """
         assert self.directed
         if dims==None:
-            return self._totalDegree.get(node,0)
+            return self._totalDegree.get(self._nlToId.get(node),0)
         else:
-            return len(list(self._iter_neighbors_total(node,dims)))
+            i=self._nlToId.get(node)
+            if i is not None:
+                neighbors=set(self._neighbor_ids(self._net,self._layerIndex,i,dims))
+                neighbors.update(self._neighbor_ids(self._rnet,self._rlayerIndex,i,dims))
+                return len(neighbors)
+            else:
+                return 0
 
     def _get_degree_in_dir(self,node,dims=None):
         """Returns the in-degree of a _directed_ multilayer network.
         """
         assert self.directed
-        if dims==None:
-            if node in self._rnet:
-                return len(self._rnet[node])
-            else:
-                return 0
+        i=self._nlToId.get(node)
+        if i is not None:
+            return len(self._neighbor_ids(self._rnet,self._rlayerIndex,i,dims))
         else:
-            return len(list(self._iter_neighbors_in(node,dims)))
+            return 0
 
 
 
@@ -391,6 +528,62 @@ class MultilayerNetwork(object):
         """Private method returning nodes total strenght (sum of in- and out-strength)."""
         return self._get_strength_in(node,dims)+self._get_strength_out(node,dims)
 
+    def _degree_arrays(self,nodelayers,strengths=True):
+        """Returns the degrees and strengths of the given node-layer tuples as a
+        dict of NumPy arrays with keys 'deg', 'deg_in', 'deg_out', 'str', 'str_in' 
+        and 'str_out' corresponding to the methods of MultilayerNode. If strengths
+        is False, only the degrees are given and the edge weights are not read.
+
+        The neighbor dicts of each node-layer are read once, and the degrees are
+        their sizes.
+        """
+        import numpy
+        empty={}
+        ids=[self._nlToId.get(nl) for nl in nodelayers]
+        out=[self._net[i] if i is not None else empty for i in ids]
+        arrays={"deg_out":numpy.array([len(neighbors) for neighbors in out],dtype=numpy.int64)}
+        if strengths:
+            arrays["str_out"]=numpy.array([sum(neighbors.values()) for neighbors in out])
+        if self.directed:
+            rout=[self._rnet[i] if i is not None else empty for i in ids]
+            arrays["deg_in"]=numpy.array([len(neighbors) for neighbors in rout],dtype=numpy.int64)
+            arrays["deg"]=numpy.array([self._totalDegree.get(i,0) for i in ids],dtype=numpy.int64)
+            if strengths:
+                arrays["str_in"]=numpy.array([sum(neighbors.values()) for neighbors in rout])
+                arrays["str"]=arrays["str_in"]+arrays["str_out"]
+        else:
+            arrays["deg"]=arrays["deg_in"]=arrays["deg_out"]
+            if strengths:
+                arrays["str"]=arrays["str_in"]=arrays["str_out"]
+        return arrays
+
+    def _link_degree_arrays(self,nodelayers,strengths=True):
+        """Returns the same arrays as _degree_arrays by going through the links once.
+        """
+        import numpy
+        index=dict((nl,k) for k,nl in enumerate(nodelayers))
+        n=len(nodelayers)
+        links=[(index[nl1],index[nl2],w) for nl1,nl2,w in self._iter_links()]
+        sources=numpy.array([link[0] for link in links],dtype=numpy.int64)
+        targets=numpy.array([link[1] for link in links],dtype=numpy.int64)
+        if strengths:
+            weights=numpy.array([link[2] for link in links])
+        count=lambda ids,w=None:numpy.bincount(ids,weights=w,minlength=n)
+        if self.directed:
+            pairs=numpy.unique(numpy.minimum(sources,targets)*n+numpy.maximum(sources,targets))
+            first,second=pairs//n,pairs%n
+            arrays={"deg_out":count(sources),"deg_in":count(targets),"deg":count(first)+count(second[first!=second])}
+            if strengths:
+                arrays["str_out"],arrays["str_in"]=count(sources,weights),count(targets,weights)
+                arrays["str"]=arrays["str_in"]+arrays["str_out"]
+        else:
+            other=sources!=targets #self-edges are counted once
+            arrays={"deg":count(sources)+count(targets[other])}
+            arrays["deg_in"]=arrays["deg_out"]=arrays["deg"]
+            if strengths:
+                arrays["str"]=arrays["str_in"]=arrays["str_out"]=count(sources,weights)+count(targets[other],weights[other])
+        return arrays
+
 
     def _iter_neighbors(self,node,dims=None):
         if self.directed:
@@ -421,25 +614,40 @@ class MultilayerNetwork(object):
                'a' and in slice 'x' in the second dimension.
 
         """
-        if node in self._net:
-            if dims==None:
-                for neigh in self._net[node]:
-                    yield neigh
-            else:
-                for neigh in self._net[node]:
-                    if all(map(lambda i:dims[i]==None or neigh[i]==dims[i], range(len(dims)))):
-                        yield neigh
+        return self._iter_neighbor_ids(self._net,self._layerIndex,node,dims)
 
     def _iter_neighbors_in_dir(self,node,dims=None):
         """Iterate over out-neighbors of a node in a directed network."""
-        if node in self._rnet:
-            if dims==None:
-                for neigh in self._rnet[node]:
-                    yield neigh
-            else:
-                for neigh in self._rnet[node]:
-                    if all(map(lambda i:dims[i]==None or neigh[i]==dims[i], range(len(dims)))):
-                        yield neigh
+        return self._iter_neighbor_ids(self._rnet,self._rlayerIndex,node,dims)
+
+    def _iter_neighbor_ids(self,adjacency,index,node,dims):
+        """Iterates over neighbors in the given adjacency dict, translating the
+        ids back to node-layer tuples."""
+        i=self._nlToId.get(node)
+        if i is not None:
+            idToNl=self._idToNl
+            for j in self._neighbor_ids(adjacency,index,i,dims):
+                yield idToNl[j]
+
+    def _neighbor_ids(self,adjacency,index,i,dims):
+        """Returns a collection of the ids of the neighbors of node-layer i in
+        the given adjacency dict that match dims (see _iter_neighbors_out).
+
+        If dims fixes all the layers but not the node, the layer index is used
+        when it is enabled. Otherwise the neighbors are filtered one by one.
+        """
+        if dims==None:
+            return adjacency[i]
+        fixed=[(a,elayer) for a,elayer in enumerate(dims) if elayer!=None]
+        if len(fixed)==len(dims): #a single neighbor
+            j=self._nlToId.get(tuple(dims))
+            if j is not None and j in adjacency[i]:
+                return (j,)
+            return ()
+        if index is not None and len(fixed)==len(dims)-1 and dims[0]==None:
+            return index.get(i,{}).get(tuple(dims[1:]),())
+        idToNl=self._idToNl
+        return [j for j in adjacency[i] if all(idToNl[j][a]==elayer for a,elayer in fixed)]
 
     def _iter_neighbors_total_dir(self,node,dims=None):
         """Iterate over in- and out-neighbors of a node in a directed network."""
@@ -451,6 +659,43 @@ class MultilayerNetwork(object):
             if neigh not in iterated:
                 yield neigh
 
+    def _node_to_nodelayer(self,node):
+        """Returns the node-layer tuple used internally for a node given to the
+        public interface.
+        """
+        if self.aspects==0:
+            return (node,)
+        return tuple(node)
+
+    def degree_of(self,node):
+        """Returns the degree of a node (or a node-layer if there are aspects).
+
+        This is equivalent to net[node].deg(), but no MultilayerNode object is
+        created.
+        """
+        return self._get_degree(self._node_to_nodelayer(node))
+
+    def strength_of(self,node):
+        """Returns the strength of a node (or a node-layer if there are aspects).
+
+        This is equivalent to net[node].str(), but no MultilayerNode object is
+        created.
+        """
+        return self._get_strength(self._node_to_nodelayer(node))
+
+    def neighbors_of(self,node):
+        """Iterates over the neighbors of a node (or a node-layer if there are aspects).
+
+        This is equivalent to iterating over net[node], but no MultilayerNode
+        object is created.
+        """
+        if self.aspects==0:
+            for neigh in self._iter_neighbors((node,)):
+                yield neigh[0]
+        else:
+            for neigh in self._iter_neighbors(tuple(node)):
+                yield neigh
+
     def __getitem__(self,item):
         """
         aspects=1
@@ -546,6 +791,104 @@ class MultilayerNetwork(object):
 
         self._set_link(link,val)
 
+    def add_edges_from(self,edges=None,sources=None,targets=None,layers=None,targetLayers=None,weights=1):
+        """Adds edges to the network in bulk.
+
+        The edges can be given either as an iterable of edge tuples, or as columns
+        of sources, targets, layers and weights. The nodes and layers are added to
+        the network once for the whole batch, and the edges are written directly
+        to the underlying data structure. The result is the same as setting each 
+        edge with net[edge[:-1]]=edge[-1].
+
+        Parameters
+        ----------
+        edges : iterable
+           Edge tuples (i,j,s_1,r_1, ... ,s_d,r_d,w) as produced by iterating over 
+           net.edges, or (i,j,s_1, ... ,s_d,w) for intra-layer edges.
+        sources, targets : sequence
+           Columns of source and target nodes, used if edges is None.
+        layers : sequence
+           A column of (elementary) layers of the sources for each aspect.
+        targetLayers : sequence
+           A column of (elementary) layers of the targets for each aspect. If None,
+           the layers of the targets are the same as those of the sources.
+        weights : sequence or object
+           A column of edge weights, or a single weight for all the edges.
+
+        Examples
+        --------
+        >>> net=MultilayerNetwork(aspects=1)
+        >>> net.add_edges_from([(1,2,'a','a',1),(2,3,'a','b',2)])
+        >>> net.add_edges_from(sources=[1,2],targets=[3,3],layers=[['a','b']])
+        """
+        self._add_links(self._iter_bulk_links(edges,sources,targets,layers,targetLayers,weights))
+
+    def _iter_bulk_links(self,edges,sources,targets,layers,targetLayers,weights):
+        """Iterates over (node1,node2,weight) for the parameters of add_edges_from.
+        """
+        d=self.aspects+1
+        if edges is not None:
+            for edge in edges:
+                if len(edge)==2*d+1:
+                    yield (edge[0],)+tuple(edge[2:-1:2]),(edge[1],)+tuple(edge[3:-1:2]),edge[-1]
+                elif len(edge)==d+2:
+                    yield (edge[0],)+tuple(edge[2:-1]),(edge[1],)+tuple(edge[2:-1]),edge[-1]
+                else:
+                    raise KeyError("Invalid number of indices.")
+        else:
+            def column(c):
+                return c.tolist() if hasattr(c,"tolist") else c
+            if layers is None:
+                layers=[]
+            if len(layers)!=self.aspects or (targetLayers is not None and len(targetLayers)!=self.aspects):
+                raise KeyError("Please give layers for each aspect.")
+            layers=list(map(column,layers))
+            targetLayers=layers if targetLayers is None else list(map(column,targetLayers))
+            if hasattr(weights,"__len__") and not isinstance(weights,str):
+                weights=column(weights)
+            else:
+                weights=itertools.repeat(weights)
+            sourceNls=zip(column(sources),*layers)
+            targetNls=zip(column(targets),*targetLayers)
+            for node1,node2,w in zip(sourceNls,targetNls,weights):
+                yield node1,node2,w
+
+    def _add_links(self,links):
+        """Sets the weights of (node1,node2,weight) triples, where the nodes are
+        node-layer tuples. The nodes and layers are added once per batch.
+        """
+        nlToId=self._nlToId
+        intern=self._intern
+        set_link_ids=self._set_link_ids
+        noEdge=self.noEdge
+        firstNewId=len(self._idToNl)
+        unknown=set()
+        for node1,node2,w in links:
+            if w==noEdge:
+                i,j=nlToId.get(node1),nlToId.get(node2)
+                if i is not None and j is not None:
+                    set_link_ids(i,j,w)
+                else:
+                    unknown.add(node1)
+                    unknown.add(node2)
+            else:
+                i=nlToId.get(node1)
+                if i is None:
+                    i=intern(node1)
+                j=nlToId.get(node2)
+                if j is None:
+                    j=intern(node2)
+                set_link_ids(i,j,w)
+
+        #There might be new nodes, add them to sets of nodes
+        newNls=unknown.union(self._idToNl[firstNewId:])
+        if self.fullyInterconnected:
+            for a in range(self.aspects+1):
+                for elayer in set(nl[a] for nl in newNls):
+                    self.add_layer(elayer,a)
+        else:
+            for nl in newNls:
+                self.add_node(nl[0],layer=nl[1] if self.aspects==1 else nl[1:])
 
 
     def get_layers(self,aspect=1):
@@ -620,7 +963,84 @@ class MultilayerNetwork(object):
     def __hash__(self):
         return pickle.dumps(self).__hash__()
 
-    def get_supra_adjacency_matrix(self,includeCouplings=True):
+    def freeze(self):
+        """Returns a read-only snapshot of the network.
+
+        The snapshot is a CSRMultilayerNetwork, which stores the edges in arrays
+        and caches derived data such as degree vectors, aggregated networks and
+        the hash value. Coupling edges of multiplex networks are stored explicitly.
+        Later changes to this network are not reflected in the snapshot. This
+        method requires NumPy.
+
+        See also
+        --------
+        pymnet.csrnet.CSRMultilayerNetwork
+        """
+        from .csrnet import CSRMultilayerNetwork
+        return CSRMultilayerNetwork(self)
+
+    def _copy(self):
+        """Returns a copy of the network. The adjacency dicts are copied as
+        they are, i.e., the node-layers keep their ids and the links are not 
+        inserted one by one.
+        """
+        new=copy.copy(self)
+        new.slices=[set(elayers) for elayers in self.slices]
+        new._net=dict((i,dict(neighbors)) for i,neighbors in self._net.items())
+        new._nlToId=dict(self._nlToId)
+        new._idToNl=list(self._idToNl)
+        new._labelToId=[dict(ids) for ids in self._labelToId]
+        new._idToLabel=[list(labels) for labels in self._idToLabel]
+        if not self.fullyInterconnected:
+            new._nodeToLayers=dict((node,set(layers)) for node,layers in self._nodeToLayers.items())
+            new._layerToNodes=dict((layer,set(nodes)) for layer,nodes in self._layerToNodes.items())
+        if self.directed:
+            new._rnet=dict((i,dict(neighbors)) for i,neighbors in self._rnet.items())
+            new._totalDegree=dict(self._totalDegree)
+        if self._layerIndex is not None:
+            new._layerIndex=self._copy_layer_index(self._layerIndex,lambda layer:layer)
+            if self.directed:
+                new._rlayerIndex=self._copy_layer_index(self._rlayerIndex,lambda layer:layer)
+        return new
+
+    @staticmethod
+    def _copy_layer_index(index,relabel_layer):
+        return dict((i,dict((relabel_layer(layer),set(ids)) for layer,ids in layers.items())) for i,layers in index.items())
+
+    def _relabel(self,maps):
+        """Renames the nodes and elementary layers in place. 
+
+        The maps are dicts from old names to new names, one for the nodes and one
+        for each aspect, and names missing from them are kept. The maps must 
+        not give the same name to two nodes or elementary layers of an aspect.
+
+        The links are stored by node-layer ids, which are kept, so that only the
+        tables between the ids and the names are rebuilt. The time taken is
+        proportional to the number of node-layers instead of the number of links.
+        """
+        for a,m in enumerate(maps):
+            newLabels=[m.get(label,label) for label in self.slices[a]]
+            self.slices[a].clear()
+            self.slices[a].update(newLabels)
+            self._idToLabel[a]=[m.get(label,label) for label in self._idToLabel[a]]
+            self._labelToId[a]=dict(zip(self._idToLabel[a],range(len(self._idToLabel[a]))))
+        self._idToNl=[tuple(maps[a].get(e,e) for a,e in enumerate(nl)) for nl in self._idToNl]
+        self._nlToId=dict(zip(self._idToNl,range(len(self._idToNl))))
+
+        if self.aspects==1:
+            relabel_layer=lambda layer:maps[1].get(layer,layer)
+        else:
+            relabel_layer=lambda layer:tuple(maps[a+1].get(e,e) for a,e in enumerate(layer))
+        if not self.fullyInterconnected:
+            self._nodeToLayers=dict((maps[0].get(node,node),set(map(relabel_layer,layers))) for node,layers in self._nodeToLayers.items())
+            self._layerToNodes=dict((relabel_layer(layer),set(maps[0].get(node,node) for node in nodes)) for layer,nodes in self._layerToNodes.items())
+        if self._layerIndex is not None: #the index is keyed by layer tuples
+            relabel_tuple=lambda layer:tuple(maps[a+1].get(e,e) for a,e in enumerate(layer))
+            self._layerIndex=self._copy_layer_index(self._layerIndex,relabel_tuple)
+            if self.directed:
+                self._rlayerIndex=self._copy_layer_index(self._rlayerIndex,relabel_tuple)
+
+    def get_supra_adjacency_matrix(self,includeCouplings=True,includeIntraLayer=True,sparse=False):
         """Returns the supra-adjacency matrix and a list of node-layer pairs.
 
         Parameters
@@ -628,31 +1048,77 @@ class MultilayerNetwork(object):
         includeCoupings : bool
            If True, the inter-layer edges are included, if False, only intra-layer
            edges are included.
+        includeIntraLayer : bool
+           If True, the intra-layer edges are included, if False, only inter-layer
+           edges are included.
+        sparse : bool
+           If True, a scipy.sparse.csr_matrix is returned. The sparse matrix is built
+           from the edges in time proportional to the number of edges, and missing
+           edges are zeros regardless of the noEdge value of the network. This
+           option requires SciPy.
 
         Returns
         -------
-        matrix, nodes : numpy.matrix, list
+        matrix, nodes : numpy.matrix or scipy.sparse.csr_matrix, list
            The supra-adjacency matrix and the list of node-layer pairs. The order
            of the elements in the list and the supra-adjacency matrix are the same.
         """
+        nodes=self._get_supra_adjacency_nodes()
+        if sparse:
+            return self._get_sparse_supra_adjacency_matrix(nodes,includeCouplings,includeIntraLayer),nodes
+
         import numpy
         if self.aspects>0:
-            nodes=list(map(lambda x: tuple(reversed(x)),sorted(itertools.product(*map(lambda i:sorted(self.slices[i]),reversed(range(len(self.slices))))))))
             matrix=numpy.zeros((len(nodes),len(nodes)),dtype=float)
             for i_index,i in enumerate(nodes):
                 for j_index,j in enumerate(nodes):
-                    if includeCouplings or i[1:]==j[1:]:
+                    if includeCouplings if i[1:]!=j[1:] else includeIntraLayer:
                         matrix[i_index,j_index]=self[i][j]
         else:
-            nodes=sorted(self)
             matrix=numpy.zeros((len(nodes),len(nodes)),dtype=float)
-            for i_index,i in enumerate(nodes):
-                for j_index,j in enumerate(nodes):
-                    if i_index!=j_index:
-                        matrix[i_index,j_index]=self[i][j]
+            if includeIntraLayer:
+                for i_index,i in enumerate(nodes):
+                    for j_index,j in enumerate(nodes):
+                        if i_index!=j_index:
+                            matrix[i_index,j_index]=self[i][j]
 
         return numpy.matrix(matrix),nodes
 
+    def _get_supra_adjacency_nodes(self):
+        """Returns the node-layers (or nodes if there are no aspects) in the order
+        of the rows of the supra-adjacency matrix.
+        """
+        if self.aspects>0:
+            return list(map(lambda x: tuple(reversed(x)),sorted(itertools.product(*map(lambda i:sorted(self.slices[i]),reversed(range(len(self.slices))))))))
+        else:
+            return sorted(self)
+
+    def _get_sparse_supra_adjacency_matrix(self,nodes,includeCouplings,includeIntraLayer):
+        import scipy.sparse
+        if self.aspects>0:
+            index=dict((nl,k) for k,nl in enumerate(nodes))
+        else:
+            index=dict(((node,),k) for k,node in enumerate(nodes))
+        rows,cols,data=[],[],[]
+        for nl1,nl2,w in self._iter_supra_adjacency_entries(includeCouplings,includeIntraLayer):
+            if self.aspects>0 or nl1!=nl2:
+                rows.append(index[nl1])
+                cols.append(index[nl2])
+                data.append(w)
+        return scipy.sparse.coo_matrix((data,(rows,cols)),shape=(len(nodes),len(nodes)),dtype=float).tocsr()
+
+    def _iter_supra_adjacency_entries(self,includeCouplings,includeIntraLayer):
+        """Iterates over the non-zero elements of the supra-adjacency matrix as
+        (node-layer, node-layer, weight) triples.
+        """
+        idToNl=self._idToNl
+        for i,neighbors in self._net.items():
+            nl1=idToNl[i]
+            for j,w in neighbors.items():
+                nl2=idToNl[j]
+                if includeCouplings if nl1[1:]!=nl2[1:] else includeIntraLayer:
+                    yield nl1,nl2,w
+
 class MultilayerNode(object):
     """A node in a MultilayerNetwork. 
 
@@ -661,6 +1127,8 @@ class MultilayerNode(object):
     the neighboring edges can be iterated over by iterating the node, and the object
     contains methods for asking degree and strength of the node.
     """
+    __slots__=("node","mnet","layers")
+
     #net[1,'a','x'][:,:,'y']=net[1,:,'a',:,'x','y']
     def __init__(self,node,mnet,layers=None):
         """A node in multilayer network. 
@@ -753,9 +1221,6 @@ class MultilayerNode(object):
     def __iter__(self):
         return self.iter_total()
 
-    def layers(self,*layers):
-        return MultilayerNode(self.node,self.mnet,layers=layers)
-
     def iter_total(self):
         for node in self._iter_nodes(self.mnet._iter_neighbors_total):
             yield node
@@ -778,32 +1243,65 @@ class MultilayerNode(object):
 
 
 
-class MultilayerEdges:
+class MultilayerEdges(object):
+    __slots__=("net",)
+
     def __init__(self,net):
         self.net=net
 
     def __iter__(self):
         """Edge iterator.
         """
-        if self.net.directed:
-            for node in itertools.product(*self.net.slices):
-                for neigh in self.net[node].iter_out():                
-                    if self.net.aspects==0:
-                        neigh=(neigh,)
-                    link=self.net._nodes_to_link(node,neigh)
-                    yield link+(self.net[link],)
+        if self.net.aspects==0:
+            for node1,node2,w in self.net._iter_links():
+                yield (node1[0],node2[0],w)
         else:
-            iterated=set()
-            for node in itertools.product(*self.net.slices):
-                for neigh in self.net[node]:                
-                    if self.net.aspects==0:
-                        neigh=(neigh,)
-                    if neigh not in iterated:
-                        link=self.net._nodes_to_link(node,neigh)
-                        yield link+(self.net[link],)            
-                iterated.add(node)
+            for node1,node2,w in self.net._iter_links():
+                yield tuple(itertools.chain(*zip(node1,node2)))+(w,)
+
+    def to_arrays(self):
+        """Returns the edges as NumPy arrays. Requires NumPy.
+
+        Returns
+        -------
+        links : numpy.ndarray
+           Integer array with a row (i,j,s_1,r_1, ... ,s_d,r_d) for each edge,
+           where the nodes and elementary layers are given as integer codes. 
+        weights : numpy.ndarray
+           The edge weights in the same order as the links.
+        labels : list of lists
+           The code of a node is its index in labels[0], and the code of an 
+           elementary layer of aspect a is its index in labels[a].
+        """
+        import numpy
+        aspects=self.net.aspects
+        labels=[[] for a in range(aspects+1)]
+        codes=[{} for a in range(aspects+1)]
+        def encode(a,label):
+            code=codes[a].get(label)
+            if code is None:
+                code=codes[a][label]=len(labels[a])
+                labels[a].append(label)
+            return code
+
+        links,weights=[],[]
+        for node1,node2,w in self.net._iter_links():
+            for a in range(aspects+1):
+                links.append(encode(a,node1[a]))
+                links.append(encode(a,node2[a]))
+            weights.append(w)
+        links=numpy.array(links,dtype=numpy.int64).reshape((len(weights),2*(aspects+1)))
+        return links,numpy.array(weights),labels
 
     def __len__(self):
+        count=self.net._get_edge_count()
+        if CHECK_COUNTERS:
+            assert count==self._recount(), "Edge counter %d, recount %d."%(count,self._recount())
+        return count
+
+    def _recount(self):
+        """Counts the edges by going through all the node-layers.
+        """
         deg=0
         if self.net.directed:
             for nl in self.net.iter_node_layers():
@@ -846,6 +1344,12 @@ class MultiplexIntraNetDict(MutableMapping):
         pass
 
     def _add_empty_network(self,layer):
+        if layer in self._dict:
+            oldNet=self._dict[layer]
+            self._net._intraEdgeCount-=oldNet._edgeCount
+            if not self._net.fullyInterconnected:
+                for node in oldNet.slices[0]:
+                    self._net._remove_node_from_layer(node,layer)
         net=MultilayerNetworkWithParent(aspects=0,directed=self._net.directed)
         net._set_parent(self._net)
         if not self._net.fullyInterconnected:
@@ -868,6 +1372,18 @@ class MultilayerNetworkWithParent(MultilayerNetwork):
             self._layer=name[0]
         else:
             self._layer=name
+    def _set_link_ids(self,node1,node2,value):
+        count=self._edgeCount
+        MultilayerNetwork._set_link_ids(self,node1,node2,value)
+        self.parent._intraEdgeCount+=self._edgeCount-count
+
+    def _relabel(self,maps):
+        nodes=self.slices[0]
+        if self.parent.fullyInterconnected:
+            self.slices[0]=set() #the nodes are shared with the parent, which renames them
+        MultilayerNetwork._relabel(self,maps)
+        self.slices[0]=nodes
+
     def add_node(self,node,layer=None):
         MultilayerNetwork.add_node(self,node,layer=layer)
         if self.parent.fullyInterconnected:
@@ -875,11 +1391,6 @@ class MultilayerNetworkWithParent(MultilayerNetwork):
         else:
             self.parent.add_node(node,layer=self._layer)            
 
-        if not self.parent.fullyInterconnected:
-            if node not in self.parent._nodeToLayers:
-                 self.parent._nodeToLayers[node]=set()
-            self.parent._nodeToLayers[node].add(self._layer)
-
 
 class MultiplexNetwork(MultilayerNetwork):
     """Multiplex network as a special case of multilayer network.
@@ -929,6 +1440,12 @@ class MultiplexNetwork(MultilayerNetwork):
         self.fullyInterconnected=fullyInterconnected
         if not fullyInterconnected:
             self._nodeToLayers={}
+            self._nodeLayerCount=0
+            #key=(aspect,node,layers in the other aspects), val=set of elementary layers in the aspect
+            self._couplingGroups={}
+
+        #Counters for the number of edges
+        self._intraEdgeCount=0
 
         coupling_types=["categorical","ordinal","none"]
         self.couplings=[]
@@ -959,6 +1476,8 @@ class MultiplexNetwork(MultilayerNetwork):
             raise ValueError("Invalid coupling type: "+str(type(couplings)))
 
         self._init_slices(self.aspects)
+        self._ordinalPairs=[0 for a in range(self.aspects)] #consecutive elementary layers in each aspect
+        self._couplingEdgeCount=[0 for a in range(self.aspects)] #if not fully interconnected
         
         #diagonal elements, map with keys as tuples of slices and vals as MultiSliceNetwork objects
         #keys are not tuples if dimensions==2
@@ -1007,6 +1526,11 @@ class MultiplexNetwork(MultilayerNetwork):
             if aspect==0:
                 self.add_node(layer)
             else:
+                if self._ordinalPairs[aspect-1]!=None:
+                    try:
+                        self._ordinalPairs[aspect-1]+=int(layer-1 in self.slices[aspect])+int(layer+1 in self.slices[aspect])
+                    except TypeError: #layers are not numbers
+                        self._ordinalPairs[aspect-1]=None
                 self.slices[aspect].add(layer)
             #call parent method
             #MultilayerNetwork.add_layer(self,layer,aspect)
@@ -1044,6 +1568,8 @@ class MultiplexNetwork(MultilayerNetwork):
                         return self.noEdge
                 elif isinstance(coupling[0],MultilayerNetwork):
                     return self.couplings[d[0]-1][0][link[2*d[0]],link[2*d[0]+1]]
+                elif coupling[0]=="none":
+                    return self.noEdge
                 else:
                     raise Exception("Coupling not implemented: "+str(coupling))
             else:
@@ -1067,31 +1593,243 @@ class MultiplexNetwork(MultilayerNetwork):
             raise KeyError("Can only set links in the node dimension.")
 
 
+    def add_edges_from(self,edges=None,sources=None,targets=None,layers=None,targetLayers=None,weights=1):
+        """Adds intra-layer edges to the network in bulk.
+
+        Overrides parents method. The edges are grouped by layer and added to 
+        the intra-layer networks in one batch per layer. See 
+        MultilayerNetwork.add_edges_from for the parameters.
+        """
+        batches={}
+        for node1,node2,w in self._iter_bulk_links(edges,sources,targets,layers,targetLayers,weights):
+            layer=node1[1:]
+            if layer!=node2[1:]:
+                raise KeyError("Can only set links in the node dimension.")
+            elif node1[0]==node2[0]:
+                raise KeyError("No self-links.")
+            if layer not in batches:
+                batches[layer]=[]
+            batches[layer].append((node1[:1],node2[:1],w))
+
+        for layer in batches:
+            for aspect,elayer in enumerate(layer):
+                self.add_layer(elayer,aspect+1)
+            self._get_A_with_tuple(layer)._add_links(batches[layer])
+
+    def _get_edge_count(self):
+        """Overrides parents method.
+
+        The coupling edges are counted from the numbers of nodes and layers if 
+        the couplings are categorical or ordinal.
+        """
+        couplingCount=0
+        for aspect in range(1,self.aspects+1):
+            coupling_type=self.couplings[aspect-1][0]
+            if coupling_type=="none":
+                pass
+            elif self.fullyInterconnected and coupling_type=="categorical":
+                layers=len(self.slices[aspect])
+                couplingCount+=self._count_other_node_layers(aspect)*(layers*(layers-1)//2)
+            elif self.fullyInterconnected and coupling_type=="ordinal" and self._ordinalPairs[aspect-1]!=None:
+                couplingCount+=self._count_other_node_layers(aspect)*self._ordinalPairs[aspect-1]
+            elif not self.fullyInterconnected and coupling_type in ["categorical","ordinal"] and self._couplingEdgeCount[aspect-1]!=None:
+                couplingCount+=self._couplingEdgeCount[aspect-1]
+            else:
+                return self.edges._recount()
+        if self.directed: #coupling edges go in both directions
+            couplingCount=2*couplingCount
+        return self._intraEdgeCount+couplingCount
+
+    def enable_layer_index(self):
+        """Does nothing, because multiplex networks already store the links of
+        each layer separately.
+        """
+        pass
+
+    def _copy(self):
+        """Overrides parents method.
+        """
+        new=MultiplexNetwork(couplings=self.couplings,directed=self.directed,noEdge=self.noEdge,fullyInterconnected=self.fullyInterconnected)
+        new.slices=[set(elayers) for elayers in self.slices]
+        new._ordinalPairs=list(self._ordinalPairs)
+        new._couplingEdgeCount=list(self._couplingEdgeCount)
+        new._intraEdgeCount=self._intraEdgeCount
+        if not self.fullyInterconnected:
+            new._nodeToLayers=dict((node,set(layers)) for node,layers in self._nodeToLayers.items())
+            new._nodeLayerCount=self._nodeLayerCount
+            new._couplingGroups=dict((key,set(group)) for key,group in self._couplingGroups.items())
+        for layer,intranet in self.A.items():
+            newIntranet=intranet._copy()
+            newIntranet._set_parent(new)
+            new.A._dict[layer]=newIntranet
+        return new
+
+    def _relabel(self,maps):
+        """Overrides parents method.
+        """
+        if self.aspects==1:
+            relabel_layer=lambda layer:maps[1].get(layer,layer)
+        else:
+            relabel_layer=lambda layer:tuple(maps[a+1].get(e,e) for a,e in enumerate(layer))
+
+        for a,m in enumerate(maps):
+            newLabels=[m.get(label,label) for label in self.slices[a]]
+            self.slices[a].clear()
+            self.slices[a].update(newLabels)
+            if a>0:
+                if isinstance(self.couplings[a-1][0],MultilayerNetwork):
+                    self.couplings[a-1]=(transforms.relabel(self.couplings[a-1][0],nodeNames=m),)
+                try:
+                    self._ordinalPairs[a-1]=sum(int(label+1 in self.slices[a]) for label in self.slices[a])
+                except TypeError: #layers are not numbers
+                    self._ordinalPairs[a-1]=None
+
+        intranets={}
+        for layer,intranet in self.A.items():
+            intranet._relabel(maps[:1])
+            layer=relabel_layer(layer)
+            if not self.fullyInterconnected:
+                intranet._set_name((layer,) if self.aspects==1 else layer)
+            intranets[layer]=intranet
+        self.A._dict=intranets
+
+        if not self.fullyInterconnected:
+            nodeToLayers=self._nodeToLayers
+            self._nodeToLayers={}
+            self._couplingGroups={}
+            self._couplingEdgeCount=[0 for a in range(self.aspects)]
+            for node,layers in nodeToLayers.items():
+                node=maps[0].get(node,node)
+                self._nodeToLayers[node]=set()
+                for layer in layers:
+                    layer=relabel_layer(layer)
+                    self._nodeToLayers[node].add(layer)
+                    self._update_coupling_groups(node,layer,True)
+
+    def _iter_supra_adjacency_entries(self,includeCouplings,includeIntraLayer):
+        """Overrides parents method.
+        """
+        if includeIntraLayer:
+            for layer in self.iter_layers():
+                layerTuple=layer if self.aspects>1 else (layer,)
+                for nl1,nl2,w in self.A[layer]._iter_supra_adjacency_entries(includeCouplings,includeIntraLayer):
+                    yield nl1+layerTuple,nl2+layerTuple,w
+        if includeCouplings:
+            for nl in self.iter_node_layers():
+                for aspect in range(1,self.aspects+1):
+                    for nl2 in self._iter_dim(nl,aspect,direction="out"):
+                        yield nl,nl2,self._get_link(self._nodes_to_link(nl,nl2))
+
+    def _iter_links(self):
+        """Overrides parents method.
+
+        The intra-layer edges are given by the intra-layer networks. Each 
+        undirected coupling edge is given once, starting from the elementary 
+        layer that was added to the network first.
+        """
+        return itertools.chain(self._iter_intra_links(),
+                               self._iter_coupling_links(range(1,self.aspects+1)))
+
+    def _iter_intra_links(self):
+        """Iterates over the intra-layer edges as (node-layer, node-layer, weight) triples.
+        """
+        for layer in self.iter_layers():
+            layerTuple=layer if self.aspects>1 else (layer,)
+            for node1,node2,w in self.A[layer]._iter_links():
+                yield node1+layerTuple,node2+layerTuple,w
+
+    def _iter_coupling_links(self,aspects):
+        """Iterates over the coupling edges of the given aspects as (node-layer, 
+        node-layer, weight) triples.
+        """
+        aspects=[aspect for aspect in aspects if self.couplings[aspect-1][0]!="none"]
+        if len(aspects)==0:
+            return
+        order=[dict((l,k) for k,l in enumerate(self.slices[a])) for a in range(self.aspects+1)]
+        for nl in self.iter_node_layers():
+            for aspect in aspects:
+                for nl2 in self._iter_dim(nl,aspect,direction="out"):
+                    if self.directed or order[aspect][nl[aspect]]<order[aspect][nl2[aspect]]:
+                        yield nl,nl2,self._get_link(self._nodes_to_link(nl,nl2))
+
+    def _count_other_node_layers(self,aspect):
+        """Returns the number of node-layers when the given aspect is left out.
+        """
+        n=len(self.slices[0])
+        for a in range(1,self.aspects+1):
+            if a!=aspect:
+                n*=len(self.slices[a])
+        return n
+
+    def _get_coupling_group(self,supernode,aspect):
+        """Returns the set of elementary layers in the given aspect in which the
+        node is present when the layers in the other aspects are kept fixed, or
+        None if the node-layer is not in the network. Network must not be 
+        node-aligned.
+        """
+        key=(aspect,supernode[0])+supernode[1:aspect]+supernode[aspect+1:]
+        group=self._couplingGroups.get(key)
+        if group is not None and supernode[aspect] in group:
+            return group
+        return None
+
+    def _count_group_neighbors(self,group,elayer,aspect):
+        """Returns the number of coupling neighbors elementary layer elayer has
+        in the given coupling group, or None if they are not counted.
+        """
+        coupling_type=self.couplings[aspect-1][0]
+        if coupling_type=="categorical":
+            return len(group)-int(elayer in group)
+        elif coupling_type=="ordinal":
+            try:
+                return int(elayer+1 in group)+int(elayer-1 in group)
+            except TypeError: #layers are not numbers
+                return None
+        return 0
+
+    def _update_coupling_groups(self,node,layer,add):
+        """Adds the node-layer to (or removes it from) the coupling groups, and
+        updates the numbers of coupling edges. Network must not be node-aligned.
+        """
+        if self.aspects==1:
+            layer=(layer,)
+        for aspect in range(1,self.aspects+1):
+            key=(aspect,node)+layer[:aspect-1]+layer[aspect:]
+            group=self._couplingGroups.get(key)
+            if group is None:
+                group=self._couplingGroups[key]=set()
+            elayer=layer[aspect-1]
+            if not add:
+                group.remove(elayer)
+            pairs=self._count_group_neighbors(group,elayer,aspect)
+            if pairs==None:
+                self._couplingEdgeCount[aspect-1]=None
+            elif self._couplingEdgeCount[aspect-1]!=None:
+                self._couplingEdgeCount[aspect-1]+=pairs if add else -pairs
+            if add:
+                group.add(elayer)
+            elif len(group)==0:
+                del self._couplingGroups[key]
+
     def _get_dim_degree(self,supernode,aspect,direction="tot"):
         coupling_type=self.couplings[aspect-1][0]
         if coupling_type=="categorical":
             if self.fullyInterconnected:
                 return len(self.slices[aspect])-1
             else:
-                if self.aspects>1:
-                    layer=supernode[1:]
-                else:
-                    layer=supernode[1]
-                if layer in self._nodeToLayers[supernode[0]]:
-                    if self.aspects==1:
-                        return len(self._nodeToLayers[supernode[0]])-1
-                    else:
-                        return len(filter(lambda x:x[aspect]==supernode[aspect],self._nodeToLayers[supernode[0]])) -1
-                else:
-                    return 0
+                group=self._get_coupling_group(supernode,aspect)
+                return len(group)-1 if group is not None else 0
         elif coupling_type=="ordinal":
             up,down=supernode[aspect]+1,supernode[aspect]-1
             if self.fullyInterconnected:
                 return int(up in self.slices[aspect])+int(down in self.slices[aspect])
             else:
-                return int(supernode[:aspect]+(up,)+supernode[aspect+1:] in self._nodeToLayers[supernode[0]])+int(supernode[:aspect]+(down,)+supernode[aspect+1:] in self._nodeToLayers[supernode[0]])
+                group=self._get_coupling_group(supernode,aspect)
+                return int(up in group)+int(down in group) if group is not None else 0
         elif isinstance(coupling_type,MultilayerNetwork):
-            if direction=="tot":
+            if not self.fullyInterconnected:
+                return len(list(self._iter_dim(supernode,aspect,direction=direction)))
+            elif direction=="tot":
                 return self.couplings[aspect-1][0][supernode[aspect]].deg_total()
             elif direction=="in":
                 return self.couplings[aspect-1][0][supernode[aspect]].deg_in()
@@ -1103,10 +1841,20 @@ class MultiplexNetwork(MultilayerNetwork):
             raise Exception("Coupling '"+str(coupling_type)+"' not implemented.")
 
     def _get_dim_strength(self,node,aspect,direction="tot"):
-        coupling_str=self.couplings[aspect-1][1]
         coupling_type=self.couplings[aspect-1][0]
-        if isinstance(coupling_type,MultilayerNetwork):
-            raise Exception() #please implement this
+        if coupling_type=="none":
+            return 0
+        elif isinstance(coupling_type,MultilayerNetwork):
+            if direction=="tot":
+                s=self._get_dim_strength(node,aspect,direction="out")
+                if coupling_type.directed:
+                    s+=self._get_dim_strength(node,aspect,direction="in")
+                return s
+            elif direction=="in":
+                return sum(coupling_type[n[aspect],node[aspect]] for n in self._iter_dim(node,aspect,direction="in"))
+            else:
+                return sum(coupling_type[node[aspect],n[aspect]] for n in self._iter_dim(node,aspect,direction="out"))
+        coupling_str=self.couplings[aspect-1][1]
         return self._get_dim_degree(node,aspect,direction=direction)*coupling_str
 
 
@@ -1117,30 +1865,45 @@ class MultiplexNetwork(MultilayerNetwork):
                 for n in self.slices[aspect]:
                     if n!=supernode[aspect]:                    
                         yield supernode[:aspect]+(n,)+supernode[aspect+1:]
-            elif supernode[0] in self._get_A_with_tuple(supernode[1:]).slices[0]:
-                for layers in self._nodeToLayers[supernode[0]]:
-                    if self.aspects>1:
-                        if layers!=supernode[1:]:
-                            yield (supernode[0],)+layers
-                    else:
-                        if layers!=supernode[1]:
-                            yield (supernode[0],layers)
+            else:
+                group=self._get_coupling_group(supernode,aspect)
+                if group is not None:
+                    for n in group:
+                        if n!=supernode[aspect]:
+                            yield supernode[:aspect]+(n,)+supernode[aspect+1:]
         elif coupling_type=="ordinal":
             up,down=supernode[aspect]+1,supernode[aspect]-1
             if self.fullyInterconnected:
-                if up in self.slices[aspect]:
-                    yield supernode[:aspect]+(up,)+supernode[aspect+1:]
-                if down in self.slices[aspect]:
-                    yield supernode[:aspect]+(down,)+supernode[aspect+1:]
+                layers=self.slices[aspect]
+            else:
+                layers=self._get_coupling_group(supernode,aspect)
+                if layers is None:
+                    layers=()
+            if up in layers:
+                yield supernode[:aspect]+(up,)+supernode[aspect+1:]
+            if down in layers:
+                yield supernode[:aspect]+(down,)+supernode[aspect+1:]
+        elif isinstance(coupling_type,MultilayerNetwork):
+            cnode=coupling_type[supernode[aspect]]
+            if direction=="tot":
+                neighbors=cnode.iter_total()
+            elif direction=="in":
+                neighbors=cnode.iter_in()
+            else:
+                neighbors=cnode.iter_out()
+            if self.fullyInterconnected:
+                for n in neighbors:
+                    yield supernode[:aspect]+(n,)+supernode[aspect+1:]
             else:
-                if supernode[1:aspect]+(up,)+supernode[aspect+1:] in self._nodeToLayers[supernode[0]]:
-                    yield supernode[:aspect]+(up,)+supernode[aspect+1:]
-                if supernode[1:aspect]+(down,)+supernode[aspect+1:] in self._nodeToLayers[supernode[0]]:
-                    yield supernode[:aspect]+(down,)+supernode[aspect+1:]
+                group=self._get_coupling_group(supernode,aspect)
+                if group is not None:
+                    for n in neighbors:
+                        if n in group:
+                            yield supernode[:aspect]+(n,)+supernode[aspect+1:]
         elif coupling_type=="none":
             pass
         else:
-            raise NotImplemented()
+            raise Exception("Coupling '"+str(coupling_type)+"' not implemented.")
         
     def _select_dimensions(self,node,dims):
         if dims==None:
@@ -1225,6 +1988,44 @@ class MultiplexNetwork(MultilayerNetwork):
                 s+=self._get_dim_strength(node,d,direction="out")
         return s
 
+    def _degree_arrays(self,nodelayers,strengths=True):
+        """Overrides parents method.
+        """
+        import numpy
+        byLayer={}
+        for k,nl in enumerate(nodelayers):
+            byLayer.setdefault(nl[1:],[]).append(k)
+        keys=["deg","deg_in","deg_out"]
+        if strengths:
+            keys+=["str","str_in","str_out"]
+        arrays=dict((key,numpy.zeros(len(nodelayers),dtype=numpy.int64)) for key in keys)
+        directions=[("","tot" if self.directed else "out"),("_in","in" if self.directed else "out"),("_out","out")]
+        for layer,positions in byLayer.items():
+            positions=numpy.array(positions,dtype=numpy.int64)
+            if self._has_layer_with_tuple(layer):
+                intra=self._get_A_with_tuple(layer)._degree_arrays([(nodelayers[k][0],) for k in positions],strengths)
+                for key in keys:
+                    arrays[key]=arrays[key].astype(numpy.result_type(arrays[key],intra[key]),copy=False)
+                    arrays[key][positions]+=intra[key]
+
+            #coupling edges, which only depend on the layer if the network is node-aligned
+            for a in range(1,self.aspects+1):
+                if self.couplings[a-1][0]=="none":
+                    continue
+                if self.fullyInterconnected:
+                    groups=[(positions,nodelayers[positions[0]])]
+                else:
+                    groups=[([k],nodelayers[k]) for k in positions]
+                for suffix,direction in directions:
+                    for group,nl in groups:
+                        arrays["deg"+suffix][group]+=self._get_dim_degree(nl,a,direction=direction)
+                        if not strengths:
+                            continue
+                        strength=self._get_dim_strength(nl,a,direction=direction)
+                        arrays["str"+suffix]=arrays["str"+suffix].astype(numpy.result_type(arrays["str"+suffix],strength),copy=False)
+                        arrays["str"+suffix][group]+=strength
+        return arrays
+
 
 
     def _iter_neighbors_total_dir(self,node,dims):
@@ -1287,10 +2088,282 @@ class MultiplexNetwork(MultilayerNetwork):
         """
         if node not in self._nodeToLayers:
             self._nodeToLayers[node]=set()
-        self._nodeToLayers[node].add(layer)
+        if layer not in self._nodeToLayers[node]:
+            self._nodeToLayers[node].add(layer)
+            self._nodeLayerCount+=1
+            self._update_coupling_groups(node,layer,True)
         if node not in self.A[layer]:
             self.A[layer].add_node(node)
 
+    def _remove_node_from_layer(self,node,layer):
+        """ Remove node from layer. Network must not be node-aligned.
+        """
+        if layer in self._nodeToLayers.get(node,()):
+            self._nodeToLayers[node].remove(layer)
+            self._nodeLayerCount-=1
+            if len(self._nodeToLayers[node])==0:
+                del self._nodeToLayers[node]
+            self._update_coupling_groups(node,layer,False)
+
+class SubnetView(MultilayerNetwork):
+    """Induced subnetwork of a multilayer network which is not copied.
+
+    The view refers to the original network and filters its node-layers and edges
+    when they are accessed. Creating a view takes time proportional to the number
+    of nodes and layers given, and reading the view costs as much as reading the
+    corresponding part of the original network. Changes made to the edges of the
+    original network are visible in the view.
+
+    The view is copy-on-write. When the view is changed for the first time, the
+    induced subnetwork is copied and the view operates on the copy from then on.
+    The original network is never changed through the view.
+
+    Views of multiplex networks are general multilayer networks in which the
+    coupling edges are explicit. They also have the couplings of the original
+    network, and their A attribute gives views of the intra-layer networks,
+    which should only be read. As in directed multiplex networks, the coupling 
+    edges are counted once in the total strengths. Use materialize to get a 
+    MultiplexNetwork.
+
+    Parameters
+    ----------
+    net : MultilayerNetwork, MultiplexNetwork
+       The original network.
+    nodelayers : list of sets
+       The nodes and the elementary layers of each aspect spanning the subnetwork.
+
+    See also
+    --------
+    pymnet.transforms.subnet : Use subnet(net,nodes,*layers,view=True) to create views.
+    """
+    def __init__(self,net,nodelayers):
+        self._base=net
+        self.aspects=net.aspects
+        self.directed=net.directed
+        self.noEdge=net.noEdge
+        self.fullyInterconnected=net.fullyInterconnected
+
+        self.slices=[]
+        for a,elayers in enumerate(nodelayers):
+            if a==0 and not net.fullyInterconnected:
+                self.slices.append(set())
+            else:
+                self.slices.append(set(filter(lambda e:e in net.slices[a],elayers)))
+        if not net.fullyInterconnected:
+            layers=self.slices[1] if net.aspects==1 else set(self.iter_layers())
+            for node in nodelayers[0]:
+                if not layers.isdisjoint(net._nodeToLayers.get(node,())):
+                    self.slices[0].add(node)
+        self._filters=self.slices
+        self._viewNodeToLayers=None
+        if isinstance(net,MultiplexNetwork):
+            self.couplings=net.couplings
+            self._viewA=None
+
+    def _included(self,nl):
+        """Returns True if the node-layer is inside the view.
+        """
+        filters=self._filters
+        if filters is None:
+            return True
+        for a,elayer in enumerate(nl):
+            if elayer not in filters[a]:
+                return False
+        return True
+
+    @property
+    def _nodeToLayers(self):
+        """The layers of each node in the view, for networks which are not fully 
+        interconnected. Computed from the original network when first read.
+        """
+        if self._filters is None:
+            return self._base._nodeToLayers
+        if self._viewNodeToLayers is None:
+            included=lambda layer:all(elayer in self.slices[a+1] for a,elayer in enumerate((layer,) if self.aspects==1 else layer))
+            self._viewNodeToLayers=dict((node,set(filter(included,self._base._nodeToLayers[node]))) for node in self.slices[0])
+        return self._viewNodeToLayers
+
+    @property
+    def _layerToNodes(self):
+        """The nodes on each layer in the view, see _nodeToLayers.
+        """
+        if self._filters is None:
+            return self._base._layerToNodes
+        layerToNodes={}
+        for node,layers in self._nodeToLayers.items():
+            for layer in layers:
+                layerToNodes.setdefault(layer,set()).add(node)
+        return layerToNodes
+
+    @property
+    def A(self):
+        """The intra-layer networks of views of multiplex networks, keyed as in
+        MultiplexNetwork.A. Created when first read.
+        """
+        if not isinstance(self._base,MultiplexNetwork):
+            raise AttributeError("Only views of multiplex networks have intra-layer networks.")
+        if self._filters is None:
+            return self._base.A
+        if self._viewA is None:
+            self._viewA={}
+            for layer in self.iter_layers():
+                layertuple=layer if self.aspects>1 else (layer,)
+                if self._base._has_layer_with_tuple(layertuple):
+                    self._viewA[layer]=SubnetView(self._base._get_A_with_tuple(layertuple),[self.slices[0]])
+        return self._viewA
+
+    def _coupling_strength(self,node):
+        """Returns the strength of the undirected coupling edges of a node-layer 
+        in a view of a multiplex network. 
+        """
+        base,s=self._base,0
+        if self._included(node):
+            for a in range(1,self.aspects+1):
+                coupling_type=base.couplings[a-1][0]
+                if coupling_type=="none" or (isinstance(coupling_type,MultilayerNetwork) and coupling_type.directed):
+                    continue
+                for neigh in base._iter_dim(node,a):
+                    if self._included(neigh):
+                        s+=base._get_link(base._nodes_to_link(node,neigh))
+        return s
+
+    def materialize(self):
+        """Returns the induced subnetwork as a new network object.
+
+        The returned network is of the same type as the original network and
+        it is independent of the view.
+        """
+        return transforms.subnet(self._base,*self.slices)
+
+    def _write(self):
+        """Returns the network to be changed, copying the subnetwork on the
+        first call.
+        """
+        if self._filters is not None:
+            self._base=self.materialize()
+            self._filters=None
+            self.slices=self._base.slices
+        return self._base
+
+    def __eq__(self,other):
+        if isinstance(other,SubnetView):
+            other=other.materialize()
+        return self.materialize()==other
+
+    def add_node(self,node,layer=None):
+        self._write().add_node(node,layer=layer)
+
+    def add_layer(self,layer,aspect=1):
+        self._write().add_layer(layer,aspect=aspect)
+
+    def _set_link(self,link,value):
+        self._write()._set_link(link,value)
+
+    def add_edges_from(self,edges=None,sources=None,targets=None,layers=None,targetLayers=None,weights=1):
+        self._write().add_edges_from(edges,sources,targets,layers,targetLayers,weights)
+
+    def enable_layer_index(self):
+        self._base.enable_layer_index()
+
+    def _get_link(self,link):
+        node1,node2=self._link_to_nodes(link)
+        if self._included(node1) and self._included(node2):
+            return self._base._get_link(link)
+        return self.noEdge
+
+    def _get_edge_count(self):
+        if self._filters is None:
+            return self._base._get_edge_count()
+        return sum(1 for edge in self._iter_links())
+
+    def _iter_links(self):
+        """Iterates over the edges as (node-layer, node-layer, weight) triples
+        by going through the neighbors of the node-layers of the view.
+        """
+        if self._filters is None:
+            for link in self._base._iter_links():
+                yield link
+            return
+        order=[dict((l,k) for k,l in enumerate(s)) for s in self.slices]
+        base=self._base
+        for nl1 in self.iter_node_layers():
+            rank1=tuple(order[a][e] for a,e in enumerate(nl1))
+            for nl2 in self._iter_neighbors_out(nl1):
+                if self.directed or rank1<=tuple(order[a][e] for a,e in enumerate(nl2)):
+                    yield nl1,nl2,base._get_link(self._nodes_to_link(nl1,nl2))
+
+    def _iter_supra_adjacency_entries(self,includeCouplings,includeIntraLayer):
+        for nl1 in self.iter_node_layers():
+            for nl2 in self._iter_neighbors_out(nl1):
+                if includeCouplings if nl1[1:]!=nl2[1:] else includeIntraLayer:
+                    yield nl1,nl2,self._base._get_link(self._nodes_to_link(nl1,nl2))
+
+    def _degree_arrays(self,nodelayers,strengths=True):
+        if self._filters is None:
+            return self._base._degree_arrays(nodelayers,strengths)
+        arrays=self._link_degree_arrays(nodelayers,strengths)
+        if strengths and self.directed and isinstance(self._base,MultiplexNetwork):
+            import numpy
+            arrays["str"]=arrays["str"]-numpy.array([self._coupling_strength(nl) for nl in nodelayers])
+        return arrays
+
+    def _get_node_layer_count(self):
+        if self._filters is None:
+            return self._base._get_node_layer_count()
+        elif self.fullyInterconnected:
+            return MultilayerNetwork._get_node_layer_count(self)
+        return sum(1 for nl in self.iter_node_layers())
+
+    def _get_degree_out(self,node,dims=None):
+        if self._filters is None:
+            return self._base._get_degree_out(node,dims)
+        return sum(1 for neigh in self._iter_neighbors_out(node,dims))
+
+    def _get_degree_in_dir(self,node,dims=None):
+        if self._filters is None:
+            return self._base._get_degree_in_dir(node,dims)
+        return sum(1 for neigh in self._iter_neighbors_in_dir(node,dims))
+
+    def _get_degree_total_dir(self,node,dims=None):
+        if self._filters is None:
+            return self._base._get_degree_total_dir(node,dims)
+        return sum(1 for neigh in self._iter_neighbors_total_dir(node,dims))
+
+    def _get_strength_total_dir(self,node,dims=None):
+        if self._filters is None:
+            return self._base._get_strength_total_dir(node,dims)
+        s=MultilayerNetwork._get_strength_total_dir(self,node,dims)
+        if dims==None and isinstance(self._base,MultiplexNetwork):
+            s-=self._coupling_strength(node)
+        return s
+
+    def _iter_neighbors_out(self,node,dims=None):
+        if self._included(node):
+            for neigh in self._base._iter_neighbors_out(node,dims):
+                if self._included(neigh):
+                    yield neigh
+
+    def _iter_neighbors_in_dir(self,node,dims=None):
+        if self._included(node):
+            for neigh in self._base._iter_neighbors_in_dir(node,dims):
+                if self._included(neigh):
+                    yield neigh
+
+    def iter_nodes(self,layer=None):
+        if self.fullyInterconnected or layer==None:
+            for node in self.slices[0]:
+                yield node
+        elif self._filters is None:
+            for node in self._base.iter_nodes(layer=layer):
+                yield node
+        else:
+            elayers=layer if self.aspects>1 else (layer,)
+            if all(elayer in self.slices[a+1] for a,elayer in enumerate(elayers)):
+                for node in self._base.iter_nodes(layer=layer):
+                    if node in self.slices[0]:
+                        yield node
+
+
 class FlatMultilayerNetworkView(MultilayerNetwork):
     """
 
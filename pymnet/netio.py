@@ -51,11 +51,13 @@ def read_edge_files(edgeinput,layerinput=None,nodeinput=None,couplings='categori
     edgefile=open(edgeinput,'r') if isinstance(edgeinput,str) else edgeinput
     nodefile=open(nodeinput,'r') if isinstance(nodeinput,str) else nodeinput
 
-    for line in edgefile:
-        li,fi,ti,w=line.split()
-        li,fi,ti,w=int(li),int(fi),int(ti),float(w)
-        if fi!=ti or not ignoreSelfLink:
-            net[fi,ti,li]=w
+    def iter_edges():
+        for line in edgefile:
+            li,fi,ti,w=line.split()
+            li,fi,ti,w=int(li),int(fi),int(ti),float(w)
+            if fi!=ti or not ignoreSelfLink:
+                yield fi,ti,li,w
+    net.add_edges_from(iter_edges())
     return net
 
 
@@ -196,12 +196,8 @@ def default_check_reqs(network,nodelist,layerlist,sizes,intersections,nnodes=Non
     assert len(nodelist) == req_nodelist_len, "Wrong number of nodes"
     assert len(layerlist) == req_layerlist_len, "Wrong number of layers"
     assert all(i>=1 for i in sizes), "Inappropriate sizes"
-    induced_graph = pymnet.subnet(network,nodelist,layerlist)
-    try:
-        graph_is_connected = pymnet.nx.is_connected(pymnet.transforms.get_underlying_graph(induced_graph))
-    except pymnet.nx.networkx.NetworkXPointlessConcept:
-        return False
-    if graph_is_connected:
+    induced_graph = pymnet.subnet(network,nodelist,layerlist,view=True)
+    if pymnet.bfs.is_connected(induced_graph):
         
         # check for empty nodes or layers
         nls = set(induced_graph.iter_node_layers())
@@ -383,12 +379,8 @@ def relaxed_check_reqs(network,nodelist,layerlist):
     
     returns False, because node 1 is empty.
     """
-    induced_graph = pymnet.subnet(network,nodelist,layerlist)
-    try:
-        graph_is_connected = pymnet.nx.is_connected(pymnet.transforms.get_underlying_graph(induced_graph))
-    except pymnet.nx.networkx.NetworkXPointlessConcept:
-        return False
-    if graph_is_connected:
+    induced_graph = pymnet.subnet(network,nodelist,layerlist,view=True)
+    if pymnet.bfs.is_connected(induced_graph):
         nls = set(induced_graph.iter_node_layers())
         for layer in layerlist:
             no_nodelayers = True
@@ -7,6 +7,14 @@ from .transforms_test import test_transforms
 from .visuals_test import test_visuals
 from .isomorphisms_test import test_isomorphisms
 from .sampling_test import test_sampling
+from .bfs_test import test_bfs
+
+try:
+    import numpy
+    from .csrnet_test import test_csrnet
+    npimported=True
+except ImportError:
+    npimported=False
 
 try:
     import networkx
@@ -26,5 +34,7 @@ def test_all():
     codes.append(test_visuals())
     codes.append(test_isomorphisms())
     codes.append(test_sampling())
+    if npimported: codes.append(test_csrnet())
+    codes.append(test_bfs())
     if nximported: codes.append(test_nxwrap())
     return all(codes)
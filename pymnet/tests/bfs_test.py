@@ -0,0 +1,86 @@
+import unittest
+import sys
+
+from pymnet import net,models,bfs,diagnostics,transforms
+
+try:
+    import numpy
+    npimported=True
+except ImportError:
+    npimported=False
+
+
+class TestBFS(unittest.TestCase):
+
+    def setUp(self):
+        self.mlnet=net.MultilayerNetwork(aspects=1,directed=True,fullyInterconnected=False)
+        self.mlnet[1,2,'a','a']=1
+        self.mlnet[2,3,'a','b']=1
+        self.mlnet[4,3,'b','b']=1
+        self.mlnet[5,6,'c','c']=1
+        self.mlnet[5,5,'a','c']=1
+        self.mlnet.add_node(7,layer='a')
+
+    def test_bfs(self):
+        n=models.er(100,0.03)
+        n.add_node(200)
+        for s in [0,200]:
+            d,f=diagnostics.dijkstra(n,[s])
+            self.assertEqual(bfs.bfs(n,[s]),d)
+        self.assertEqual(bfs.bfs(n,[0,1],cutoff=1),dict(((0,0),(1,0))+tuple((nb,1) for nb in set(n[0])|set(n[1]) if nb not in (0,1))))
+
+        self.assertEqual(bfs.bfs(self.mlnet,[(1,'a')]),{(1,'a'):0,(2,'a'):1,(3,'b'):2})
+        self.assertEqual(bfs.bfs(self.mlnet,[(4,'b')]),{(4,'b'):0,(3,'b'):1})
+        if npimported: #frozen networks need numpy
+            self.assertEqual(bfs.bfs(self.mlnet.freeze(),[(4,'b')]),{(4,'b'):0,(3,'b'):1})
+
+        mplex=net.MultiplexNetwork(couplings="ordinal")
+        mplex[1,2,0,0]=1
+        mplex[2,3,2,2]=1
+        mplex.add_layer(1)
+        self.assertEqual(bfs.bfs(mplex,[(1,0)]),{(1,0):0,(2,0):1,(1,1):1,(2,1):2,(3,0):6,(1,2):2,(2,2):3,(3,1):5,(3,2):4})
+
+    def test_components(self):
+        c=bfs.connected_components(self.mlnet)
+        self.assertEqual(c,[{(1,'a'),(2,'a'),(3,'b'),(4,'b')},{(5,'a'),(5,'c'),(6,'c')},{(7,'a')}])
+        view=transforms.subnet(self.mlnet,[1,2,3,5,6],['a','b','c'],view=True)
+        self.assertEqual(sorted(map(sorted,bfs.connected_components(view))),[[(1,'a'),(2,'a'),(3,'b')],[(5,'a'),(5,'c'),(6,'c')]])
+        if npimported:
+            self.assertEqual(bfs.connected_components(self.mlnet.freeze()),c)
+            self.assertEqual(bfs.connected_components(view),bfs.connected_components(view.freeze()))
+        self.assertEqual(bfs.bfs(view,[(3,'b')]),{(3,'b'):0})
+        self.assertFalse(bfs.is_connected(self.mlnet))
+        self.assertEqual(bfs.node_components(self.mlnet),[{1,2,3,4},{5,6},{7}])
+        self.assertEqual(bfs.layer_components(self.mlnet),{'a':[{1,2},{5},{7}],'b':[{3,4}],'c':[{5,6}]})
+
+        self.mlnet[7,5,'a','a']=1
+        self.assertEqual(bfs.node_components(self.mlnet),[{1,2,3,4},{5,6,7}])
+        self.mlnet[6,3,'c','b']=1
+        self.assertTrue(bfs.is_connected(self.mlnet))
+        self.assertFalse(bfs.is_connected(net.MultilayerNetwork(aspects=1)))
+
+        mplex=net.MultiplexNetwork(couplings="none")
+        mplex[1,2,'x','x']=1
+        mplex[2,3,'y','y']=1
+        self.assertEqual(len(bfs.connected_components(mplex)),4)
+        self.assertEqual(bfs.node_components(mplex),[{1,2,3}])
+        self.assertEqual(bfs.layer_components(mplex),{'x':[{1,2},{3}],'y':[{2,3},{1}]})
+        self.assertTrue(bfs.is_connected(net.MultiplexNetwork(couplings="categorical")) is False)
+
+        n=models.er(200,0.005)
+        components=bfs.connected_components(n)
+        self.assertEqual(sorted(node for comp in components for node in comp),list(range(200)))
+        for comp in components:
+            self.assertEqual(set(bfs.bfs(n,[next(iter(comp))])),comp)
+        self.assertEqual(bfs.node_components(n),components)
+
+
+def test_bfs():
+    suite = unittest.TestSuite()
+    suite.addTest(TestBFS("test_bfs"))
+    suite.addTest(TestBFS("test_components"))
+
+    return unittest.TextTestRunner().run(suite).wasSuccessful()
+
+if __name__ == '__main__':
+    sys.exit(not test_bfs())
@@ -39,6 +39,20 @@ class TestCC(unittest.TestCase):
     def test_weighted_flat_simple(self):
         pass #TODO
 
+    def test_weighted_flat_mplex_nodelayers(self):
+        mplex=net.MultiplexNetwork(couplings="none")
+        mplex[1,2,'a']=1
+        mplex[1,3,'a']=2
+        mplex[2,3,'a']=3
+        mplex[1,4,'a']=1
+        mplex[3,4,'b']=1
+        layer=mplex.A['a']
+        for f in [cc.cc_barrat,cc.lcc]: #the others read the maximum weight from monoplex edges
+            for node in [1,2,3,4]:
+                self.assertEqual(f(mplex,(node,'a')),f(layer,node))
+        self.assertEqual(cc.cc_barrat(mplex,(1,'a')),cc.cc_barrat(layer,1))
+        self.assertEqual(cc.cc_barrat(mplex,(2,'a')),1.0)
+
     def test_unweighted_mplex_clique(self):
         def clique_net(nodes,levels):
             n=net.MultiplexNetwork([('categorical',1.0)],directed=False)
@@ -267,7 +281,7 @@ class TestCC(unittest.TestCase):
         self.assertEqual(2*t,lt)
         self.assertEqual(2*d,ld)
 
-        cc.gcc_aw_vector_adj(net)
+        self.assertEqual(cc.gcc_aw_vector_adj(net),cc.gcc_aw_vector_adj(net,sparse=True))
 
         self.assertAlmostEqual(cc.gcc_aw(net,w1=0.3,w2=0.3,w3=0.3),cc.gcc_aw_seplayers_adj(net,w1=0.3,w2=0.3,w3=0.3))
 
@@ -495,6 +509,7 @@ def test_cc(consistency_tests=False):
     suite = unittest.TestSuite()    
     suite.addTest(TestCC("test_unweighted_flat_triangle"))
     suite.addTest(TestCC("test_unweighted_flat_simple"))
+    suite.addTest(TestCC("test_weighted_flat_mplex_nodelayers"))
     suite.addTest(TestCC("test_unweighted_mplex_clique"))
     suite.addTest(TestCC("test_unweighted_mplex_simple"))
     suite.addTest(TestCC("test_directed_unweighted"))
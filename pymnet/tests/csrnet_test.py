@@ -0,0 +1,170 @@
+import unittest
+import sys
+import random
+import itertools
+
+from pymnet import net,models,csrnet,transforms,diagnostics
+
+
+class TestCSRNet(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def assert_same_network(self,n,cn):
+        if n.aspects==0:
+            nodelayers=list(n)
+        else:
+            nodelayers=list(n.iter_node_layers())
+        for nl in nodelayers:
+            self.assertEqual(set(n[nl]),set(cn[nl]))
+            self.assertEqual(n[nl].deg(),cn[nl].deg())
+            self.assertEqual(n[nl].str(),cn[nl].str())
+            if n.directed:
+                self.assertEqual(set(n[nl].iter_in()),set(cn[nl].iter_in()))
+                self.assertEqual(set(n[nl].iter_out()),set(cn[nl].iter_out()))
+                self.assertEqual(n[nl].deg_in(),cn[nl].deg_in())
+                self.assertEqual(n[nl].deg_out(),cn[nl].deg_out())
+                self.assertEqual(n[nl].str_in(),cn[nl].str_in())
+                self.assertEqual(n[nl].str_out(),cn[nl].str_out())
+        self.assertEqual(set(n.edges),set(cn.edges))
+        self.assertEqual(len(n.edges),len(cn.edges))
+        for edge in n.edges:
+            self.assertEqual(n[edge[:-1]],cn[edge[:-1]])
+
+    def test_freeze_monoplex(self):
+        n=models.er(50,0.1)
+        self.assert_same_network(n,csrnet.CSRMultilayerNetwork(n))
+        self.assertEqual(csrnet.CSRMultilayerNetwork(n)[1,1000],0)
+
+    def test_freeze_mplex(self):
+        n=models.er(20,3*[0.2])
+        cn=csrnet.CSRMultilayerNetwork(n)
+        self.assert_same_network(n,cn)
+        self.assertEqual(cn[1,1,0,2],1)
+
+        m1,nodes1=n.get_supra_adjacency_matrix()
+        m2,nodes2=cn.get_supra_adjacency_matrix()
+        self.assertEqual(nodes1,nodes2)
+        self.assertTrue((m1==m2).all())
+        m1,nodes1=n.get_supra_adjacency_matrix(includeCouplings=False)
+        m2,nodes2=cn.get_supra_adjacency_matrix(includeCouplings=False)
+        self.assertTrue((m1==m2).all())
+        m1,nodes1=n.get_supra_adjacency_matrix(includeIntraLayer=False,sparse=True)
+        m2,nodes2=cn.get_supra_adjacency_matrix(includeIntraLayer=False,sparse=True)
+        self.assertTrue((m1.toarray()==m2.toarray()).all())
+
+    def test_freeze_directed_nonglobalnodes(self):
+        n=net.MultilayerNetwork(aspects=1,directed=True,fullyInterconnected=False)
+        n[1,2,'a','b']=2
+        n[2,1,'b','a']=3
+        n[1,1,'a','a']=1
+        n[3,1,'a','a']=5
+        n.add_node(4,layer='c')
+        cn=csrnet.CSRMultilayerNetwork(n)
+        self.assert_same_network(n,cn)
+        self.assertEqual(set(cn.iter_node_layers()),set(n.iter_node_layers()))
+        self.assertEqual(cn[1,'a'].deg_total(),3)
+
+    def test_freeze_directed_mplex(self):
+        n=net.MultiplexNetwork(couplings=("categorical",2.0),directed=True)
+        n[0,1,'a','a']=1
+        n[2,0,'a','a']=2
+        n[0,1,'b','b']=3
+        cn=n.freeze()
+        self.assert_same_network(n,cn)
+        self.assertEqual(cn[0,'a'].str(),5.0)
+        self.assertEqual((cn[0,'a'].str_in(),cn[0,'a'].str_out()),(4.0,3.0))
+        for direction,strf in [("total","str_total"),("in","str_in"),("out","str_out")]:
+            self.assertEqual(list(cn.get_strength_vector(direction)),[getattr(n[nl],strf)() for nl in cn.get_node_layers()])
+
+        random.seed(1)
+        coupled=net.MultilayerNetwork(aspects=0,directed=True)
+        coupled[0,1]=2
+        coupled[2,1]=1
+        for couplings in ["categorical",("ordinal",0.5),"none",coupled,[("categorical",1.0),coupled]]:
+            for fullyInterconnected in [True,False]:
+                n=net.MultiplexNetwork(couplings=couplings,directed=True,fullyInterconnected=fullyInterconnected)
+                for layer in itertools.product(*(n.aspects*[range(3)])):
+                    n.add_layer(layer[0])
+                    for k in range(8):
+                        i,j=random.sample(range(6),2)
+                        n[(i,)+layer][(j,)+layer]=random.choice([1,2])
+                self.assert_same_network(n,n.freeze())
+                nodelayers,arrays=diagnostics.degree_arrays(n)
+                fnodelayers,farrays=diagnostics.degree_arrays(n.freeze())
+                self.assertEqual(nodelayers,fnodelayers)
+                for key in arrays:
+                    self.assertEqual(list(arrays[key]),list(farrays[key]))
+
+    def test_builder(self):
+        b=csrnet.CSRNetworkBuilder(aspects=1)
+        b[2,1,'a','a']=0
+        b[1,2,'a']=1
+        b[3,4,'a','b']=2
+        b[3,4,'a','b']=0
+        b[5,6,'x']=1
+        b[6,5,'x']=2
+        b.add_node(7,layer='y')
+        cn=b.freeze()
+
+        n=net.MultilayerNetwork(aspects=1)
+        n[1,2,'a']=1
+        n[5,6,'x']=2
+        n.add_node(3)
+        n.add_node(4)
+        n.add_node(7)
+        n.add_layer('b')
+        n.add_layer('y')
+        self.assert_same_network(n,cn)
+        self.assertEqual(cn.slices,n.slices)
+
+        self.assertRaises(TypeError,lambda :cn.__setitem__((1,2,'a'),1))
+        self.assertRaises(TypeError,lambda :cn.add_node(8))
+
+    def test_freeze_cached_data(self):
+        n=net.MultilayerNetwork(aspects=1,directed=True)
+        n[1,2,'a','a']=2
+        n[2,1,'a','a']=3
+        n[1,1,'a','b']=1
+        n[3,1,'b','b']=5
+        n.add_node(4)
+        fn=n.freeze()
+        self.assertTrue(isinstance(fn,csrnet.CSRMultilayerNetwork))
+        self.assertTrue(fn.freeze() is fn)
+        self.assert_same_network(n,fn)
+
+        nodelayers=fn.get_node_layers()
+        self.assertEqual(nodelayers,[(1,'a'),(2,'a'),(3,'a'),(4,'a'),(1,'b'),(2,'b'),(3,'b'),(4,'b')])
+        for direction,degf,strf in [("total","deg_total","str_total"),("in","deg_in","str_in"),("out","deg_out","str_out")]:
+            self.assertEqual(list(fn.get_degree_vector(direction)),[getattr(n[nl],degf)() for nl in nodelayers])
+            self.assertEqual(list(fn.get_strength_vector(direction)),[getattr(n[nl],strf)() for nl in nodelayers])
+        self.assertTrue(fn.get_degree_vector() is fn.get_degree_vector())
+        self.assertRaises(ValueError,lambda :fn.get_degree_vector().__setitem__(0,1))
+
+        an=transforms.aggregate(fn,1)
+        self.assertTrue(an is transforms.aggregate(fn,1))
+        self.assertEqual(set(an.edges),set(transforms.aggregate(n,1).edges))
+        self.assertRaises(TypeError,lambda :an.__setitem__((1,2),1))
+
+        self.assertEqual(hash(fn),hash(n.freeze()))
+        self.assertEqual(fn,n.freeze())
+
+        mono=models.er(30,0.2).freeze()
+        self.assertEqual(mono.get_node_layers(),list(range(30)))
+        self.assertEqual(list(mono.get_degree_vector()),[mono[i].deg() for i in range(30)])
+
+
+def test_csrnet():
+    suite = unittest.TestSuite()
+    suite.addTest(TestCSRNet("test_freeze_monoplex"))
+    suite.addTest(TestCSRNet("test_freeze_mplex"))
+    suite.addTest(TestCSRNet("test_freeze_directed_nonglobalnodes"))
+    suite.addTest(TestCSRNet("test_freeze_directed_mplex"))
+    suite.addTest(TestCSRNet("test_builder"))
+    suite.addTest(TestCSRNet("test_freeze_cached_data"))
+
+    return unittest.TextTestRunner().run(suite).wasSuccessful()
+
+if __name__ == '__main__':
+    sys.exit(not test_csrnet())
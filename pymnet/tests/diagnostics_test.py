@@ -1,12 +1,16 @@
 import unittest
 import sys
+import itertools
 
-from pymnet import net,diagnostics,models,nx
+from pymnet import net,diagnostics,models,nx,transforms
 
 
 class TestDiagnostics(unittest.TestCase):    
     def setUp(self):
-        pass
+        net.CHECK_COUNTERS=True
+
+    def tearDown(self):
+        net.CHECK_COUNTERS=False
 
     def create_chain(self,net):
         net[1,2]=1
@@ -89,6 +93,115 @@ class TestDiagnostics(unittest.TestCase):
         self.assertEqual(diagnostics.degs(n,degstype="nodes"),{(1,1):1,(2,1):2,(3,1):2,(4,1):1,(1,3):1,(2,3):2,(3,3):2,(4,3):1})
 
 
+    def test_degs_nonnumeric_weights(self):
+        n=net.MultilayerNetwork(aspects=0)
+        n[1,2]="x"
+        n[1,3]="y"
+        self.assertEqual(diagnostics.degs(n),{2:1,1:2})
+        self.assertEqual(diagnostics.degs(n,degstype="nodes"),{1:2,2:1,3:1})
+
+        mplex=net.MultiplexNetwork(couplings="categorical",directed=True)
+        mplex[1,2,'a','a']="x"
+        mplex[2,1,'b','b']="y"
+        self.assertEqual(diagnostics.multiplex_degs(mplex,degstype="nodes"),{'a':{1:1,2:1},'b':{1:1,2:1}})
+        self.assertEqual(diagnostics.degs(mplex,degstype="nodes"),{(1,'a'):2,(2,'a'):2,(1,'b'):2,(2,'b'):2})
+
+        mlayer=net.MultilayerNetwork(aspects=1)
+        mlayer[1,2,'a','a']=1
+        mlayer[1,2,'b','b']=2
+        mlayer[2,3,'a','a']=3
+        agg=transforms.aggregate(mlayer,1,reducer=["sum","max"],tupleWeights=True)
+        self.assertEqual(agg[1,2],(3,2))
+        self.assertEqual(diagnostics.degs(agg,degstype="nodes"),{1:1,2:2,3:1})
+        self.assertEqual(diagnostics.degs(transforms.subnet(agg,[1,2],view=True),degstype="nodes"),{1:1,2:1})
+
+    def test_degree_arrays(self):
+        def assert_arrays(n):
+            nodelayers,arrays=diagnostics.degree_arrays(n)
+            self.assertEqual(set(nodelayers),set(n if n.aspects==0 else n.iter_node_layers()))
+            for k,nl in enumerate(nodelayers):
+                for key in ["deg","deg_in","deg_out","str","str_in","str_out"]:
+                    self.assertEqual(arrays[key][k],getattr(n[nl],key)(),(key,nl))
+
+        coupling=net.MultilayerNetwork(aspects=0,directed=True)
+        coupling[1,2]=2
+        coupling[3,2]=0.5
+        for directed in [False,True]:
+            mono=net.MultilayerNetwork(aspects=0,directed=directed)
+            self.create_chain(mono)
+            mono[1,1]=2
+            mono[3,2]=3
+            mono.add_node(5)
+            mlayer=net.MultilayerNetwork(aspects=1,directed=directed,fullyInterconnected=False)
+            mlayer[1,2,'a','b']=1
+            mlayer[2,1,'b','b']=2
+            mlayer[1,1,'a','b']=3
+            mlayer.add_node(3,layer='a')
+            assert_arrays(mono)
+            assert_arrays(mlayer)
+            assert_arrays(mlayer.freeze())
+            assert_arrays(transforms.subnet(mlayer,[1,2],['a','b'],view=True))
+            for couplings in ['none','categorical',('categorical',0.5),'ordinal',coupling]:
+                for fullyInterconnected in [True,False]:
+                    n=net.MultiplexNetwork(couplings=couplings,directed=directed,fullyInterconnected=fullyInterconnected)
+                    self.create_chain_mplex(n)
+                    n[1,3,2]=2
+                    assert_arrays(n)
+                    if fullyInterconnected:
+                        assert_arrays(n.freeze())
+            mplex=net.MultiplexNetwork(couplings=['categorical','ordinal'],directed=directed)
+            mplex[1,2,'a',1]=1
+            mplex[3,2,'b',2]=2
+            assert_arrays(mplex)
+            for layer,(nodes,arrays) in diagnostics.multiplex_degree_arrays(n).items():
+                self.assertEqual(list(arrays["deg"]),[n.A[layer][node].deg() for node in nodes])
+
+    def test_density_nonaligned(self):
+        for directed in [False,True]:
+            n=net.MultilayerNetwork(aspects=2,directed=directed,fullyInterconnected=False)
+            n[1,2,'a','b','x','x']=1
+            n[2,3,'b','b','x','y']=1
+            n.add_node(4,layer=('a','y'))
+            self.assertEqual(n._get_node_layer_count(),4)
+            pairs=4*3 if directed else 4*3/2
+            self.assertEqual(diagnostics.density(n),2/float(pairs))
+            self.assertEqual(diagnostics.density(n.freeze()),2/float(pairs))
+            view=transforms.subnet(n,[1,2,4],['a','b'],['x','y'],view=True)
+            self.assertEqual(diagnostics.density(view),diagnostics.density(view.materialize()))
+
+            m=net.MultiplexNetwork(couplings='categorical',directed=directed,fullyInterconnected=False)
+            self.create_chain_mplex(m)
+            m.add_node(5,layer=2)
+            self.assertEqual(m._get_node_layer_count(),len(list(m.iter_node_layers())))
+            self.assertEqual(transforms.relabel(m,{1:'one'})._get_node_layer_count(),9)
+            k=len(m.edges)
+            self.assertEqual(diagnostics.density(m),k/float(9*8 if directed else 9*8/2))
+        self.assertEqual(diagnostics.density(net.MultilayerNetwork(aspects=1,fullyInterconnected=False)),0)
+
+    def test_multiplex_density_matrix(self):
+        for fullyInterconnected in [True,False]:
+            n=net.MultiplexNetwork(couplings='categorical',fullyInterconnected=fullyInterconnected)
+            self.create_chain_mplex(n)
+            n[2,1,3]=0
+            n[1,3,3]=1
+            n[1,5,2]=1
+            matrix,layers=diagnostics.multiplex_density_matrix(n)
+            self.assertEqual(layers,list(n.iter_layers()))
+            densities=diagnostics.multiplex_density(n)
+            for k,layer in enumerate(layers):
+                self.assertEqual(matrix[k,k],densities[layer])
+            i1,i2,i3=layers.index(1),layers.index(2),layers.index(3)
+            if fullyInterconnected:
+                self.assertEqual(densities[1],3/10.)
+                self.assertEqual(matrix[i1,i3],2/10.)
+                self.assertEqual(matrix[i1,i2],0)
+            else:
+                self.assertEqual(densities[1],3/6.)
+                self.assertEqual(densities[2],1.)
+                self.assertEqual(matrix[i1,i3],2/6.)
+                self.assertEqual(matrix[i1,i2],0)
+            self.assertTrue((matrix==matrix.T).all())
+
     def test_dijkstra_monoplex(self):
         n=net.MultilayerNetwork(aspects=0)
         n[1,2]=1
@@ -117,6 +230,125 @@ class TestDiagnostics(unittest.TestCase):
         
         self.assertEqual(d, nx.shortest_path_length(n,1))
         
+    def test_overlap_degs(self):
+        n=net.MultiplexNetwork(couplings="categorical")
+        for layer in ['a','b','c']:
+            n.add_layer(layer)
+        n.add_node(5)
+        n[1,2,'a','a']=1
+        n[1,2,'b','b']=1
+        n[2,3,'a','a']=1
+        n[3,2,'b','b']=1
+        n[3,2,'c','c']=1
+        n[1,4,'c','c']=1
+        layers=list(n.slices[1])
+        od=diagnostics.overlap_degs(n)
+        self.assertTrue(isinstance(od,dict))
+        def comb(*ls):
+            return tuple(l for l in layers if l in ls)
+        expected={comb('a','b'):{1:1,2:1},comb('a','b','c'):{2:1,3:1},comb('c'):{1:1,4:1}}
+        self.assertEqual(list(od),[c for k in [3,2,1] for c in itertools.combinations(layers,k) if c in expected])
+        self.assertEqual(od,dict((c,dict((node,degs.get(node,0)) for node in range(1,6))) for c,degs in expected.items()))
+        for k in [3,2,1]:
+            for c in itertools.combinations(layers,k):
+                self.assertEqual(od[c],dict((node,expected.get(c,{}).get(node,0)) for node in range(1,6)))
+        self.assertEqual(len(od),3)
+        self.assertRaises(KeyError,lambda :od[tuple(reversed(layers))])
+        self.assertRaises(KeyError,lambda :od[('d',)])
+        self.assertRaises(KeyError,lambda :od[()])
+
+        d=net.MultiplexNetwork(couplings="categorical",directed=True)
+        d[1,2,'a','a']=1
+        d[2,1,'a','a']=1
+        d[1,2,'b','b']=1
+        od=diagnostics.overlap_degs(d)
+        self.assertEqual(od,{tuple(d.slices[1]):{1:1,2:1},('a',):{1:1,2:1}})
+        self.assertEqual(od[tuple(l for l in d.slices[1] if l=='b')],{1:0,2:0})
+
+        many=net.MultiplexNetwork(couplings="categorical")
+        for layer in range(70):
+            many[0,1,layer,layer]=1
+        many[1,2,5,5]=1
+        od=diagnostics.overlap_degs(many)
+        self.assertEqual(len(od),2)
+        self.assertEqual(od[tuple(many.slices[1])],{0:1,1:1,2:0})
+        self.assertEqual(od[(5,)],{0:0,1:1,2:1})
+        self.assertEqual(od[(3,4)],{0:0,1:0,2:0})
+
+    def test_dijkstra_arrays(self):
+        def assert_paths(n,sources):
+            d,f=diagnostics.dijkstra(n,sources)
+            distances,predecessors,nodelayers=diagnostics.dijkstra_arrays(n,sources)
+            self.assertEqual(len(distances),len(nodelayers))
+            for k,nl in enumerate(nodelayers):
+                self.assertEqual(distances[k],d.get(nl,float("inf")))
+                if predecessors[k]>=0: #the link from the predecessor is in a shortest path
+                    pred=nodelayers[predecessors[k]]
+                    self.assertEqual(distances[predecessors[k]]+n[pred][nl],distances[k])
+                else:
+                    self.assertTrue(nl in sources or distances[k]==float("inf"))
+            
+            distances,predecessors,nodelayers=diagnostics.dijkstra_arrays(n,sources,batch=True)
+            self.assertEqual(distances.shape,(len(sources),len(nodelayers)))
+            for row,source in enumerate(sources):
+                d,f=diagnostics.dijkstra(n,[source])
+                self.assertEqual(dict((nl,distances[row,k]) for k,nl in enumerate(nodelayers) if distances[row,k]<float("inf")),d)
+
+        n=models.er(50,0.05)
+        n.add_node(100)
+        assert_paths(n,[1])
+        assert_paths(n,[1,2,100])
+        assert_paths(models.er(20,[0.1,0.1]),[(1,0),(3,1)])
+        d=net.MultilayerNetwork(aspects=1,directed=True)
+        d[1,2,'a','b']=1
+        d[2,3,'b','b']=0.5
+        d[1,3,'a','a']=2
+        d[3,1,'a','a']=1
+        assert_paths(d,[(1,'a')])
+        assert_paths(d,[(3,'b')])
+        assert_paths(d.freeze(),[(1,'a'),(2,'b')])
+
+    def test_all_pairs_distances(self):
+        import os,tempfile
+        n=models.er(30,[0.1,0.1,0.1])
+        matrix,columns=diagnostics.all_pairs_distances(n,blockSize=7)
+        self.assertEqual(matrix.shape,(90,90))
+        for row,source in enumerate(columns):
+            d,f=diagnostics.dijkstra(n,[source])
+            self.assertEqual(dict((nl,matrix[row,k]) for k,nl in enumerate(columns) if matrix[row,k]<float("inf")),d)
+
+        pmatrix,pcolumns=diagnostics.all_pairs_distances(n,processes=2,blockSize=7)
+        self.assertEqual(pcolumns,columns)
+        self.assertTrue((pmatrix==matrix).all())
+
+        sources=[(1,None),(2,None)]
+        path=os.path.join(tempfile.mkdtemp(),"distances.npy")
+        matrix,columns=diagnostics.all_pairs_distances(n,sources,aaspects=[1],processes=2,out=path)
+        self.assertEqual(matrix.shape,(2,30))
+        for row,source in enumerate(sources):
+            d,f=diagnostics.dijkstra_mlayer_prune(n,[source],[1])
+            self.assertEqual(dict((nl,matrix[row,k]) for k,nl in enumerate(columns) if matrix[row,k]<float("inf")),d)
+        os.remove(path)
+
+        columns,blocks=diagnostics.iter_distance_blocks(models.er(10,0.5),[3,4,5],blockSize=2)
+        self.assertEqual(sorted(columns),list(range(10)))
+        self.assertEqual(sorted((start,len(block)) for start,block in blocks),[(0,2),(2,1)])
+
+        matrix,columns=diagnostics.all_pairs_distances(models.er(10,0.5),[3,100])
+        self.assertEqual(sorted(columns),list(range(10))+[100])
+        self.assertEqual(matrix[1,columns.index(100)],0)
+        self.assertEqual(sorted(matrix[1]),[0]+10*[float("inf")])
+        self.assertEqual(matrix[0,columns.index(100)],float("inf"))
+
+        small,large=models.er(10,0.5),models.er(40,0.2)
+        columns1,blocks1=diagnostics.iter_distance_blocks(small,blockSize=3)
+        columns2,blocks2=diagnostics.iter_distance_blocks(large,blockSize=3)
+        for blocks,columns,n in [(blocks1,columns1,small),(blocks2,columns2,large)]:
+            for start,block in blocks:
+                for row in range(len(block)):
+                    d,f=diagnostics.dijkstra(n,[columns[start+row]])
+                    self.assertEqual(dict((node,block[row,k]) for k,node in enumerate(columns) if block[row,k]<float("inf")),d)
+
     def test_dijkstra_multilayer_two_aspect(self):
         n=net.MultilayerNetwork(aspects=2,directed=True)
         n[1,'a',1][2,'a',2]=1
@@ -144,10 +376,29 @@ class TestDiagnostics(unittest.TestCase):
         self.assertEqual(d[(2,)],1)
         self.assertEqual(d[(3,)],1)
         self.assertEqual(d[(4,)],2.5)
-        ftrue=net.MultilayerNetwork(aspects=2,fullyInterconnected=False,directed=True,noEdge=-1)
-        ftrue[1,'a',1][1,'a',1]=0; ftrue[1,'b',1.5][1,'b',1.5]=0;ftrue[1,'b',1.25][1,'b',1.25]=0; ftrue[1,'a',1.75][1,'a',1.75];ftrue[1,'a',2][1,'a',2]
-
-        #print d,list(f.edges)
+        nodelayers,predecessors,distances=f
+        paths=dict((nl,nodelayers[predecessors[k]] if predecessors[k]>=0 else None) for k,nl in enumerate(nodelayers))
+        self.assertEqual(paths,{(1,'a',1):None,(1,'b',1.5):None,(1,'b',1.25):None,(1,'a',1.75):None,(1,'a',2):None,
+                                (2,'a',2):(1,'a',1),(3,'b',2.5):(1,'b',1.5),(3,'a',2.75):(3,'b',2.5),(3,'a',3):(3,'a',2.75),(4,'a',4):(3,'a',3)})
+        dtrue={(2,'a',2):1,(3,'b',2.5):1,(3,'a',2.75):1.25,(3,'a',3):1.5,(4,'a',4):2.5}
+        self.assertEqual(list(distances),[dtrue.get(nl,0) for nl in nodelayers])
+
+    def test_dijkstra_mlayer_prune_long_path(self):
+        n=net.MultilayerNetwork(aspects=1)
+        length=20000
+        for i in range(length):
+            n[i,i+1,'a','a']=1
+            n[i,i,'a','b']=0.5
+        d,(nodelayers,predecessors,distances)=diagnostics.dijkstra_mlayer_prune(n,[(0,None)],[1])
+        self.assertEqual(d,dict(((i,),i) for i in range(length+1)))
+        self.assertEqual(len(nodelayers),length+2)
+        k=nodelayers.index((length,'a'))
+        steps=0
+        while predecessors[k]>=0:
+            k=predecessors[k]
+            steps+=1
+        self.assertEqual(steps,length)
+        self.assertEqual(distances[k],0)
 
 def test_diagnostics():
     suite = unittest.TestSuite()    
@@ -155,8 +406,16 @@ def test_diagnostics():
     suite.addTest(TestDiagnostics("test_multiplex_density_degs_mnet"))
     suite.addTest(TestDiagnostics("test_multilayer_degs_multilayernet"))
     suite.addTest(TestDiagnostics("test_multilayer_degs_mplexnet"))
+    suite.addTest(TestDiagnostics("test_degree_arrays"))
+    suite.addTest(TestDiagnostics("test_degs_nonnumeric_weights"))
+    suite.addTest(TestDiagnostics("test_density_nonaligned"))
+    suite.addTest(TestDiagnostics("test_multiplex_density_matrix"))
     suite.addTest(TestDiagnostics("test_dijkstra_monoplex"))
     suite.addTest(TestDiagnostics("test_dijkstra_monoplex_compare"))
+    suite.addTest(TestDiagnostics("test_overlap_degs"))
+    suite.addTest(TestDiagnostics("test_dijkstra_arrays"))
+    suite.addTest(TestDiagnostics("test_all_pairs_distances"))
+    suite.addTest(TestDiagnostics("test_dijkstra_mlayer_prune_long_path"))
     suite.addTest(TestDiagnostics("test_dijkstra_multilayer_two_aspect"))
 
     return unittest.TextTestRunner().run(suite).wasSuccessful() 
@@ -2,6 +2,7 @@ import unittest
 from operator import itemgetter
 
 import sys
+import itertools
 from pymnet import net
 import pymnet
 #from .. import net
@@ -10,7 +11,10 @@ import pymnet
 class TestNet(unittest.TestCase):
     
     def setUp(self):
-        pass
+        net.CHECK_COUNTERS=True
+
+    def tearDown(self):
+        net.CHECK_COUNTERS=False
 
     ##### Test flat net
 
@@ -892,6 +896,289 @@ class TestNet(unittest.TestCase):
         self.assertEqual(len(mnet.edges),len(list(mnet.edges))) #this should always be true
         self.assertEqual(len(list(mnet.edges)),3) #self-edges only once in the edge list
         
+    def test_interning(self):
+        """Testing the integer ids of node-layers and elementary layers.
+        """
+        mnet=net.MultilayerNetwork(aspects=2,directed=True)
+        mnet[1,2,'a','b','x','x']=1
+        mnet[2,3,'b','b','x','y']=2
+        mnet[1,2,'a','b','x','x']=0
+        mnet.add_node(4)
+
+        self.assertEqual(mnet._idToNl,[(1,'a','x'),(2,'b','x'),(3,'b','y')])
+        for i,nl in enumerate(mnet._idToNl):
+            self.assertEqual(mnet._nlToId[nl],i)
+        self.assertEqual(mnet._idToLabel,[[1,2,3],['a','b'],['x','y']])
+        self.assertEqual(mnet._labelToId[2],{'x':0,'y':1})
+        self.assertEqual(mnet._net[1],{2:2})
+        self.assertEqual(mnet._rnet[2],{1:2})
+
+        #node-layers without edges don't get ids
+        self.assertEqual(mnet[4,'a','x'].deg(),0)
+        self.assertEqual(mnet[4,4,'a','a','x','x'],0)
+        self.assertEqual(len(mnet._idToNl),3)
+
+        self.assertEqual(list(mnet[2,'b','x']),[(3,'b','y')])
+        self.assertEqual(list(mnet[3,'b','y'].iter_in()),[(2,'b','x')])
+        self.assertEqual(mnet[1,'a','x'].deg(),0)
+        self.assertEqual(mnet[2,'b','x'].deg(),1)
+
+
+    def test_add_edges_from(self):
+        """Testing that bulk insertion gives the same network as setting the edges one by one.
+        """
+        edges=[(1,2,'a','a',1),(2,3,'a','b',2),(3,3,'b','b',1),(4,1,'b','a',0),(1,2,'a','a',3),(3,3,'b','b',0)]
+        for directed in [False,True]:
+            for fullyInterconnected in [False,True]:
+                mnet1=net.MultilayerNetwork(aspects=1,directed=directed,fullyInterconnected=fullyInterconnected)
+                for edge in edges:
+                    mnet1[edge[:-1]]=edge[-1]
+
+                mnet2=net.MultilayerNetwork(aspects=1,directed=directed,fullyInterconnected=fullyInterconnected)
+                mnet2.add_edges_from(edges)
+                self.assertEqual(mnet1,mnet2)
+                self.assertEqual(mnet1.slices,mnet2.slices)
+                self.assertEqual(set(mnet1.iter_node_layers()),set(mnet2.iter_node_layers()))
+                for nl in mnet1.iter_node_layers():
+                    self.assertEqual(mnet1[nl].deg(),mnet2[nl].deg())
+
+                mnet3=net.MultilayerNetwork(aspects=1,directed=directed,fullyInterconnected=fullyInterconnected)
+                sources,targets,layers,targetLayers,weights=zip(*edges)
+                mnet3.add_edges_from(sources=sources,targets=targets,layers=[layers],targetLayers=[targetLayers],weights=weights)
+                self.assertEqual(mnet1,mnet3)
+
+        #intra-layer edges in the short notation, and a single weight
+        mnet=net.MultilayerNetwork(aspects=2)
+        mnet.add_edges_from([(1,2,'a','x',1),(2,3,'b','x',1)])
+        mnet.add_edges_from(sources=[1],targets=[3],layers=[['a'],['y']],weights=2)
+        self.assertEqual(mnet[1,2,'a','a','x','x'],1)
+        self.assertEqual(mnet[2,3,'b','b','x','x'],1)
+        self.assertEqual(mnet[1,3,'a','a','y','y'],2)
+        self.assertEqual(mnet.slices,[set([1,2,3]),set(['a','b']),set(['x','y'])])
+
+        #multiplex networks
+        for fullyInterconnected in [False,True]:
+            mplex1=net.MultiplexNetwork(couplings='categorical',fullyInterconnected=fullyInterconnected)
+            mplex2=net.MultiplexNetwork(couplings='categorical',fullyInterconnected=fullyInterconnected)
+            medges=[(1,2,'a',1),(2,3,'a',1),(1,2,'b',2),(1,4,'c',0)]
+            for edge in medges:
+                mplex1[edge[:-1]]=edge[-1]
+            mplex2.add_edges_from(medges)
+            self.assertEqual(mplex1,mplex2)
+            self.assertEqual(set(mplex1.edges),set(mplex2.edges))
+            self.assertEqual(set(mplex1.iter_node_layers()),set(mplex2.iter_node_layers()))
+            self.assertRaises(KeyError,lambda :mplex2.add_edges_from([(1,2,'a','b',1)]))
+            self.assertRaises(KeyError,lambda :mplex2.add_edges_from([(1,1,'a',1)]))
+
+
+    def test_edge_counts(self):
+        """Testing the maintained edge counters against a full recount.
+        """
+        def check(n):
+            self.assertEqual(n.edges._recount(),len(n.edges))
+            if not isinstance(n,net.MultiplexNetwork):
+                self.assertEqual(len(list(n.edges)),len(n.edges))
+
+        for directed in [False,True]:
+            for aspects in [0,1,2]:
+                n=net.MultilayerNetwork(aspects=aspects,directed=directed)
+                n[(1,2)+aspects*(1,)]=1
+                n[(2,1)+aspects*(1,)]=2
+                n[(2,2)+aspects*(1,)]=1
+                n[(2,3)+aspects*(1,)]=1
+                check(n)
+                n[(2,2)+aspects*(1,)]=0
+                n[(2,1)+aspects*(1,)]=0
+                n[(3,4)+aspects*(1,)]=0
+                check(n)
+
+        for fullyInterconnected in [False,True]:
+            for couplings in ['categorical','ordinal','none',['categorical','ordinal'],['none','categorical']]:
+                n=net.MultiplexNetwork(couplings=couplings,fullyInterconnected=fullyInterconnected)
+                aspects=n.aspects
+                n[(1,2)+aspects*(1,)]=1
+                n[(2,3)+aspects*(1,)]=1
+                n[(1,3)+aspects*(2,)]=1
+                n[(3,4)+aspects*(3,)]=1
+                n[(1,4)+aspects*(3,)]=1
+                n[(1,4)+aspects*(3,)]=0
+                check(n)
+                n.add_layer(5)
+                check(n)
+
+        n=net.MultiplexNetwork(couplings='categorical')
+        n[1,2,'a']=1
+        n[2,3,'b']=1
+        mono=net.MultilayerNetwork(aspects=0)
+        mono[1,2]=1
+        mono[1,3]=1
+        mono[3,4]=1
+        n.A['a']=mono
+        check(n)
+        self.assertEqual(len(n.edges),3+1+4)
+
+        coupling=net.MultilayerNetwork(aspects=0)
+        coupling['a','b']=1
+        n=net.MultiplexNetwork(couplings=coupling)
+        n[1,2,'a']=1
+        n[1,2,'b']=1
+        check(n)
+
+        #the recount is also done when the check mode is on
+        n=net.MultilayerNetwork(aspects=0)
+        n[1,2]=1
+        n._edgeCount=2
+        self.assertRaises(AssertionError,lambda :len(n.edges))
+
+
+    def test_layer_index(self):
+        """Testing that sliced queries give the same results with and without the layer index.
+        """
+        import random
+        rnd=random.Random(1)
+        for directed in [False,True]:
+            n1=net.MultilayerNetwork(aspects=2,directed=directed)
+            n2=net.MultilayerNetwork(aspects=2,directed=directed)
+            def set_random_links(nlinks,value):
+                for k in range(nlinks):
+                    link=(rnd.randrange(5),rnd.randrange(5),rnd.choice('ab'),rnd.choice('ab'),rnd.choice('xy'),rnd.choice('xy'))
+                    n1[link]=value
+                    n2[link]=value
+            set_random_links(60,1)
+            n2.enable_layer_index()
+            set_random_links(60,2)
+            set_random_links(40,0)
+            self.assertNotEqual(n2._layerIndex,{})
+
+            for node in range(5):
+                for s,x in [('a','x'),('b','y')]:
+                    for dims in [(None,'a','x'),(None,'b','y'),(1,'a','x'),(None,'a',None),(2,None,None)]:
+                        node1,node2=net.MultilayerNode((node,s,x),n1,layers=dims),net.MultilayerNode((node,s,x),n2,layers=dims)
+                        self.assertEqual(sorted(node1.iter_out()),sorted(node2.iter_out()))
+                        self.assertEqual(sorted(node1.iter_in()),sorted(node2.iter_in()))
+                        self.assertEqual(sorted(node1),sorted(node2))
+                        self.assertEqual(node1.deg_out(),node2.deg_out())
+                        self.assertEqual(node1.deg_in(),node2.deg_in())
+                        self.assertEqual(node1.deg(),node2.deg())
+                        self.assertEqual(node1.str(),node2.str())
+                        self.assertEqual(len(list(node2.iter_out())),node2.deg_out())
+                    self.assertEqual(set(n1[node,:,s,'b',x,'y']),set(n2[node,:,s,'b',x,'y']))
+
+            #removing all links empties the index
+            for edge in list(n2.edges):
+                n2[edge[:-1]]=0
+            self.assertEqual(n2._layerIndex,{})
+            if directed:
+                self.assertEqual(n2._rlayerIndex,{})
+
+
+    def test_coupling_neighbors(self):
+        """Testing the coupling degrees, strengths and neighbors against the coupling edges.
+        """
+        import random
+        rnd=random.Random(2)
+        coupling=net.MultilayerNetwork(aspects=0)
+        coupling[1,2]=2
+        coupling[2,3]=3
+        coupling[1,3]=4
+        for couplings in [[('categorical',2),('ordinal',3)],[coupling,'categorical'],['none',('ordinal',0.5)],'categorical','ordinal',coupling]:
+            for fullyInterconnected in [False,True]:
+                n=net.MultiplexNetwork(couplings=couplings,fullyInterconnected=fullyInterconnected)
+                layers=[tuple(rnd.randrange(1,4) for a in range(n.aspects)) for k in range(10)]
+                for k in range(20):
+                    layer=rnd.choice(layers)
+                    n[(rnd.randrange(5),rnd.randrange(5,10))+layer]=1
+                for k in range(5):
+                    layer=rnd.choice(layers)
+                    n.add_node(rnd.randrange(7),layer=layer if n.aspects>1 else layer[0])
+                nls=list(n.iter_node_layers())
+                for nl in nls:
+                    for aspect in range(1,n.aspects+1):
+                        dims=[nl[a] if a!=aspect else None for a in range(n.aspects+1)]
+                        neighbors=set(nl2 for nl2 in nls if nl2!=nl and n[n._nodes_to_link(nl,nl2)]!=n.noEdge and all(nl2[a]==nl[a] for a in range(n.aspects+1) if a!=aspect))
+                        node=net.MultilayerNode(nl,n,layers=dims)
+                        self.assertEqual(set(node),neighbors)
+                        self.assertEqual(node.deg(),len(neighbors))
+                        self.assertEqual(node.str(),sum(n[n._nodes_to_link(nl,nl2)] for nl2 in neighbors))
+
+                #replacing an intra-layer network removes the old nodes from the layer
+                if not fullyInterconnected:
+                    mono=net.MultilayerNetwork(aspects=0)
+                    mono[10,11]=1
+                    layer=nls[0][1:] if n.aspects>1 else nls[0][1]
+                    n.A[layer]=mono
+                    self.assertEqual(set(n.iter_nodes(layer)),set([10,11]))
+                    for node,nodeLayers in n._nodeToLayers.items():
+                        self.assertEqual(layer in nodeLayers,node in [10,11])
+                    len(n.edges)
+
+    def test_direct_accessors(self):
+        """Testing the accessors that don't create node objects.
+        """
+        mono=net.MultilayerNetwork(aspects=0)
+        mono[1,2]=2
+        mono[1,3]=1
+        mono[(1,2),1]=5
+        mplex=net.MultiplexNetwork(couplings='categorical',directed=True)
+        mplex[1,2,'a']=2
+        mplex[3,1,'b']=3
+        mlayer=net.MultilayerNetwork(aspects=1)
+        mlayer[1,2,'a','b']=2
+        mlayer[1,1,'a','b']=1
+        for n,nodes in [(mono,[1,2,4]),(mplex,[(1,'a'),(1,'b'),(3,'b'),(4,'a')]),(mlayer,[(1,'a'),(2,'b'),[1,'b']])]:
+            for node in nodes:
+                nodeObject=n[tuple(node)] if isinstance(node,list) else n[node]
+                self.assertEqual(n.degree_of(node),nodeObject.deg())
+                self.assertEqual(n.strength_of(node),nodeObject.str())
+                self.assertEqual(sorted(n.neighbors_of(node),key=str),sorted(nodeObject,key=str))
+        self.assertEqual(mono.degree_of((1,2)),1)
+
+        self.assertFalse(hasattr(mono[1],"__dict__"))
+        self.assertFalse(hasattr(mono.edges,"__dict__"))
+
+    def test_edge_iteration(self):
+        """Testing the edge iterator and the edge arrays against all pairs of node-layers.
+        """
+        import random
+        rnd=random.Random(3)
+        coupling=net.MultilayerNetwork(aspects=0)
+        coupling['a','b']=2
+        networks=[]
+        for directed in [False,True]:
+            networks.append(net.MultilayerNetwork(aspects=0,directed=directed))
+            networks.append(net.MultilayerNetwork(aspects=2,directed=directed,fullyInterconnected=False))
+            for couplings in ['categorical',['ordinal','categorical'],coupling]:
+                networks.append(net.MultiplexNetwork(couplings=couplings,directed=directed))
+        for n in networks:
+            for k in range(30):
+                link=tuple(rnd.choice('abc') if a%2==0 else rnd.choice('ab') for a in range(2*n.aspects+2))
+                if isinstance(n,net.MultiplexNetwork):
+                    link=(rnd.randrange(4),rnd.randrange(4,8))+tuple(rnd.choice([1,2]) if n.couplings[a//2][0]=="ordinal" else rnd.choice('ab') for a in range(n.aspects))
+                n[link]=rnd.choice([1,2])
+            for k in range(10):
+                link=tuple(rnd.choice([1,2,3]) for a in range(2*n.aspects+2))
+                if not isinstance(n,net.MultiplexNetwork):
+                    n[link]=0
+
+            expected={}
+            for nl1 in itertools.product(*n.slices):
+                for nl2 in itertools.product(*n.slices):
+                    link=n._nodes_to_link(nl1,nl2)
+                    if n[link]!=n.noEdge:
+                        key=(nl1,nl2) if n.directed else frozenset([nl1,nl2])
+                        expected[key]=n[link]
+            edges=list(n.edges)
+            self.assertEqual(len(edges),len(expected))
+            self.assertEqual(len(edges),len(n.edges))
+            for edge in edges:
+                nl1,nl2=n._link_to_nodes(edge[:-1])
+                key=(nl1,nl2) if n.directed else frozenset([nl1,nl2])
+                self.assertEqual(expected[key],edge[-1])
+
+            links,weights,labels=n.edges.to_arrays()
+            self.assertEqual(links.shape,(len(edges),2*(n.aspects+1)))
+            decoded=[tuple(labels[a//2][code] for a,code in enumerate(row))+(w,) for row,w in zip(links.tolist(),weights.tolist())]
+            self.assertEqual(decoded,edges)
 
 
 def test_net():
@@ -918,6 +1205,13 @@ def test_net():
     suite.addTest(TestNet("test_mlayer_2dim_nonglobalnodes"))
     suite.addTest(TestNet("test_mplex_adding_intralayer_nets"))
     suite.addTest(TestNet("test_selfedges"))
+    suite.addTest(TestNet("test_interning"))
+    suite.addTest(TestNet("test_add_edges_from"))
+    suite.addTest(TestNet("test_edge_counts"))
+    suite.addTest(TestNet("test_layer_index"))
+    suite.addTest(TestNet("test_coupling_neighbors"))
+    suite.addTest(TestNet("test_direct_accessors"))
+    suite.addTest(TestNet("test_edge_iteration"))
         
     return unittest.TextTestRunner().run(suite).wasSuccessful()
 
@@ -3,13 +3,14 @@ from operator import itemgetter
 import sys
 
 
-from pymnet import net,transforms,diagnostics
+from pymnet import net,transforms,diagnostics,models
 
 
 
 class TestTransforms(unittest.TestCase):
     
     def setUp(self):
+        net.CHECK_COUNTERS=True
         n=net.MultiplexNetwork([('categorical',1.0)])
 
         n[1,2,1]=1
@@ -79,6 +80,9 @@ class TestTransforms(unittest.TestCase):
         n[3,4]=2
         self.mlayer_example_monoplex=n
 
+    def tearDown(self):
+        net.CHECK_COUNTERS=False
+
     def test_aggregate_unweighted_mplex_simple(self):
         an=transforms.aggregate(self.mplex_simple,1)
         self.assertEqual(an[1,2],3)
@@ -235,6 +239,115 @@ class TestTransforms(unittest.TestCase):
         self.assertEqual(an3,transforms.aggregate(an1,1))
         self.assertEqual(an3,transforms.aggregate(an2,1))
 
+    def test_aggregate_mplex_couplings(self):
+        n=net.MultiplexNetwork([('categorical',1.0),('categorical',0.5)])
+        n[1,2,'a','x']=1
+        n[2,1,'b','x']=2
+        n[1,2,'a','y']=3
+        n[2,3,'b','y']=1
+        an=transforms.aggregate(n,1)
+        self.assertEqual(an[1,2,'x'],3)
+        self.assertEqual(an[1,2,'y'],3)
+        self.assertEqual(an[1,1,'x','y'],1.0)
+        self.assertEqual(an[1,1,'x','x'],0)
+        self.assertEqual(len(an.edges),3+3)
+        an=transforms.aggregate(n,1,selfEdges=True)
+        self.assertEqual(an[1,1,'x','x'],1.0)
+        self.assertEqual(an[3,3,'y','y'],1.0)
+        an=transforms.aggregate(n,(1,2),selfEdges=True)
+        self.assertEqual(an[1,2],6)
+        self.assertEqual(an[1,1],2*1.0+2*0.5)
+
+    def test_aggregate_reducers(self):
+        n=net.MultiplexNetwork([('categorical',1.0)])
+        n[1,2,'a']=1
+        n[1,2,'b']=4
+        n[1,2,'c']=2
+        n[2,3,'b']=3
+        maxnet,meannet,countnet,unionnet,rangenet=transforms.aggregate(n,1,reducer=("max","mean","count","union",lambda w:max(w)-min(w)))
+        self.assertEqual((maxnet[1,2],maxnet[2,3]),(4,3))
+        self.assertEqual((meannet[1,2],meannet[2,3]),(7/3.0,3))
+        self.assertEqual((countnet[1,2],countnet[2,3]),(3,1))
+        self.assertEqual((unionnet[1,2],unionnet[2,3]),(1,1))
+        self.assertEqual((rangenet[1,2],rangenet[2,3]),(3,0))
+        self.assertEqual(len(countnet.edges),2)
+        self.assertEqual(transforms.aggregate(n,1,reducer="min")[1,2],1)
+        self.assertEqual(transforms.aggregate(n,1,reducer=["sum"])[0],transforms.aggregate(n,1))
+
+        tn=transforms.aggregate(n,1,reducer=("sum","count"),tupleWeights=True)
+        self.assertEqual(set(tn.edges),set([(1,2,(7,3)),(2,3,(3,1))]))
+        self.assertRaises(AssertionError,lambda :transforms.aggregate(n,1,reducer="median"))
+
+        fn=n.freeze()
+        maxnet,countnet=transforms.aggregate(fn,1,reducer=("max","count"))
+        self.assertEqual((maxnet[1,2],countnet[1,2]),(4,3))
+        self.assertTrue(maxnet is transforms.aggregate(fn,1,reducer=("max","count"))[0])
+        rangenet=transforms.aggregate(fn,1,reducer=lambda w:max(w)-min(w))
+        self.assertEqual(rangenet[1,2],3)
+        self.assertTrue(rangenet is not transforms.aggregate(fn,1,reducer=lambda w:max(w)-min(w)))
+        self.assertEqual(len(fn._derivedCache),1)
+
+    def test_threshold(self):
+        n=net.MultiplexNetwork([('categorical',0.5)])
+        n[1,2,'a']=1
+        n[1,3,'a']=2
+        n[1,4,'a']=3
+        n[2,4,'a']=0.5
+        n[2,3,'b']=5
+        n[3,4,'b']=10
+        tn=transforms.threshold(n,2)
+        self.assertFalse(isinstance(tn,net.MultiplexNetwork))
+        self.assertEqual(set(tn.edges),set([(1,3,'a','a',2),(1,4,'a','a',3),(2,3,'b','b',5),(3,4,'b','b',10)]))
+        self.assertEqual(len(transforms.threshold(n,0.5,method=">=").edges),6+4)
+        self.assertEqual(len(transforms.threshold(n,0.5,method=">").edges),5)
+        self.assertEqual(len(transforms.threshold(n,2,method="<").edges),2+4)
+        self.assertRaises(Exception,lambda :transforms.threshold(n,2,method="=="))
+
+        tn=transforms.threshold(n,3,ignoreCouplingEdges=True)
+        self.assertTrue(isinstance(tn,net.MultiplexNetwork))
+        self.assertEqual(set(tn.A['a'].edges),set([(1,4,3)]))
+        self.assertEqual(tn[1,1,'a','b'],0.5)
+
+        tn=transforms.threshold(n,None,topk=1,ignoreCouplingEdges=True)
+        self.assertEqual(set(tn.A['a'].edges),set([(1,2,1),(1,3,2),(1,4,3)]))
+        self.assertEqual(set(tn.A['b'].edges),set([(2,3,5),(3,4,10)]))
+        tn=transforms.threshold(n,None,method="<=",topk=1,ignoreCouplingEdges=True)
+        self.assertEqual(set(tn.A['a'].edges),set([(1,2,1),(1,3,2),(2,4,0.5)]))
+        tn=transforms.threshold(n,1,topk=1,ignoreCouplingEdges=True)
+        self.assertEqual(set(tn.A['a'].edges),set([(1,2,1),(1,3,2),(1,4,3)]))
+        tn=transforms.threshold(n,None,quantile=0.5,ignoreCouplingEdges=True)
+        self.assertEqual(set(tn.A['a'].edges),set([(1,3,2),(1,4,3)]))
+        self.assertEqual(set(tn.A['b'].edges),set([(3,4,10)]))
+
+        self.assertRaises(TypeError,lambda :transforms.threshold(n,2,inplace=True))
+        self.assertTrue(transforms.threshold(n,3,inplace=True,ignoreCouplingEdges=True) is n)
+        self.assertEqual(set(n.A['a'].edges),set([(1,4,3)]))
+        self.assertEqual(len(n.edges),3+4)
+
+        d=net.MultilayerNetwork(aspects=1,directed=True,fullyInterconnected=False)
+        d[1,2,'a','a']=1
+        d[1,3,'a','a']=2
+        d[3,1,'a','b']=4
+        d.add_node(4,layer='b')
+        tn=transforms.threshold(d,None,topk=1)
+        self.assertEqual(set(tn.edges),set([(1,3,'a','a',2),(3,1,'a','b',4)]))
+        self.assertEqual(set(tn.iter_node_layers()),set(d.iter_node_layers()))
+        tn=transforms.threshold(d,3,ignoreCouplingEdges=True)
+        self.assertEqual(set(tn.edges),set([(3,1,'a','b',4)]))
+        transforms.threshold(d,2,inplace=True)
+        self.assertEqual(set(d.edges),set([(1,3,'a','a',2),(3,1,'a','b',4)]))
+
+        import numpy
+        m=models.er(30,3*[0.3])
+        for layer in m.iter_layers():
+            for e in list(m.A[layer].edges):
+                m.A[layer][e[0],e[1]]=1+(e[0]*e[1])%7
+        for quantile in [0,0.3,0.5,0.75,1]:
+            tn=transforms.threshold(m,None,quantile=quantile,ignoreCouplingEdges=True)
+            for layer in m.iter_layers():
+                weights=[e[2] for e in m.A[layer].edges]
+                q=numpy.quantile(weights,quantile)
+                self.assertEqual(len(tn.A[layer].edges),sum(1 for w in weights if w>=q))
 
     def test_normalize_mplex_simple(self):
         n=net.MultiplexNetwork([('categorical',1.0)])
@@ -287,6 +400,146 @@ class TestTransforms(unittest.TestCase):
         self.assertEqual(transforms.normalize(self.mplex_nonaligned_simple),n)
 
 
+    def test_relabel_bulk(self):
+        directed=net.MultilayerNetwork(aspects=2,directed=True,fullyInterconnected=False)
+        directed[1,2,'a','b','x','x']=2
+        directed[2,1,'b','b','x','y']=3
+        directed[3,3,'a','a','y','y']=4
+        directed.add_node(4,layer=('b','y'))
+        indexed=net.MultilayerNetwork(aspects=1)
+        indexed[1,2,'a','b']=1
+        indexed[2,3,'b','b']=2
+        indexed.enable_layer_index()
+        maps=({1:'one',2:'two',4:3,3:4},[{'a':'b','b':'a'},{'x':0}])
+        for n,nodeNames,layerNames in [(self.mlayer_example_1d,maps[0],maps[1][0]),(directed,)+maps,(indexed,maps[0],maps[1][:1])]:
+            #the bulk relabeling gives the same network as copying the links one by one
+            expected=transforms.relabel(transforms.subnet(n,*n.slices,view=True),nodeNames,layerNames)
+            copy=transforms.relabel(n,nodeNames,layerNames)
+            self.assertFalse(copy is n)
+            self.assertEqual(copy,expected)
+            self.assertEqual(set(copy.iter_node_layers()),set(expected.iter_node_layers()))
+            for nl in expected.iter_node_layers():
+                self.assertEqual(set(copy[nl]),set(expected[nl]))
+                self.assertEqual(copy[nl].deg(),expected[nl].deg())
+            copy[next(iter(copy.edges))[:-1]]=0 #the copy is independent of the original
+            self.assertTrue(n!=copy)
+            self.assertTrue(transforms.relabel(n,nodeNames,layerNames,inplace=True) is n)
+            self.assertEqual(n,expected)
+        self.assertEqual(set(indexed['one',:,'b',:]),set([('two','a')]))
+        self.assertEqual(indexed['two','one','a','b'],1)
+
+        #multiplex networks keep their couplings
+        for n in [self.mplex_simple,self.mplex_nonaligned_simple]:
+            edges=set(n.edges)
+            newNet=transforms.relabel(n,{1:'one'},{3:'three'})
+            self.assertEqual(len(newNet.edges),len(edges))
+            self.assertEqual(newNet['one',2,1],n[1,2,1])
+            self.assertEqual(newNet['one',4,'three'],n[1,4,3])
+            self.assertEqual(newNet['one','one',1,'three'],1.0)
+            transforms.relabel(n,{1:'one'},{3:'three'},inplace=True)
+            self.assertEqual(n,newNet)
+        self.assertEqual(list(self.mplex_nonaligned_simple.iter_nodes(1)),list(newNet.iter_nodes(1)))
+
+        #maps which are not one-to-one merge nodes
+        merged=transforms.relabel(self.mlayer_example_monoplex,{2:1})
+        self.assertEqual(len(merged),len(self.mlayer_example_monoplex)-1)
+        self.assertRaises(TypeError,lambda :transforms.relabel(self.mlayer_example_monoplex,{2:1},inplace=True))
+
+    def test_normalize_map_arrays(self):
+        n=net.MultilayerNetwork(aspects=1)
+        n[10,30,'b','a']=1
+        n[20,30,'a','a']=2
+        newNet,nodeNames,layerNames=transforms.normalize(n,nodesToIndices=True,layersToIndices=False,mapArrays=True)
+        self.assertEqual(list(nodeNames[[10,20,30]]),[0,1,2])
+        self.assertEqual(nodeNames[15],-1)
+        self.assertEqual(list(layerNames),['a','b'])
+        self.assertEqual(newNet[0,2,1,0],1)
+        self.assertEqual(newNet[1,2,0,0],2)
+        self.assertRaises(ValueError,lambda :transforms.normalize(n,layersToIndices=True,mapArrays=True))
+        self.assertTrue(transforms.normalize(n,nodeStart=1,inplace=True) is n)
+        self.assertEqual(n[1,3,1,0],1)
+
+    def test_overlay_and_underlying_graph(self):
+        o=transforms.overlay_network(self.mplex_simple)
+        self.assertEqual(set(o),set([1,2,3,4]))
+        self.assertEqual(o[1,2],3)
+        self.assertEqual(o[1,4],2)
+        self.assertEqual(o[2,4],1)
+        self.assertEqual(len(o.edges),6)
+        n=net.MultilayerNetwork(aspects=1,directed=True)
+        n[1,2,'a','a']=1
+        n[1,2,'b','b']=2
+        n[1,1,'a','a']=1
+        n[1,2,'a','b']=5
+        n.add_node(3)
+        o=transforms.overlay_network(n)
+        self.assertEqual(o[1,2],3)
+        self.assertEqual(o[2,1],0)
+        self.assertEqual(o[1,1],1)
+        self.assertEqual(set(o),set([1,2,3]))
+
+        g=transforms.get_underlying_graph(self.mplex_simple)
+        self.assertEqual(len(g),12)
+        self.assertEqual(len(g.edges),len(self.mplex_simple.edges))
+        self.assertEqual(g[str((1,1)),str((2,1))],1)
+        self.assertEqual(g[str((1,1)),str((1,2))],1.0)
+        g,nodelayers=transforms.get_underlying_graph(n,nodeNames="index")
+        self.assertEqual(set(g),set(range(6)))
+        self.assertEqual(g[nodelayers.index((1,'a')),nodelayers.index((2,'b'))],5)
+        self.assertEqual(g[nodelayers.index((2,'b')),nodelayers.index((1,'a'))],0)
+        m,nodelayers=transforms.get_underlying_graph(self.mplex_simple,sparse=True)
+        self.assertEqual(m.shape,(12,12))
+        self.assertEqual(m.nnz,2*len(self.mplex_simple.edges))
+        self.assertEqual(m[nodelayers.index((2,1)),nodelayers.index((1,1))],1)
+
+        mono=models.er(10,0.4)
+        g=transforms.get_underlying_graph(mono)
+        self.assertEqual(set(g),set(str((node,)) for node in mono))
+        self.assertEqual(set((frozenset(e[:2]),e[2]) for e in g.edges),set((frozenset((str((e[0],)),str((e[1],)))),e[2]) for e in mono.edges))
+        g,nodelayers=transforms.get_underlying_graph(mono,nodeNames="index")
+        self.assertEqual(set((frozenset((nodelayers[e[0]][0],nodelayers[e[1]][0])),e[2]) for e in g.edges),set((frozenset(e[:2]),e[2]) for e in mono.edges))
+        m,nodelayers=transforms.get_underlying_graph(mono,sparse=True)
+        self.assertEqual(m.nnz,2*len(mono.edges))
+        for e in mono.edges:
+            self.assertEqual(m[nodelayers.index((e[0],)),nodelayers.index((e[1],))],e[2])
+
+    def test_randomize_edges(self):
+        n=models.er(50,[0.1,0.1,0.1])
+        for i in range(0,50,2):
+            for layer in [1,2]:
+                n[i,i+1,layer]=1
+        nonaligned=net.MultiplexNetwork(couplings='categorical',fullyInterconnected=False)
+        for i in range(10):
+            nonaligned[i,i+1,'a']=1
+            nonaligned[i+5,i+6,'b']=1
+        for directed in [False,True]:
+            d=net.MultiplexNetwork(couplings='categorical',directed=directed)
+            for i in range(10):
+                d[i,(i+1)%10,'a']=1
+                d[i,(i+3)%10,'a']=1
+            for original in [n,nonaligned,d]:
+                for preserveOverlaps in [False,True]:
+                    r=transforms.randomize_edges(original,preserveOverlaps=preserveOverlaps,seed=1)
+                    self.assertEqual(r,transforms.randomize_edges(original,preserveOverlaps=preserveOverlaps,seed=1))
+                    self.assertEqual(len(r.edges),len(original.edges))
+                    self.assertEqual(set(r.iter_node_layers()),set(original.iter_node_layers()))
+                    for nl in original.iter_node_layers():
+                        self.assertEqual(r[nl].deg(),original[nl].deg())
+                        if directed:
+                            self.assertEqual(r[nl].deg_out(),original[nl].deg_out())
+                            self.assertEqual(r[nl].str_out(),original[nl].str_out())
+                    if preserveOverlaps:
+                        self.assertEqual(diagnostics.overlap_degs(r),diagnostics.overlap_degs(original))
+        self.assertTrue(transforms.randomize_edges(n,seed=1)!=n)
+
+        edges=set(n.edges)
+        self.assertTrue(transforms.randomize_edges(n,seed=2,inplace=True) is n)
+        self.assertNotEqual(set(n.edges),edges)
+        replicates=transforms.randomize_edges_replicates(n,[3,4])
+        self.assertEqual(replicates[1],transforms.randomize_edges(n,seed=4))
+        self.assertEqual(replicates,transforms.randomize_edges_replicates(n,[3,4],processes=2))
+        self.assertEqual(len(transforms.randomize_edges_replicates(n,3)),3)
+
     def test_randomize_nodes_by_layer(self):
         n=transforms.randomize_nodes_by_layer(self.mplex_nonaligned_simple)
         self.assertNotEqual(n,self.mplex_nonaligned_simple)
@@ -344,6 +597,161 @@ class TestTransforms(unittest.TestCase):
         non_fully_interc[1,'X'][2,'X'] = 1
         self.assertRaises(TypeError,lambda :transforms.subnet(non_fully_interc,non_fully_interc.get_layers(aspect=0),non_fully_interc.get_layers(aspect=1),newNet=net.MultilayerNetwork(aspects=1,fullyInterconnected=True)))
 
+    def test_subnet_view(self):
+        def links(n):
+            if n.directed:
+                return set((n._link_to_nodes(edge[:-1]),edge[-1]) for edge in n.edges)
+            return set((frozenset(n._link_to_nodes(edge[:-1])),edge[-1]) for edge in n.edges)
+
+        def assert_same(view,copy):
+            self.assertEqual(view.slices,copy.slices)
+            self.assertEqual(set(view.iter_node_layers()),set(copy.iter_node_layers()))
+            self.assertEqual(links(view),links(copy))
+            self.assertEqual(len(view.edges),len(copy.edges))
+            for nl in copy.iter_node_layers():
+                self.assertEqual(set(view[nl]),set(copy[nl]))
+                self.assertEqual(view[nl].deg(),copy[nl].deg())
+                self.assertEqual(view[nl].str(),copy[nl].str())
+                if copy.directed:
+                    self.assertEqual(view[nl].deg_in(),copy[nl].deg_in())
+                    self.assertEqual(view[nl].deg_out(),copy[nl].deg_out())
+
+        directed=net.MultilayerNetwork(aspects=1,directed=True)
+        directed[1,2,'a','b']=2
+        directed[2,1,'b','b']=3
+        directed[3,1,'a','a']=4
+        nonglobal=net.MultiplexNetwork(couplings=['categorical','ordinal'],fullyInterconnected=False)
+        nonglobal[1,2,'a',1]=1
+        nonglobal[1,3,'b',1]=1
+        nonglobal[1,2,'a',2]=1
+        nonglobal.add_node(4,layer=('b',2))
+        cases=[(self.mplex_simple,[1,2,4],[2,3]),
+               (self.mlayer_example_monoplex,[2,3,4]),
+               (self.mlayer_example_1d,[2,3,4],['A']),
+               (self.mlayer_example_2d,[2,3,4],None,['X','dummy']),
+               (directed,[1,2],['a','b']),
+               (nonglobal,[1,2,4],['a','b'],[2])]
+        for case in cases:
+            view=transforms.subnet(*case,view=True)
+            self.assertTrue(isinstance(view,net.SubnetView))
+            copy=transforms.subnet(*case)
+            assert_same(view,copy)
+            self.assertEqual(view.materialize(),copy)
+            self.assertEqual(view,copy)
+            self.assertEqual(set(diagnostics.degs(view,degstype="nodes").items()),set(diagnostics.degs(copy,degstype="nodes").items()))
+
+        #views of multiplex networks have the couplings and the intra-layer networks of the copies
+        dmplex=net.MultiplexNetwork(couplings=[('categorical',2.0)],directed=True)
+        dmplex[0,1,'a','a']=1
+        dmplex[2,0,'a','a']=2
+        dmplex[0,1,'b','b']=3
+        dmplex[0,3,'c','c']=1
+        for case in [(dmplex,[0,1,2],['a','b']),(self.mplex_simple,[1,2,4],[2,3]),(nonglobal,[1,2,4],['a','b'],[2])]:
+            view,copy=transforms.subnet(*case,view=True),transforms.subnet(*case)
+            assert_same(view,copy)
+            self.assertEqual(view.couplings,copy.couplings)
+            self.assertEqual(set(view.A),set(copy.A))
+            for layer in copy.A:
+                self.assertEqual(set(view.A[layer].edges),set(copy.A[layer].edges))
+            self.assertEqual(diagnostics.multiplex_degs(view),diagnostics.multiplex_degs(copy))
+            self.assertEqual(diagnostics.multiplex_density(view),diagnostics.multiplex_density(copy))
+            if copy.aspects==1:
+                self.assertEqual(diagnostics.overlap_degs(view),diagnostics.overlap_degs(copy))
+            nodelayers,arrays=diagnostics.degree_arrays(view)
+            cnodelayers,carrays=diagnostics.degree_arrays(copy)
+            for key in carrays:
+                self.assertEqual(dict(zip(nodelayers,arrays[key])),dict(zip(cnodelayers,carrays[key])))
+        view=transforms.subnet(dmplex,[0,1,2],['a','b'],view=True)
+        self.assertEqual(view[0,'a'].str(),5)
+        self.assertEqual((view[0,'a'].str_in(),view[0,'a'].str_out()),(4,3))
+        view[0,1,'a','a']=4
+        self.assertEqual(view.A['a'][0,1],4)
+        self.assertEqual(dmplex.A['a'][0,1],1)
+        self.assertRaises(AttributeError,lambda :transforms.subnet(directed,[1,2],['a','b'],view=True).A)
+
+        #changes to the original network are visible until the view is written
+        n=transforms.subnet(self.mplex_simple,[1,2,3,4],[1,2,3])
+        view=transforms.subnet(n,[1,2,3],[1,2],view=True)
+        n[2,3,2]=1
+        self.assertEqual(view[2,3,2],1)
+        view[1,2,1]=0
+        view[1,2,3]=1
+        self.assertEqual(view[1,2,1],0)
+        self.assertEqual(view[1,2,3],1)
+        self.assertEqual(n[1,2,1],1)
+        self.assertEqual(n[1,2,3],1)
+        n[2,3,1]=0
+        self.assertEqual(view[2,3,1],1)
+        self.assertEqual(view.slices,[set([1,2,3]),set([1,2,3])])
+        self.assertEqual(len(view.edges),len(view.materialize().edges))
+        self.assertRaises(AssertionError,lambda :transforms.subnet(n,[1],[1],view=True,nolinks=True))
+
+    def test_subnet_iter(self):
+        n=net.MultilayerNetwork(aspects=0)
+        n[1,2]=1
+        n[2,3]=2
+        n[3,1]=1
+        subnets=list(transforms.subnet_iter(n))
+        self.assertEqual(len(subnets),2**3)
+        self.assertEqual(sorted(len(s.edges) for s in subnets),[0,1,1,1,2,2,2,3])
+        self.assertEqual(len(set(frozenset(s.edges) for s in subnets)),2**3)
+        self.assertEqual(len(list(transforms.subnet_iter(n,remove_elayers=[0]))),3*1+3*2+1*8)
+        self.assertEqual(len(list(transforms.subnet_iter(n,remove_elayers=[0],remove_edges=False))),7)
+
+        #pruning by the number of edges skips the whole branches
+        calls=[]
+        def prune(s):
+            calls.append(len(s.edges))
+            return len(s.edges)>1
+        subnets=list(transforms.subnet_iter(n,prune=prune))
+        self.assertEqual(sorted(len(s.edges) for s in subnets),[0,1,1,1])
+        self.assertEqual(len(calls),6)
+
+        #the working network is reused if not copied
+        subnets=list(transforms.subnet_iter(n,copy=False))
+        self.assertEqual(len(subnets),2**3)
+        self.assertTrue(all(s is subnets[0] for s in subnets))
+        self.assertEqual(len(subnets[0].edges),0)
+
+        #coupling edges are kept in multiplex networks
+        m=net.MultiplexNetwork(couplings='categorical')
+        m[1,2,'a']=1
+        m[2,3,'b']=1
+        m.add_node(1,layer='b')
+        m.add_node(3,layer='a')
+        subnets=list(transforms.subnet_iter(m))
+        self.assertEqual(len(subnets),2**2)
+        for s in subnets:
+            self.assertEqual(s[1,1,'a','b'],1)
+            self.assertEqual(s[3,3,'a','b'],1)
+
+    def test_supra_adjacency_matrix_sparse(self):
+        mlayer=net.MultilayerNetwork(aspects=2,directed=True)
+        mlayer[1,2,'a','b','x','x']=2
+        mlayer[2,1,'b','b','x','y']=3
+        mlayer[1,1,'a','a','x','x']=4
+        mlayer[3,1,'a','a','y','y']=5
+        mono=net.MultilayerNetwork(aspects=0)
+        mono[1,2]=1
+        mono[2,2]=1
+        mono[3,1]=2
+        coupling=net.MultilayerNetwork(aspects=0)
+        coupling['a','b']=2
+        nonglobal=net.MultiplexNetwork(couplings=[coupling,'ordinal'],fullyInterconnected=False)
+        nonglobal[1,2,'a',1]=1
+        nonglobal[1,3,'b',1]=1
+        nonglobal[1,2,'a',2]=1
+        nonglobal.add_node(4,layer=('b',2))
+
+        for n in [self.mplex_simple,mlayer,mono,nonglobal]:
+            for includeCouplings,includeIntraLayer in [(True,True),(False,True),(True,False)]:
+                m1,nodes1=transforms.supra_adjacency_matrix(n,includeCouplings=includeCouplings,includeIntraLayer=includeIntraLayer)
+                m2,nodes2=transforms.supra_adjacency_matrix(n,includeCouplings=includeCouplings,includeIntraLayer=includeIntraLayer,sparse=True)
+                self.assertEqual(nodes1,nodes2)
+                self.assertTrue((m1==m2.toarray()).all())
+        m,nodes=transforms.supra_adjacency_matrix(mlayer,includeIntraLayer=False,sparse=True)
+        self.assertEqual(m.nnz,2)
+
 
 def test_transforms():
     suite = unittest.TestSuite()    
@@ -352,12 +760,22 @@ def test_transforms():
     suite.addTest(TestTransforms("test_aggregate_2dim_mlayer_nonglobal_nodes"))
     suite.addTest(TestTransforms("test_aggregate_1dim_mlayer_nonglobal_nodes"))
     suite.addTest(TestTransforms("test_aggregate_2dim_mlayer_interlayeredges"))
+    suite.addTest(TestTransforms("test_aggregate_mplex_couplings"))
+    suite.addTest(TestTransforms("test_aggregate_reducers"))
+    suite.addTest(TestTransforms("test_threshold"))
     suite.addTest(TestTransforms("test_subnet_mlayer_example"))
     suite.addTest(TestTransforms("test_subnet_mplex_simple"))
     suite.addTest(TestTransforms("test_subnet_mplex_to_mlayer"))
     suite.addTest(TestTransforms("test_subnet_different_interconnectivities"))
+    suite.addTest(TestTransforms("test_subnet_view"))
+    suite.addTest(TestTransforms("test_subnet_iter"))
     suite.addTest(TestTransforms("test_normalize_mplex_simple"))
+    suite.addTest(TestTransforms("test_relabel_bulk"))
+    suite.addTest(TestTransforms("test_normalize_map_arrays"))
     suite.addTest(TestTransforms("test_randomize_nodes_by_layer"))
+    suite.addTest(TestTransforms("test_randomize_edges"))
+    suite.addTest(TestTransforms("test_overlay_and_underlying_graph"))
+    suite.addTest(TestTransforms("test_supra_adjacency_matrix_sparse"))
     
     return unittest.TextTestRunner().run(suite).wasSuccessful() 
 
@@ -192,6 +192,16 @@ class TestVisuals(unittest.TestCase):
         fig=visuals.draw(mplex,layout="fr")
         fig.savefig(os.path.join(self.figdirpath,"mplex_er100_fr.png"))
 
+    def test_draw_subnet_view(self):
+        from pymnet import transforms
+        view=transforms.subnet(self.mlayer_nonaligned_aligntest,[0,1,2,5],['a','b'],view=True)
+        self.assertEqual(view._nodeToLayers,{0:{'a'},1:{'b'},2:{'b'},5:{'b'}})
+        self.assertEqual(view._layerToNodes,{'a':{0},'b':{1,2,5}})
+        nc=visuals.layouts.get_fruchterman_reingold_multilayer_layout(view)
+        self.assertEqual(set(nc),set(view))
+        fig=visuals.draw(view,nodeCoords=nc)
+        fig.savefig(os.path.join(self.figdirpath,"mlayer_nonaligned_subnet_view.png"))
+
 
 
 def test_visuals():
@@ -205,6 +215,7 @@ def test_visuals():
     suite.addTest(TestVisuals("test_multiaxis"))
     suite.addTest(TestVisuals("test_mplex_networkx_layouts"))
     suite.addTest(TestVisuals("test_mplex_fr_layout"))
+    suite.addTest(TestVisuals("test_draw_subnet_view"))
     return unittest.TextTestRunner().run(suite).wasSuccessful() 
 
 if __name__ == '__main__':
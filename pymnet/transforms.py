@@ -2,6 +2,8 @@
 """
 import math
 import itertools
+import array
+import operator
 import random
 from functools import reduce
 
@@ -11,7 +13,7 @@ import pymnet as netmodule #this is the solution
 
 
 
-def aggregate(net,aspects,newNet=None,selfEdges=False):
+def aggregate(net,aspects,newNet=None,selfEdges=False,reducer="sum",tupleWeights=False):
     """Reduces the number of aspects by aggregating them.
 
     This function aggregates edges from multilayer aspects together
@@ -23,6 +25,15 @@ def aggregate(net,aspects,newNet=None,selfEdges=False):
     Note that no self-links are created and all the inter-layer links
     are disregarded.
 
+    Instead of the sum, the weights can be reduced to other statistics such as
+    the maximum weight or the number of layers in which an edge appears. Several 
+    statistics can be computed in one pass over the edges by giving a sequence
+    of reducers.
+
+    If NumPy is available, the edges are read as columns and the weights are
+    reduced with grouped array reductions. The summed weights are then floats
+    if any of the weights is a float.
+
     Parameters
     ----------
     net : MultilayerNetwork
@@ -34,11 +45,26 @@ def aggregate(net,aspects,newNet=None,selfEdges=False):
        created by this function.
     selfEdges : bool 
        If true aggregates self-edges too
+    reducer : string, callable, or sequence
+       The statistic of the weights of the edges that are aggregated together:
+       'sum', 'max', 'min', 'mean', 'count' (the number of the edges, e.g., the
+       edge overlap when aggregating layers), or 'union' (weight 1 for each 
+       aggregated edge). A callable is given the list of the weights and it
+       returns the new weight. If a sequence of reducers is given, a network is
+       returned for each of them.
+    tupleWeights : bool
+       If True and a sequence of reducers is given, a single network is returned
+       and its edge weights are tuples of the statistics.
 
     Returns
     -------
-    net : MultiplexNetwork
-       A new instance of multiplex network which is produced.
+    net : MultiplexNetwork, or tuple of MultiplexNetworks
+       A new instance of multiplex network which is produced. If the original
+       network is frozen (see MultilayerNetwork.freeze) and newNet is not given,
+       the aggregated network is also frozen, and it is computed only once
+       unless some of the reducers are callables. A tuple with a network for
+       each reducer is returned if a sequence of reducers is given and
+       tupleWeights is False.
 
     Examples
     --------
@@ -54,67 +80,256 @@ def aggregate(net,aspects,newNet=None,selfEdges=False):
     >>> an1=transforms.aggregate(n,1)
     >>> an2=transforms.aggregate(n,2)
     >>> an12=transforms.aggregate(n,(1,2))
+
+    The maximum weights and edge overlaps can be computed together:
+
+    >>> maxnet,overlapnet=transforms.aggregate(n,1,reducer=("max","count"))
     """
     try:
         aspects=int(aspects)
         aspects=(aspects,)
     except TypeError:
         pass
-    
+
+    if isinstance(reducer,str) or callable(reducer):
+        reducers=(reducer,)
+        severalNets=False
+        tupleWeights=False
+    else:
+        reducers=tuple(reducer)
+        severalNets=not tupleWeights
+    for r in reducers:
+        assert callable(r) or r in AGGREGATION_REDUCERS, "Invalid reducer: "+str(r)
+
     if newNet==None:
-        newNet=netmodule.MultilayerNetwork(aspects=net.aspects-len(aspects),
+        newNets=[netmodule.MultilayerNetwork(aspects=net.aspects-len(aspects),
                                  noEdge=net.noEdge,
                                  directed=net.directed,
-                                 fullyInterconnected=net.fullyInterconnected)
-    assert newNet.aspects==net.aspects-len(aspects)
+                                 fullyInterconnected=net.fullyInterconnected) for r in (reducers if severalNets else (reducer,))]
+        if hasattr(net,"_derivedCache") and not tupleWeights: #frozen network
+            def freeze_aggregate():
+                frozen=tuple(n.freeze() for n in _aggregate_into(net,aspects,newNets,selfEdges,reducers,tupleWeights))
+                return frozen if severalNets else frozen[0]
+            if all(isinstance(r,str) for r in reducers): #callables are not kept alive in the cache
+                return net._cached(("aggregate",tuple(aspects),selfEdges,reducers,severalNets),freeze_aggregate)
+            return freeze_aggregate()
+    else:
+        assert not severalNets, "Only one newNet can be given. Use tupleWeights=True for several reducers."
+        newNets=[newNet]
+
+    _aggregate_into(net,aspects,newNets,selfEdges,reducers,tupleWeights)
+    if severalNets:
+        return tuple(newNets)
+    return newNets[0]
+
+
+def _aggregate_into(net,aspects,newNets,selfEdges,reducers,tupleWeights):
+    """Fills the empty networks with the aggregated network, one network for each
+    reducer or a single network if tupleWeights is True, and returns them.
+    """
+    assert newNets[0].aspects==net.aspects-len(aspects)
     for d in aspects:
         assert 0<d<=(net.aspects+1)
 
-    #Add nodes
-    for node in net:
-        newNet.add_node(node)
-    
-    #Add edges
-    edgeIndices=list(filter(lambda x:math.floor(x/2) not in aspects,range(2*(net.aspects+1))))
-    for edge in net.edges:
-        newEdge=[]
-        for index in edgeIndices:
-            newEdge.append(edge[index])
-        if selfEdges or not newEdge[0::2]==newEdge[1::2]:
-            newNet[tuple(newEdge)]=newNet[tuple(newEdge)]+edge[-1]
-
-    #Add node-layer tuples (if not node-aligned)
-    if not net.fullyInterconnected and newNet.aspects>0:
-        nodeIndices=list(filter(lambda x:x not in aspects,range(1,net.aspects+1)))
-        for nlt in net.iter_node_layers():
-            newlayer=[]
-            for a in nodeIndices:
-                newlayer.append(nlt[a])
-            #we need to use the public interface for adding nodes which means that
-            #layers are only given as tuples for multi-aspect networks
-            if len(newlayer)==1: 
-                newNet.add_node(nlt[0],layer=newlayer[0])
-            else:
-                newNet.add_node(nlt[0],layer=newlayer)
+    nodelayers,sources,targets,columns=_aggregate_links(net,aspects,selfEdges,reducers)
+    if tupleWeights:
+        columns=[list(zip(*columns))]
+        reducers=(None,)
+
+    for newNet,r,weights in zip(newNets,reducers,columns):
+        #Add nodes
+        for node in net:
+            newNet.add_node(node)
+
+        #Add edges
+        if r=="sum" and (newNet.noEdge!=0 or len(newNet.edges)>0):
+            weights=[newNet[newNet._nodes_to_link(nodelayers[i],nodelayers[j])]+w for i,j,w in zip(sources,targets,weights)]
+        newNet.add_edges_from(sources=[nodelayers[i][0] for i in sources],
+                              targets=[nodelayers[j][0] for j in targets],
+                              layers=[[nodelayers[i][a] for i in sources] for a in range(1,newNet.aspects+1)],
+                              targetLayers=[[nodelayers[j][a] for j in targets] for a in range(1,newNet.aspects+1)],
+                              weights=weights)
+
+        #Add node-layer tuples (if not node-aligned)
+        if not net.fullyInterconnected and newNet.aspects>0:
+            nodeIndices=list(filter(lambda x:x not in aspects,range(1,net.aspects+1)))
+            for nlt in net.iter_node_layers():
+                newlayer=[]
+                for a in nodeIndices:
+                    newlayer.append(nlt[a])
+                #we need to use the public interface for adding nodes which means that
+                #layers are only given as tuples for multi-aspect networks
+                if len(newlayer)==1: 
+                    newNet.add_node(nlt[0],layer=newlayer[0])
+                else:
+                    newNet.add_node(nlt[0],layer=newlayer)
+    return newNets
 
-    return newNet
+
+#The statistics of edge weights for aggregate: the reduction of a list of
+#weights, and the grouped NumPy reduction of sorted weights given the first
+#index and the size of each group.
+AGGREGATION_REDUCERS={
+    "sum":(sum,lambda numpy,w,starts,counts:numpy.add.reduceat(w,starts)),
+    "max":(max,lambda numpy,w,starts,counts:numpy.maximum.reduceat(w,starts)),
+    "min":(min,lambda numpy,w,starts,counts:numpy.minimum.reduceat(w,starts)),
+    "mean":(lambda w:sum(w)/float(len(w)),lambda numpy,w,starts,counts:numpy.add.reduceat(w,starts)/counts.astype(float)),
+    "count":(len,lambda numpy,w,starts,counts:counts),
+    "union":(lambda w:1,lambda numpy,w,starts,counts:numpy.ones(len(starts),dtype=int)),
+    }
+
+
+def _aggregate_links(net,aspects,selfEdges,reducers):
+    """Projects the edges of a network to the aspects that are not aggregated
+    and reduces the weights of the edges that are projected to the same edge.
+
+    If NumPy is available, the edges of dict-based networks (and the intra-layer
+    networks of multiplex networks) are read from the adjacency dicts as columns,
+    and the weights are reduced with grouped reductions of the columns. Coupling 
+    edges of multiplex networks along the aggregated aspects are skipped unless
+    self-edges are kept.
+
+    Returns
+    -------
+    nodelayers : list
+       The projected node-layer tuples.
+    sources, targets : list
+       The indices of the end points of the aggregated edges in nodelayers. 
+    columns : list of lists
+       The weights of the aggregated edges for each reducer (see aggregate).
+    """
+    try:
+        import numpy
+    except ImportError:
+        numpy=None
+
+    keep=[a for a in range(net.aspects+1) if a not in aspects]
+    nodelayers=[]
+    ids={}
+    def project(nl):
+        nl=tuple(nl[a] for a in keep)
+        i=ids.get(nl)
+        if i is None:
+            i=ids[nl]=len(nodelayers)
+            nodelayers.append(nl)
+        return i
+
+    #Adjacency dicts to be read as columns, and the layers to be appended to their node-layers
+    adjacencies=[]
+    if isinstance(net,netmodule.MultiplexNetwork):
+        if numpy is not None:
+            for layer in net.iter_layers():
+                adjacencies.append((net.A[layer],layer if net.aspects>1 else (layer,)))
+            links=net._iter_coupling_links([a for a in range(1,net.aspects+1) if selfEdges or a in keep])
+        else:
+            links=itertools.chain(net._iter_intra_links(),
+                                  net._iter_coupling_links([a for a in range(1,net.aspects+1) if selfEdges or a in keep]))
+    elif numpy is not None and hasattr(net,"_net"):
+        adjacencies.append((net,()))
+        links=()
+    else:
+        links=net._iter_links()
+
+    sources,targets,weights=[],[],[]
+    for nl1,nl2,w in links:
+        sources.append(project(nl1))
+        targets.append(project(nl2))
+        weights.append(w)
+
+    if numpy is None:
+        groups={}
+        for i,j,w in zip(sources,targets,weights):
+            if not net.directed and j<i:
+                i,j=j,i
+            if selfEdges or i!=j:
+                if (i,j) in groups:
+                    groups[i,j].append(w)
+                else:
+                    groups[i,j]=[w]
+        columns=[]
+        for r in reducers:
+            reduce_list=r if callable(r) else AGGREGATION_REDUCERS[r][0]
+            columns.append([reduce_list(w) for w in groups.values()])
+        return nodelayers,[i for i,j in groups],[j for i,j in groups],columns
+
+    sources=[numpy.array(sources,dtype=numpy.int64)]
+    targets=[numpy.array(targets,dtype=numpy.int64)]
+    for anet,layer in adjacencies:
+        asources,atargets,aweights=array.array('l'),array.array('l'),[]
+        for i,neighbors in anet._net.items():
+            asources.extend(itertools.repeat(i,len(neighbors)))
+            atargets.extend(neighbors.keys())
+            aweights.extend(neighbors.values())
+        projected=numpy.array([project(nl+layer) for nl in anet._idToNl],dtype=numpy.int64)
+        asources=numpy.frombuffer(asources,dtype=asources.typecode)
+        atargets=numpy.frombuffer(atargets,dtype=atargets.typecode)
+        if not net.directed:
+            #both directions of undirected edges are in the dicts
+            mask=asources<=atargets
+            asources,atargets=asources[mask],atargets[mask]
+            aweights=itertools.compress(aweights,mask.tolist())
+        weights.extend(aweights)
+        sources.append(projected[asources])
+        targets.append(projected[atargets])
+    sources=numpy.concatenate(sources)
+    targets=numpy.concatenate(targets)
+    weights=numpy.array(weights)
+
+    if weights.dtype==bool:
+        weights=weights.astype(int)
+    if not net.directed:
+        sources,targets=numpy.minimum(sources,targets),numpy.maximum(sources,targets)
+    if not selfEdges:
+        mask=sources!=targets
+        sources,targets,weights=sources[mask],targets[mask],weights[mask]
+    if len(weights)==0:
+        return nodelayers,[],[],[[] for r in reducers]
+    keys=sources*len(nodelayers)+targets
+    order=numpy.argsort(keys,kind="stable")
+    keys=keys[order]
+    weights=weights[order]
+    starts=numpy.flatnonzero(numpy.concatenate(([True],keys[1:]!=keys[:-1])))
+    counts=numpy.diff(numpy.append(starts,len(keys)))
+    columns=[]
+    for r in reducers:
+        if callable(r):
+            columns.append([r(weights[k:k+c].tolist()) for k,c in zip(starts.tolist(),counts.tolist())])
+        else:
+            columns.append(AGGREGATION_REDUCERS[r][1](numpy,weights,starts,counts).tolist())
+    first=order[starts]
+    return nodelayers,sources[first].tolist(),targets[first].tolist(),columns
 
 
 def overlay_network(net):
     """Returns the overlay network of a multilayer network with 1 aspect.
 
+    The weight of an edge in the overlay network is the sum of the weights of 
+    the intra-layer edges between the nodes. Inter-layer edges are ignored, and
+    so are the self-edges of undirected networks. The overlay network of a 
+    directed network is directed. The edges are gone through once, so that
+    the time taken is proportional to the number of edges.
+
     Returns
     -------
-    net : MultiplexNetwork
-       A new instance of multiplex network which is produced.
+    net : MultilayerNetwork
+       A new instance of monoplex network which is produced.
     """
     assert net.aspects==1
-    newnet=netmodule.MultilayerNetwork()
-    for layer in net.slices[1]:
-        for node1 in net.slices[0]:
-            for node2 in net.slices[0]:
-                if net.directed or node1>node2:
-                    newnet[node1,node2]=newnet[node1,node2]+net[node1,node2,layer,layer]
+    if isinstance(net,netmodule.MultiplexNetwork):
+        links=net._iter_intra_links()
+    else:
+        links=(link for link in net._iter_links() if link[0][1]==link[1][1])
+
+    weights={}
+    for nl1,nl2,w in links:
+        if net.directed or nl1[0]!=nl2[0]:
+            key=(nl1[0],nl2[0])
+            weights[key]=weights.get(key,0)+w
+
+    newnet=netmodule.MultilayerNetwork(directed=net.directed)
+    for node in net.slices[0]:
+        newnet.add_node(node)
+    newnet._add_links(((node1,),(node2,),w) for (node1,node2),w in weights.items())
     return newnet
 
 def subnet(net,nodes,*layers,**kwargs):
@@ -134,10 +349,16 @@ def subnet(net,nodes,*layers,**kwargs):
     nolinks : bool
         If set True, this function does not copy any links. That is, the returned
         network is _not_ an induced subnetwork but an empty network.
+    view : bool
+        If set True, nothing is copied and a SubnetView of the net is returned
+        instead. The view filters the nodes and layers of net when it is read,
+        and copies the subnetwork only if it is changed. Use views when the
+        subnetwork is only read, and call its materialize method to get a copy.
+        Cannot be used together with newNet or nolinks.
 
     Return
     ------
-    subnet : type(net), or type(newNet)
+    subnet : type(net), type(newNet), or SubnetView
         The induced subgraph that contains only nodes given in
         `nodes` and the edges between those nodes that are
         present in `net`. Node properties etc are left untouched.
@@ -161,6 +382,10 @@ def subnet(net,nodes,*layers,**kwargs):
         else:
             nodelayers.append(set(elayers))
 
+    if kwargs.get("view",False):
+        assert newNet==None and not nolinks, "Views cannot be combined with newNet or nolinks."
+        return netmodule.SubnetView(net,nodelayers)
+
     if newNet==None:
         if isinstance(net,netmodule.MultiplexNetwork):
             newNet=netmodule.MultiplexNetwork(couplings=net.couplings,
@@ -233,7 +458,7 @@ def subnet(net,nodes,*layers,**kwargs):
     return newNet
 
 
-def supra_adjacency_matrix(net,includeCouplings=True):
+def supra_adjacency_matrix(net,includeCouplings=True,includeIntraLayer=True,sparse=False):
     """Returns the supra-adjacency matrix and a list of node-layer pairs.
 
     Parameters
@@ -241,18 +466,30 @@ def supra_adjacency_matrix(net,includeCouplings=True):
     includeCoupings : bool
        If True, the inter-layer edges are included, if False, only intra-layer
        edges are included.
+    includeIntraLayer : bool
+       If True, the intra-layer edges are included, if False, only inter-layer
+       edges are included.
+    sparse : bool
+       If True, the matrix is a scipy.sparse.csr_matrix built in time proportional
+       to the number of edges. Requires SciPy.
 
     Returns
     -------
-    matrix, nodes : numpy.matrix, list
+    matrix, nodes : numpy.matrix or scipy.sparse.csr_matrix, list
        The supra-adjacency matrix and the list of node-layer pairs. The order
        of the elements in the list and the supra-adjacency matrix are the same.
     """
 
-    return net.get_supra_adjacency_matrix(includeCouplings=includeCouplings)
+    return net.get_supra_adjacency_matrix(includeCouplings=includeCouplings,includeIntraLayer=includeIntraLayer,sparse=sparse)
 
-def relabel(net,nodeNames=None,layerNames=None):
+def relabel(net,nodeNames=None,layerNames=None,inplace=False):
     """Returns a copy of the network with nodes and layers relabeled.
+
+    The links of MultilayerNetwork and MultiplexNetwork objects are not 
+    inserted again if the maps are one-to-one. Only the tables between the
+    names and the internal ids of the node-layers are rebuilt, which takes time
+    proportional to the number of node-layers. Otherwise, the nodes or layers
+    given the same name are merged, and the links are copied one by one.
     
      Parameters
      ----------
@@ -263,6 +500,9 @@ def relabel(net,nodeNames=None,layerNames=None):
      layerNames : None, dict, or sequence of dicts
         The map(s) from (elementary) layer names to (elementary) layer indices.
         Note that you can add empty dicts for aspects you do not want to relabel.
+     inplace : bool
+        If True, net is relabeled and returned instead of a copy. The maps must
+        be one-to-one, and net must be a MultilayerNetwork or a MultiplexNetwork.
 
      Return
      ------
@@ -288,20 +528,30 @@ def relabel(net,nodeNames=None,layerNames=None):
         if isinstance(layerNames,dict):
             layerNames=[layerNames]
 
+    layerNames=list(layerNames)
     for aspect in range(net.aspects):
         if len(layerNames)<aspect+1:
             layerNames.append({})
+
+    maps=[nodeNames]+layerNames
+    oneToOne=all(len(set(dget(m,e) for e in net.slices[a]))==len(net.slices[a]) for a,m in enumerate(maps))
+    if type(net) in (netmodule.MultilayerNetwork,netmodule.MultiplexNetwork) and oneToOne:
+        newNet=net if inplace else net._copy()
+        newNet._relabel(maps)
+        return newNet
+    elif inplace:
+        raise TypeError("Only MultilayerNetwork and MultiplexNetwork objects can be relabeled in place, and the maps must be one-to-one.")
      
-    if type(net)==netmodule.MultilayerNetwork:
-        newNet=netmodule.MultilayerNetwork(aspects=net.aspects,
-                                 noEdge=net.noEdge,
-                                 directed=net.directed,
-                                 fullyInterconnected=net.fullyInterconnected)
-    elif type(net)==netmodule.MultiplexNetwork:
+    if isinstance(net,netmodule.MultiplexNetwork):
         newNet=netmodule.MultiplexNetwork(couplings=net.couplings,
                                 directed=net.directed,
                                 noEdge=net.noEdge,
                                 fullyInterconnected=net.fullyInterconnected)
+    elif isinstance(net,netmodule.MultilayerNetwork):
+        newNet=netmodule.MultilayerNetwork(aspects=net.aspects,
+                                 noEdge=net.noEdge,
+                                 directed=net.directed,
+                                 fullyInterconnected=net.fullyInterconnected)
     else:
         raise Exception("Invalid type of net",type(net))
 
@@ -318,14 +568,14 @@ def relabel(net,nodeNames=None,layerNames=None):
                 layer=layer[0]
             newNet.add_node(dget(nodeNames,nodelayer[0]),layer=layer)
 
-    if type(net)==netmodule.MultilayerNetwork:
+    if not isinstance(net,netmodule.MultiplexNetwork):
         for edge in net.edges:
             newedge=[dget(nodeNames,edge[0]),dget(nodeNames,edge[1])]
             for aspect in range(net.aspects):
                 newedge.append(dget(layerNames[aspect],edge[2+aspect*2]))
                 newedge.append(dget(layerNames[aspect],edge[2+aspect*2+1]))
             newNet[tuple(newedge)]=edge[-1]
-    elif type(net)==netmodule.MultiplexNetwork:
+    else:
             for layer in net.iter_layers():
                 if net.aspects==1:
                     layertuple=(layer,)
@@ -338,7 +588,7 @@ def relabel(net,nodeNames=None,layerNames=None):
                             
     return newNet
 
-def normalize(net,nodesToIndices=None,layersToIndices=None,nodeStart=0,layerStart=0):
+def normalize(net,nodesToIndices=None,layersToIndices=None,nodeStart=0,layerStart=0,inplace=False,mapArrays=False):
     """Returns a copy of the network with layer and node indices as integers.
 
     In network with n nodes the nodes are renamed so that they run from 0 to n-1.
@@ -360,14 +610,23 @@ def normalize(net,nodesToIndices=None,layersToIndices=None,nodeStart=0,layerStar
        The indexing for nodes starts from this value.
     layerStart : int
        The indexing for layers starts from this value.
+    inplace : bool
+       If True, net is relabeled in place and returned. See relabel.
+    mapArrays : bool
+       If True, the maps are returned as NumPy arrays instead of dicts. The map 
+       from indices to names is an array a with a[index-start]=name. The map from
+       names to indices is an array a with a[name]=index and -1 for the integers
+       which are not names, and it can be used to relabel columns of node or 
+       layer names at once (e.g., a[sources]). In that case the names must be 
+       non-negative integers. Requires NumPy.
 
     Return
     ------
     newnet : type(net)
         The normalized network.
-    (optional) nodeNames : dict
+    (optional) nodeNames : dict, or numpy.ndarray
         The map from node names/indices to node indices/names.
-    (optional) layerNames : dict, or list of dicts
+    (optional) layerNames : dict, list of dicts, numpy.ndarray, or list of numpy.ndarrays
         The map(s) from (elementary) layer names/indices to (elementary) layer indices/names. One
         map for each aspect.
     """
@@ -375,30 +634,39 @@ def normalize(net,nodesToIndices=None,layersToIndices=None,nodeStart=0,layerStar
     nodeNames={}
     layerNames=[{} for aspect in range(net.aspects)]
 
-    for i,node in enumerate(sorted(net)):
+    sortedNodes=sorted(net)
+    for i,node in enumerate(sortedNodes):
         nodeNames[node]=i+nodeStart
+    sortedLayers=[]
     for aspect in range(net.aspects):
-        for i,layer in enumerate(sorted(net.slices[aspect+1])):
+        sortedLayers.append(sorted(net.slices[aspect+1]))
+        for i,layer in enumerate(sortedLayers[aspect]):
             layerNames[aspect][layer]=i+layerStart
 
-    newNet=relabel(net,nodeNames=nodeNames,layerNames=layerNames)
-
-    if nodesToIndices==False:
-        indicesToNodes={}
-        #for node,index in nodeNames.iteritems():
-        for node in nodeNames:
-            index=nodeNames[node]    
-            indicesToNodes[index]=node
-        nodeNames=indicesToNodes
+    newNet=relabel(net,nodeNames=nodeNames,layerNames=layerNames,inplace=inplace)
 
-    if layersToIndices==False:
-        for aspect in range(net.aspects):
-            indicesToLayers={}
-            #for layer,index in layerNames[aspect].iteritems():
-            for layer in layerNames[aspect]:
-                index=layerNames[aspect][layer]
-                indicesToLayers[index]=layer
-            layerNames[aspect]=indicesToLayers
+    if mapArrays:
+        if nodesToIndices!=None:
+            nodeNames=_normalization_array(sortedNodes,nodeStart,nodesToIndices)
+        if layersToIndices!=None:
+            layerNames=[_normalization_array(sortedLayers[aspect],layerStart,layersToIndices) for aspect in range(net.aspects)]
+    else:
+        if nodesToIndices==False:
+            indicesToNodes={}
+            #for node,index in nodeNames.iteritems():
+            for node in nodeNames:
+                index=nodeNames[node]    
+                indicesToNodes[index]=node
+            nodeNames=indicesToNodes
+
+        if layersToIndices==False:
+            for aspect in range(net.aspects):
+                indicesToLayers={}
+                #for layer,index in layerNames[aspect].iteritems():
+                for layer in layerNames[aspect]:
+                    index=layerNames[aspect][layer]
+                    indicesToLayers[index]=layer
+                layerNames[aspect]=indicesToLayers
 
     if net.aspects==1:
         layerNames=layerNames[0]
@@ -412,62 +680,183 @@ def normalize(net,nodesToIndices=None,layersToIndices=None,nodeStart=0,layerStar
     elif nodesToIndices!=None and layersToIndices!=None:
         return newNet,nodeNames,layerNames
 
+def _normalization_array(names,start,toIndices):
+    """Returns the map between the sorted names and the indices starting from
+    start as an array. See normalize.
+    """
+    import numpy
+    if toIndices:
+        if not all(isinstance(name,int) and name>=0 for name in names):
+            raise ValueError("The map from names to indices can be an array only if the names are non-negative integers.")
+        forward=numpy.full(names[-1]+1 if len(names)>0 else 0,-1,dtype=numpy.int64)
+        forward[numpy.array(names,dtype=numpy.int64)]=numpy.arange(start,start+len(names))
+        return forward
+    else:
+        inverse=numpy.empty(len(names),dtype=object)
+        for i,name in enumerate(names):
+            inverse[i]=name
+        if all(isinstance(name,int) for name in names):
+            inverse=inverse.astype(numpy.int64)
+        return inverse
 
-def threshold(net,threshold,method=">=",ignoreCouplingEdges=False):
-    def accept_edge(weight,threshold,rule):
-        if rule==">=":
-            return weight>=threshold
-        elif rule=="<=":
-            return weight<=threshold
-        elif rule==">":
-            return weight>threshold
-        elif rule=="<":
-            return weight<threshold
-        else:
-            raise Exception("Invalid method for thresholding: "+str(rule))
 
-    mplex=(type(net)==netmodule.MultiplexNetwork)
-    if mplex:
+#The comparisons of the thresholding methods
+THRESHOLD_METHODS={">=":operator.ge,"<=":operator.le,">":operator.gt,"<":operator.lt}
+
+def threshold(net,threshold,method=">=",ignoreCouplingEdges=False,inplace=False,topk=None,quantile=None):
+    """Returns a network with the edges whose weights pass the threshold.
+
+    The comparison is chosen once, and the weights are compared in bulk as 
+    NumPy arrays if NumPy is available. The intra-layer networks of multiplex
+    networks are thresholded one by one.
+
+    Parameters
+    ----------
+    net : MultilayerNetwork, MultiplexNetwork
+       The original network.
+    threshold : object
+       The weights are compared to this value, or None if only topk is used.
+    method : string
+       The comparison '>=', '<=', '>' or '<'. An edge is kept if
+       weight <method> threshold is True.
+    ignoreCouplingEdges : bool
+       If True, the inter-layer edges are kept without thresholding them, and
+       the couplings of multiplex networks are kept implicit.
+    inplace : bool
+       If True, the rejected edges are removed from net and net is returned. The
+       coupling edges of multiplex networks cannot be removed, so ignoreCouplingEdges
+       needs to be True for multiplex networks with couplings.
+    topk : int
+       If given, an edge is kept only if it is among the k best edges of one of 
+       its end points. The best edges are those with the largest weights for '>=' 
+       and '>', and those with the smallest weights for '<=' and '<'. In directed 
+       networks the edges are ranked by their sources only. Ties are broken 
+       arbitrarily. Requires NumPy.
+    quantile : float
+       If given, the edges of each layer are compared to this quantile of their 
+       weights instead of the threshold parameter. Inter-layer edges are grouped
+       by the pair of layers they connect. Requires NumPy.
+
+    Returns
+    -------
+    net : MultilayerNetwork, MultiplexNetwork
+       A new network, or net if inplace is True. The new network is a multiplex 
+       network if net is a multiplex network without couplings, or if 
+       ignoreCouplingEdges is True.
+
+    Examples
+    --------
+    >>> backbone=transforms.threshold(net,None,topk=3,ignoreCouplingEdges=True)
+    >>> transforms.threshold(net,None,quantile=0.9,inplace=True,ignoreCouplingEdges=True)
+    """
+    if method not in THRESHOLD_METHODS:
+        raise Exception("Invalid method for thresholding: "+str(method))
+    assert threshold is not None or topk is not None or quantile is not None, "Nothing to threshold with."
+
+    mplex=isinstance(net,netmodule.MultiplexNetwork)
+    if mplex and not ignoreCouplingEdges:
         for coupling in net.couplings:
             if coupling[0]!="none":
                 mplex=False
-            
+    if inplace and isinstance(net,netmodule.MultiplexNetwork) and not mplex:
+        raise TypeError("Coupling edges cannot be removed from a multiplex network. Use ignoreCouplingEdges=True.")
 
-    if mplex:
-        newNet=netmodule.MultiplexNetwork(couplings=net.couplings,
-                                directed=net.directed,
-                                noEdge=net.noEdge,
-                                fullyInterconnected=net.fullyInterconnected)
+    if inplace:
+        newNet=net
     else:
-        newNet=netmodule.MultilayerNetwork(aspects=net.aspects,
-                                 noEdge=net.noEdge,
-                                 directed=net.directed,
-                                 fullyInterconnected=net.fullyInterconnected)
+        if mplex:
+            newNet=netmodule.MultiplexNetwork(couplings=net.couplings,
+                                    directed=net.directed,
+                                    noEdge=net.noEdge,
+                                    fullyInterconnected=net.fullyInterconnected)
+        else:
+            newNet=netmodule.MultilayerNetwork(aspects=net.aspects,
+                                     noEdge=net.noEdge,
+                                     directed=net.directed,
+                                     fullyInterconnected=net.fullyInterconnected)
 
-    #copy nodes,layers,node-layers
-    for node in net:
-        newNet.add_node(node)
-    for aspect in range(net.aspects):
-        for layer in net.slices[aspect+1]:
-            newNet.add_layer(layer,aspect=aspect+1) 
-    if not net.fullyInterconnected:
-        for nodelayer in net.iter_node_layers():
-            layer=lnodelayer[1:]
-            if net.aspects==1:
-                layer=layer[0]
-            newNet.add_node(nodelayer[0],layer=layer)
+        #copy nodes,layers,node-layers
+        for node in net:
+            newNet.add_node(node)
+        for aspect in range(net.aspects):
+            for layer in net.slices[aspect+1]:
+                newNet.add_layer(layer,aspect=aspect+1) 
+        if not net.fullyInterconnected:
+            for nodelayer in net.iter_node_layers():
+                layer=nodelayer[1:]
+                if net.aspects==1:
+                    layer=layer[0]
+                newNet.add_node(nodelayer[0],layer=layer)
 
     if mplex:
-        for layer in net.iter_layers():
-            for edge in net.A[layer].edges:
-                if accept_edge(edge[-1],threshold,rule=method):
-                    newNet.A[layer][edge[0]][edge[1]]=edge[-1]
+        parts=[(net.A[layer],newNet.A[layer]) for layer in net.iter_layers()]
     else:
-        for edge in net.edges:
-            if accept_edge(edge[-1],threshold,rule=method):
-                newNet[edge[:-1]]=edge[-1]
+        parts=[(net,newNet)]
+    for oldPart,newPart in parts:
+        links=list(oldPart._iter_links())
+        keep=_threshold_links(links,threshold,method,topk,quantile,net.directed,ignoreCouplingEdges and not mplex)
+        if inplace:
+            newPart._add_links([(nl1,nl2,newPart.noEdge) for (nl1,nl2,w),k in zip(links,keep) if not k])
+        else:
+            newPart._add_links(itertools.compress(links,keep))
     return newNet
 
+def _threshold_links(links,threshold,method,topk,quantile,directed,keepInterLayer):
+    """Returns a sequence of booleans telling which of the (node-layer, node-layer, 
+    weight) triples pass the threshold. See threshold for the parameters.
+    """
+    accept=THRESHOLD_METHODS[method]
+    if topk is None and quantile is None:
+        try:
+            import numpy
+        except ImportError:
+            return [accept(w,threshold) or (keepInterLayer and nl1[1:]!=nl2[1:]) for nl1,nl2,w in links]
+    import numpy
+
+    weights=numpy.array([w for nl1,nl2,w in links])
+    if quantile is not None:
+        groups={}
+        groupIds=numpy.array([groups.setdefault((nl1[1:],nl2[1:]),len(groups)) for nl1,nl2,w in links],dtype=numpy.int64)
+        #the weights are sorted once within the groups, and the quantiles are
+        #interpolated linearly between the closest ranks as in numpy.quantile
+        sortedWeights=weights[numpy.lexsort((weights,groupIds))].astype(float)
+        counts=numpy.bincount(groupIds,minlength=len(groups))
+        starts=numpy.cumsum(counts)-counts
+        position=(counts-1)*float(quantile)
+        below=numpy.floor(position).astype(numpy.int64)
+        fraction=position-below
+        lower=sortedWeights[starts+below]
+        upper=sortedWeights[starts+numpy.minimum(below+1,counts-1)]
+        thresholds=numpy.where(fraction>=0.5,upper-(upper-lower)*(1-fraction),lower+(upper-lower)*fraction)
+        keep=accept(weights,thresholds[groupIds])
+    elif threshold is not None:
+        keep=accept(weights,threshold)
+    else:
+        keep=numpy.ones(len(links),dtype=bool)
+
+    if topk is not None and len(links)>0:
+        #rank the edges of each node-layer, best first
+        ids={}
+        ends=[ids.setdefault(nl1,len(ids)) for nl1,nl2,w in links]
+        edges=numpy.arange(len(links))
+        sortWeights=-weights if method in (">=",">") else weights
+        if not directed:
+            ends.extend(ids.setdefault(nl2,len(ids)) for nl1,nl2,w in links)
+            edges=numpy.concatenate((edges,edges))
+            sortWeights=numpy.concatenate((sortWeights,sortWeights))
+        ends=numpy.array(ends,dtype=numpy.int64)
+        order=numpy.lexsort((sortWeights,ends))
+        ends=ends[order]
+        starts=numpy.flatnonzero(numpy.concatenate(([True],ends[1:]!=ends[:-1])))
+        ranks=numpy.arange(len(ends))-numpy.repeat(starts,numpy.diff(numpy.append(starts,len(ends))))
+        top=numpy.zeros(len(links),dtype=bool)
+        top[edges[order][ranks<topk]]=True
+        keep=keep&top
+
+    if keepInterLayer:
+        keep=keep|numpy.array([nl1[1:]!=nl2[1:] for nl1,nl2,w in links],dtype=bool)
+    return keep.tolist()
+
 def randomize_nodes_by_layer(net):
     assert isinstance(net,netmodule.MultiplexNetwork)
     assert net.aspects==1
@@ -488,12 +877,220 @@ def randomize_nodes_by_layer(net):
 
 
 
-def subnet_iter(net,remove_elayers=[],remove_edges=True):
+def randomize_edges(net,swapsPerEdge=10,preserveOverlaps=False,seed=None,inplace=False):
+    """Randomizes the edges of a multiplex network by swapping their end points.
+
+    Pairs of edges (a,b) and (c,d) in the same layer are replaced with the edges
+    (a,d) and (c,b) (Maslov-Sneppen rewiring), so that the degrees of the nodes
+    in each layer (in- and out-degrees for directed networks) are preserved. 
+    Swaps which would create self-edges or edges which already exist are rejected.
+    Each edge keeps its weight and its source node, and the coupling edges are 
+    not changed.
+
+    Parameters
+    ----------
+    net : MultiplexNetwork
+       The original network with one aspect.
+    swapsPerEdge : int
+       The number of swaps attempted is swapsPerEdge times the number of edges.
+    preserveOverlaps : bool
+       If True, only the edges present in exactly the same set of layers are 
+       swapped, and they are swapped in all of these layers at once. This 
+       preserves the overlap degrees given by diagnostics.overlap_degs for
+       unweighted networks in addition to the degrees in each layer.
+    seed : int, str, bytes or bytearray
+       The seed of the random number generator used for the swaps. If None, 
+       the generator is seeded from the system.
+    inplace : bool
+       If True, net is randomized and returned instead of a copy.
+
+    Returns
+    -------
+    net : MultiplexNetwork
+       The randomized network.
+
+    Notes
+    -----
+    The edges are swapped in arrays of integer node indices, and the network
+    is changed only after all the swaps.
+
+    See also
+    --------
+    randomize_edges_replicates : Many randomized networks in parallel.
+    """
+    groups,payloads,nodes=_randomization_groups(net,preserveOverlaps)
+    swapped=_swap_groups(groups,len(nodes),net.directed,preserveOverlaps,swapsPerEdge,seed)
+    return _apply_swaps(net if inplace else net._copy(),groups,payloads,nodes,swapped)
+
+def randomize_edges_replicates(net,seeds,processes=1,swapsPerEdge=10,preserveOverlaps=False):
+    """Returns a list of networks randomized with randomize_edges.
+
+    The edges of the network are read only once, and the swaps of the replicates
+    can be done in parallel worker processes.
+
+    Parameters
+    ----------
+    net : MultiplexNetwork
+       The original network with one aspect.
+    seeds : int, or list
+       If a list, the replicate k is the same network as randomize_edges(net,seed=seeds[k])
+       gives. If an int, this number of replicates are generated with generators
+       seeded from the system.
+    processes : int, None
+       The number of worker processes. If 1, the replicates are generated in
+       this process. If None, the number of CPUs is used.
+    swapsPerEdge : int
+       See randomize_edges.
+    preserveOverlaps : bool
+       See randomize_edges.
+
+    Returns
+    -------
+    replicates : list of MultiplexNetwork objects
+    """
+    if isinstance(seeds,int):
+        seeds=[None]*seeds
+    groups,payloads,nodes=_randomization_groups(net,preserveOverlaps)
+    args=(len(nodes),net.directed,preserveOverlaps,swapsPerEdge)
+    if processes==1:
+        results=[_swap_groups(groups,*(args+(seed,))) for seed in seeds]
+    else:
+        import multiprocessing
+        pool=multiprocessing.Pool(processes,_init_swap_worker,(groups,args))
+        try:
+            results=pool.map(_swap_worker,seeds)
+        finally:
+            pool.close()
+            pool.join()
+    return [_apply_swaps(net._copy(),groups,payloads,nodes,swapped) for swapped in results]
+
+_swapWorkerArgs=None
+
+def _init_swap_worker(groups,args):
+    global _swapWorkerArgs
+    _swapWorkerArgs=(groups,)+args
+
+def _swap_worker(seed):
+    return _swap_groups(*(_swapWorkerArgs+(seed,)))
+
+def _randomization_groups(net,preserveOverlaps):
+    """Returns the edges of a multiplex network grouped by the layers whose
+    edges can be swapped with each other.
+
+    Returns
+    -------
+    groups : dict
+       Keys are tuples of layers and values are pairs of arrays containing the 
+       indices of the sources and the targets of the edges in the layers.
+    payloads : dict
+       Keys are tuples of layers and values are lists with the tuple of weights 
+       of each edge in the layers.
+    nodes : list
+       The nodes in the order of their indices.
+    """
+    assert isinstance(net,netmodule.MultiplexNetwork), "Only multiplex networks can be randomized."
+    assert net.aspects==1, "Only multiplex networks with one aspect can be randomized."
+    nodes=list(net.slices[0])
+    index=dict((node,i) for i,node in enumerate(nodes))
+    layers=list(net.slices[1])
+
+    edges={} #key=(layer,) or (i,j), val=list of (i,j,w) or (layer,w)
+    for layer in layers:
+        for nl1,nl2,w in net.A[layer]._iter_links():
+            i,j=index[nl1[0]],index[nl2[0]]
+            if not net.directed and i>j: #same orientation in all layers
+                i,j=j,i
+            if preserveOverlaps:
+                edges.setdefault((i,j),[]).append((layer,w))
+            else:
+                edges.setdefault((layer,),[]).append((i,j,w))
+
+    groups,payloads={},{}
+    if preserveOverlaps:
+        for (i,j),layerWeights in edges.items():
+            key=tuple(layer for layer,w in layerWeights)
+            if key not in groups:
+                groups[key]=(array.array('l'),array.array('l'))
+                payloads[key]=[]
+            groups[key][0].append(i)
+            groups[key][1].append(j)
+            payloads[key].append(tuple(w for layer,w in layerWeights))
+    else:
+        for key,links in edges.items():
+            groups[key]=(array.array('l',(i for i,j,w in links)),array.array('l',(j for i,j,w in links)))
+            payloads[key]=[(w,) for i,j,w in links]
+    return groups,payloads,nodes
+
+def _swap_groups(groups,n,directed,preserveOverlaps,swapsPerEdge,seed):
+    """Swaps the end points of edges within each group, and returns the new
+    arrays of sources and targets. See _randomization_groups and randomize_edges.
+    """
+    rnd=random.Random(seed)
+    if directed:
+        pair=lambda i,j:i*n+j
+    else:
+        pair=lambda i,j:i*n+j if i<j else j*n+i
+    if preserveOverlaps: #no edges can be created between any connected nodes
+        pairs=set(pair(i,j) for sources,targets in groups.values() for i,j in zip(sources,targets))
+
+    swapped={}
+    for key in sorted(groups,key=repr): #the order is fixed for the seeds
+        sources,targets=array.array('l',groups[key][0]),array.array('l',groups[key][1])
+        swapped[key]=(sources,targets)
+        if not preserveOverlaps:
+            pairs=set(pair(i,j) for i,j in zip(sources,targets))
+        m=len(sources)
+        if m<2:
+            continue
+        for swap in range(swapsPerEdge*m):
+            e1,e2=rnd.randrange(m),rnd.randrange(m)
+            if e1==e2:
+                continue
+            a,b=sources[e1],targets[e1]
+            c,d=sources[e2],targets[e2]
+            if not directed and rnd.random()<0.5:
+                c,d=d,c
+            if a==d or c==b:
+                continue
+            ad,cb=pair(a,d),pair(c,b)
+            if ad in pairs or cb in pairs:
+                continue
+            pairs.remove(pair(a,b))
+            pairs.remove(pair(c,d))
+            pairs.add(ad)
+            pairs.add(cb)
+            targets[e1]=d
+            sources[e2],targets[e2]=c,b
+    return swapped
+
+def _apply_swaps(net,groups,payloads,nodes,swapped):
+    """Replaces the edges of the groups in the multiplex network with the swapped 
+    ones, and returns the network.
+    """
+    removed,added={},{}
+    for key,(sources,targets) in groups.items():
+        newSources,newTargets=swapped[key]
+        for k,(i,j) in enumerate(zip(sources,targets)):
+            if (newSources[k],newTargets[k])!=(i,j):
+                for layer,w in zip(key,payloads[key][k]):
+                    removed.setdefault(layer,[]).append(((nodes[i],),(nodes[j],),net.noEdge))
+                    added.setdefault(layer,[]).append(((nodes[newSources[k]],),(nodes[newTargets[k]],),w))
+    for layer in removed:
+        net.A[layer]._add_links(removed[layer])
+        net.A[layer]._add_links(added[layer])
+    return net
+
+def subnet_iter(net,remove_elayers=[],remove_edges=True,prune=None,copy=True):
     """Iterator for all subnetworks of the given network. 
 
     The subnetworks need not to be induced. For multiplex networks
     the coupling edges are not removed.
 
+    The subnetworks are generated lazily. For each combination of nodes and
+    elementary layers, the edges are added to and removed from a single working
+    network one at a time, so that the next subnetwork is produced from the 
+    previous one with a constant number of edge changes on average.
+
     Parameters
     ----------
     net : MultilayerNetwork, or MultiplexNetwork 
@@ -503,6 +1100,21 @@ def subnet_iter(net,remove_elayers=[],remove_edges=True):
     remove_edges : bool
        True if edges can be removed between remaining nodes. 
        If False, then all subnetworks are induced.
+    prune : callable
+       A predicate for skipping subnetworks. The edges of each induced subnetwork
+       are decided one by one, and prune is called with the working network each
+       time an edge is added to it. If prune returns True, none of the subnetworks
+       containing the edges added so far are generated in the current branch, that
+       is, the edges that are decided later are not added to them. This skips
+       all the subnetworks containing the edges if the predicate stays True
+       when edges are added (e.g., a limit on the number of edges). If remove_edges
+       is False, prune is called with each induced subnetwork, which is skipped if
+       the return value is True.
+    copy : bool
+       If False, the same working network object is yielded for all subnetworks
+       of a combination of nodes and layers (or a SubnetView if remove_edges is 
+       False). It is changed when the iteration continues, so it should not
+       be changed or stored by the caller.
 
     Return
     ------
@@ -514,6 +1126,9 @@ def subnet_iter(net,remove_elayers=[],remove_edges=True):
     Following returns all induced subnetworks when removing nodes:
     >>> subnet_iter(net,remove_elayers[0],remove_edges=False)
 
+    Following returns the subnetworks with at most 3 edges:
+    >>> subnet_iter(net,prune=lambda n:len(n.edges)>3)
+
     Notes
     -----
     The number of subnetworks can grow very fast if the network is not very small
@@ -532,13 +1147,6 @@ def subnet_iter(net,remove_elayers=[],remove_edges=True):
             for comb in itertools.combinations(thelist,i):
                 yield comb
 
-    def all_combinations(thelist):
-        """Returns all combinations
-        """
-        for i in range(len(thelist)+1):
-            for comb in itertools.combinations(thelist,i):
-                yield comb
-
     combinations_args=[]
     for a in range(net.aspects+1):
         if a in remove_elayers:
@@ -547,39 +1155,80 @@ def subnet_iter(net,remove_elayers=[],remove_edges=True):
             combinations_args.append([net.slices[a]])
 
     for nl in itertools.product(*combinations_args):
-        subnet_with_edges=subnet(net,*nl)
         if remove_edges: #Going through all edge combinations
+            induced=subnet(net,*nl,view=True)
             if isinstance(net,netmodule.MultiplexNetwork):
                 #For multiplex networks we do not want to go through coupling edges
-                couplings=subnet_with_edges.couplings
-                edges=list(subnet_with_edges.edges)
-                subnet_with_edges.couplings=couplings
+                links=[(nl1,nl2,w) for nl1,nl2,w in induced._iter_links() if nl1[1:]==nl2[1:]]
             else:
                 #For multilayer networks we go through all edges
-                edges=net.edges
-            for newnet_edges in all_combinations(edges):
-                newnet=subnet(subnet_with_edges,*nl,nolinks=True)
-                for edge in newnet_edges:
-                    newnet[edge[:-1]]=subnet_with_edges[edge[:-1]]
-                yield newnet
+                links=list(induced._iter_links())
+            work=subnet(net,*nl,nolinks=True)
+            for newnet in _iter_edge_subsets(work,[(work._nodes_to_link(nl1,nl2),w) for nl1,nl2,w in links],prune):
+                yield subnet(newnet,*newnet.slices) if copy else newnet
         else: #All edges are kept
-            yield subnet_with_edges
+            newnet=subnet(net,*nl,view=not copy)
+            if prune is None or not prune(newnet):
+                yield newnet
+
+def _iter_edge_subsets(work,links,prune):
+    """Adds the subsets of the given links to the empty network work, and yields
+    the network after each subset. 
+
+    The subsets are generated in depth-first order where the links are decided
+    in the given order, so that the next subset is produced by removing the
+    last links of the previous one and adding a single link. See subnet_iter
+    for the prune parameter.
+    """
+    chosen=[False]*len(links)
+    yield work
+    position=len(links)-1
+    while True:
+        #Increment the subset at the position as if it was a binary number 
+        i=position
+        while i>=0 and chosen[i]:
+            work[links[i][0]]=work.noEdge
+            chosen[i]=False
+            i-=1
+        if i<0:
+            return
+        work[links[i][0]]=links[i][1]
+        chosen[i]=True
+        if prune is not None and prune(work):
+            position=i #skip the subsets containing the chosen links
+        else:
+            position=len(links)-1
+            yield work
     
 
 
 
-def get_underlying_graph(net):
+def get_underlying_graph(net,nodeNames="string",sparse=False):
     """Creates the underlying graph of a multiplex network.
 
+    The node-layers of the network are the nodes of the underlying graph, and
+    it has an edge for each edge of the network including the coupling edges.
+
     Parameters
     ----------
     net : MultilayerNetwork, or MultiplexNetwork 
        The original network.
+    nodeNames : string
+       If "string", the nodes of the underlying graph are the node-layer tuples
+       converted to strings. If "index", the nodes are integers running from 0 
+       to the number of node-layers minus one.
+    sparse : bool
+       If True, the adjacency matrix of the underlying graph is returned as a
+       scipy.sparse.csr_matrix instead of a network. Requires SciPy.
 
     Return
     ------
-    MultilayerNetwork objects with zero aspects.
-    Node-layer tuples are converted to node names that are strings.
+    graph : MultilayerNetwork with zero aspects, or scipy.sparse.csr_matrix
+       The underlying graph. The sparse matrix is symmetric for undirected
+       networks, and missing edges are zeros regardless of the noEdge value.
+    (optional) nodelayers : list
+       The node-layers in the order of their indices. Returned if nodeNames is 
+       "index" or sparse is True.
 
     Notes
     -----
@@ -589,7 +1238,27 @@ def get_underlying_graph(net):
 
     A useful way of extracting the tuples back from the string is to
     use the eval method.
+
+    Both the indexed graph and the sparse matrix are built from the edges
+    in time proportional to the number of edges.
     """
+    assert nodeNames in ["string","index"], "Invalid nodeNames: "+str(nodeNames)
+    nodelayers=list(net.iter_node_layers()) #tuples also if there are no aspects
+    index=dict((nl,i) for i,nl in enumerate(nodelayers))
+
+    if sparse:
+        import numpy,scipy.sparse
+        rows,cols,data=array.array('l'),array.array('l'),[]
+        for nl1,nl2,w in net._iter_links():
+            rows.append(index[nl1])
+            cols.append(index[nl2])
+            data.append(w)
+        rows,cols=numpy.asarray(rows,dtype=numpy.int64),numpy.asarray(cols,dtype=numpy.int64)
+        data=numpy.array(data,dtype=float)
+        if not net.directed: #undirected edges are iterated once
+            offdiagonal=rows!=cols
+            rows,cols,data=numpy.concatenate((rows,cols[offdiagonal])),numpy.concatenate((cols,rows[offdiagonal])),numpy.concatenate((data,data[offdiagonal]))
+        return scipy.sparse.coo_matrix((data,(rows,cols)),shape=(len(nodelayers),len(nodelayers))).tocsr(),nodelayers
 
     #The network object to be returned
     newNet=netmodule.MultilayerNetwork(aspects=0,
@@ -597,14 +1266,19 @@ def get_underlying_graph(net):
                                        directed=net.directed
                                        )
 
+    if nodeNames=="string":
+        names=[(str(nl),) for nl in nodelayers]
+    else:
+        names=[(i,) for i in range(len(nodelayers))]
+
     #Add nodes
-    for nl in net.iter_node_layers():
-        newNet.add_node(str(nl))
+    for name in names:
+        newNet.add_node(name[0])
 
     #Add edges
-    for edge in net.edges:
-        n1,n2=net._link_to_nodes(edge[:-1])
-        w=edge[-1]
-        newNet[str(n1)][str(n2)]=w
+    newNet._add_links((names[index[nl1]],names[index[nl2]],w) for nl1,nl2,w in net._iter_links())
 
-    return newNet
+    if nodeNames=="string":
+        return newNet
+    else:
+        return newNet,nodelayers